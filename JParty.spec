@@ -13,7 +13,8 @@ a = Analysis(['run.py'],
                  ("jparty/data/*", "data"),
                  ("jparty/buzzer", "buzzer"),
              ],
-             hiddenimports=["qrcode"],
+             # loaded through lazy_import, which PyInstaller cannot follow
+             hiddenimports=["qrcode", "bs4", "numpy"],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
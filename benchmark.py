@@ -0,0 +1,974 @@
+"""Script to benchmark JParty hot paths"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+FIXTURE_GAMES = Path(__file__).parent / "fixtures" / "games"
+
+
+def timeit(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def saved_game_ids(args):
+    if args.game_ids:
+        return args.game_ids
+    return sorted(p.stem for p in args.games.glob("*.html"))
+
+
+def bench_cache(args):
+    """cold parse of the saved html vs warm load from the game cache"""
+    from jparty.retrieve import process_game_board_from_html
+    from jparty.game_cache import source_digest, load_cached_game, save_cached_game
+
+    cold_total = warm_total = 0
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is None:
+            print(f"{game_id}: incomplete, skipped")
+            continue
+        digest = source_digest(html, game_id)
+        save_cached_game(game_id, digest, game_data)
+
+        cold = timeit(lambda: process_game_board_from_html(html, game_id), args.repeat)
+        warm = timeit(
+            lambda: load_cached_game(game_id, source_digest(html, game_id)), args.repeat
+        )
+        cold_total += cold
+        warm_total += warm
+        print(f"{game_id}: cold {cold:8.2f} ms  warm {warm:6.2f} ms  ({cold / warm:5.1f}x)")
+
+    if warm_total:
+        print(f"total: cold {cold_total:.1f} ms  warm {warm_total:.1f} ms  ({cold_total / warm_total:.1f}x)")
+
+
+def game_signature(game_data):
+    """comparable view of a GameData (boards have no __eq__, and the reference parser keeps
+    the clue's <a> tag as Question.image where the others keep a bool)"""
+    from jparty.game_cache import question_to_list
+
+    if game_data is None:
+        return None
+    return (
+        game_data.date,
+        str(game_data.comments),
+        [
+            (
+                type(b).__name__,
+                list(b.categories),
+                b.dj,
+                [question_to_list(q) for q in b.questions],
+            )
+            for b in game_data.rounds
+        ],
+    )
+
+
+def bench_parse(args):
+    """golden-output check and timing of each parser backend against the reference parser"""
+    from jparty.retrieve import process_game_board_from_html, PARSER_BACKENDS
+
+    totals = {backend: 0 for backend in PARSER_BACKENDS}
+    mismatches = []
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        golden = game_signature(process_game_board_from_html(html, game_id, "reference"))
+        line = f"{game_id}:"
+        for backend in PARSER_BACKENDS:
+            result = game_signature(process_game_board_from_html(html, game_id, backend))
+            if result != golden:
+                mismatches.append((game_id, backend))
+            t = timeit(lambda: process_game_board_from_html(html, game_id, backend), args.repeat)
+            totals[backend] += t
+            line += f"  {backend} {t:7.2f} ms"
+        print(line)
+
+    reference = totals["reference"]
+    for backend, total in totals.items():
+        if total:
+            print(f"{backend}: {total:.1f} ms ({reference / total:.1f}x reference)")
+    for game_id, backend in mismatches:
+        print(f"MISMATCH: {backend} differs from reference on game {game_id}")
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_download(args):
+    """bulk download from a local stub server (as with --game-url) at the default per-host
+    rate, against the old sequential loop and its fixed 5 s sleep"""
+    import http.server
+    import tempfile
+    import threading
+    import requests
+    from jparty.constants import DOWNLOAD_RATE, DOWNLOAD_BURST
+    from jparty.downloader import BulkDownloader
+    from jparty.retrieve import process_game_board_from_html
+
+    html = (args.games / f"{saved_game_ids(args)[0]}.html").read_bytes()
+    latency = 0.3  # seconds the stub server takes to answer
+    game_ids = list(range(990001, 990009))
+    flaky = [game_ids[2]]  # fails once, to be retried on resume
+    arrivals = []
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            arrivals.append(time.monotonic())
+            time.sleep(latency)
+            if flaky and self.path == f"/{flaky[0]}.html":
+                flaky.pop()
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(html)))
+            self.end_headers()
+            self.wfile.write(html)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    game_url = f"http://127.0.0.1:{server.server_port}/{{game_id}}.html"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = Path(tmp)
+
+        class ScratchDownloader(BulkDownloader):
+            """saves into a scratch directory instead of SAVED_GAMES"""
+
+            def download(self, game_id):
+                game_html = self.fetch(game_id)
+                process_game_board_from_html(game_html, game_id)
+                (scratch / f"{game_id}.html").write_text(game_html, encoding="utf-8")
+
+        # the old loop: fetch, parse, save, then sleep 5 s
+        start = time.perf_counter()
+        game_html = requests.get(game_url.format(game_id=game_ids[0])).text
+        process_game_board_from_html(game_html, game_ids[0])
+        fetch = time.perf_counter() - start
+        old_single = 1 / (fetch + 5)
+        old_wayback = 1 / (fetch + latency + 5)
+
+        checkpoint = str(scratch / "checkpoint.json")
+        start = time.perf_counter()
+        failed = ScratchDownloader(checkpoint=checkpoint, game_url=game_url).run(game_ids)
+        elapsed = time.perf_counter() - start
+        # the old loop's request and the first burst are not paced by the rate
+        paced = arrivals[DOWNLOAD_BURST:]
+        per_second = (len(paced) - 1) / (paced[-1] - paced[0])
+        saved = len(list(scratch.glob("*.html")))
+        print(
+            f"{saved} of {len(game_ids)} games in {elapsed:.1f} s ({saved / elapsed:.2f} games/s), "
+            f"{per_second:.2f} requests/s to the host (limit {DOWNLOAD_RATE})"
+        )
+        print(f"old loop: {old_single:.2f} games/s")
+        print(
+            f"wayback, 2 requests per game: {DOWNLOAD_RATE / 2:.2f} games/s, "
+            f"old loop {old_wayback:.2f} games/s"
+        )
+
+        before = len(arrivals)
+        retried = ScratchDownloader(checkpoint=checkpoint, game_url=game_url).run(game_ids)
+        print(f"resume: retried {len(arrivals) - before} of {len(game_ids)} games")
+        server.shutdown()
+        if failed != {game_ids[2]} or retried or len(arrivals) - before != 1:
+            print("FAILED: the failed game was not the only one retried on resume")
+            sys.exit(1)
+        if per_second > DOWNLOAD_RATE * 1.1:
+            print("FAILED: the host got more requests than the rate allows")
+            sys.exit(1)
+
+
+def bench_search(args):
+    """search latency over an index of 10k games, built from copies of the saved games with a
+    few words changed in every clue, against a LIKE scan of the clue table"""
+    import copy
+    import random
+    import tempfile
+    from jparty.retrieve import process_game_board_from_html
+    from jparty.search_index import connect, index_game, search_clues
+
+    n_games = 10000
+    templates = []
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is not None:
+            templates.append(game_data)
+
+    rng = random.Random(0)
+    words = [f"word{i}" for i in range(5000)]
+    queries = {
+        "keyword": dict(keyword="word4321"),
+        "keyword, 2 words": dict(keyword="word4321 word1234"),
+        "category": dict(category="cat word99"),
+        "keyword + value": dict(keyword="word4321", value=400),
+        "keyword + dates": dict(keyword="word4321", date_from="2005-01-01", date_to="2009-12-31"),
+        "value only": dict(value=1000),
+        "dates only": dict(date_from="2005-01-01", date_to="2005-12-31"),
+        "no match": dict(keyword="nosuchword"),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(Path(tmp) / "clue_index.sqlite")
+        start = time.perf_counter()
+        for game_id in range(n_games):
+            game_data = copy.deepcopy(templates[game_id % len(templates)])
+            game_data.date = f"January {game_id % 28 + 1}, {1990 + game_id % 30}"
+            for board in game_data.rounds:
+                for q in board.questions:
+                    q.text = f"{q.text} {rng.choice(words)} {rng.choice(words)}"
+                    q.category = f"{q.category} {words[game_id % 100]}"
+            index_game(game_id, game_data, conn=conn)
+        print(f"indexed {n_games} games in {time.perf_counter() - start:.1f} s")
+
+        for name, query in queries.items():
+            fts = timeit(lambda: search_clues(**query, conn=conn), args.repeat)
+            line = f"{name:18s} fts {fts:8.2f} ms"
+            if "keyword" in query and "value" not in query and "date_from" not in query:
+                like = " AND ".join("text LIKE ?" for _ in query["keyword"].split())
+                patterns = [f"%{w}%" for w in query["keyword"].split()]
+                scan = timeit(
+                    lambda: conn.execute(
+                        f"SELECT * FROM clues WHERE {like} ORDER BY id LIMIT 50", patterns
+                    ).fetchall(),
+                    args.repeat,
+                )
+                line += f"  LIKE scan {scan:8.2f} ms  ({scan / fts:6.1f}x)"
+            print(line)
+
+        # results come back in the order the games were indexed
+        results = search_clues(keyword="word4321", limit=1000, conn=conn)
+        conn.close()
+    order = [(int(r.game_id), r.round) for r in results]
+    if order != sorted(order) or not results:
+        print("FAILED: results are not in the order the games were indexed")
+        sys.exit(1)
+
+
+def bench_board(args):
+    """clue lookup and round-completion checks of Board against the linear scans they replaced"""
+    from jparty.retrieve import process_game_board_from_html
+
+    def linear_get_question(board, i, j):
+        for q in board.questions:
+            if q.index == (i, j):
+                return q
+        return None
+
+    boards = []
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is not None:
+            boards += [b for b in game_data.rounds if b.complete() and len(b.questions) == 30]
+    if not boards:
+        print("no complete boards in the saved games")
+        return
+    cells = [(i, j) for i in range(6) for j in range(5)]
+
+    for board in boards:
+        for i, j in cells:
+            if board.get_question(i, j) is not linear_get_question(board, i, j):
+                print(f"MISMATCH: get_question({i}, {j})")
+                sys.exit(1)
+
+    def load_rounds(get):
+        # BoardWidget.load_round looks up all 30 cells
+        for board in boards:
+            for i, j in cells:
+                get(board, i, j)
+
+    def play_rounds(finished):
+        # Game.back_to_board checks for the end of the round after every clue
+        for board in boards:
+            for q in board.questions:
+                q.complete = False
+            board.remaining = len(board.questions)
+            for q in board.questions:
+                board.complete_question(q)
+                finished(board)
+            for q in board.questions:
+                q.complete = False
+            board.remaining = len(board.questions)
+
+    repeat = max(args.repeat, 20)
+    results = [
+        (
+            "lookup",
+            timeit(lambda: load_rounds(linear_get_question), repeat),
+            timeit(lambda: load_rounds(lambda b, i, j: b.get_question(i, j)), repeat),
+        ),
+        (
+            "completion",
+            timeit(lambda: play_rounds(lambda b: all(q.complete for q in b.questions)), repeat),
+            timeit(lambda: play_rounds(lambda b: b.finished()), repeat),
+        ),
+    ]
+    print(f"{len(boards)} boards")
+    for name, before, after in results:
+        print(f"{name}: scan {before:7.3f} ms  grid {after:7.3f} ms  ({before / after:5.1f}x)")
+
+
+def bench_timers(args):
+    """question timer pause / resume cycles must not start threads or leak scheduled entries"""
+    import threading
+    from jparty.scheduler import Scheduler, QuestionTimer
+
+    scheduler = Scheduler()
+    fired = []
+    timer = QuestionTimer(60, fired.append, "slow", scheduler=scheduler)
+    timer.start()
+    timer.pause()
+    threads = threading.active_count()
+
+    cycles = 1000
+    start = time.perf_counter()
+    for _ in range(cycles):
+        timer.resume()
+        timer.pause()
+    elapsed = (time.perf_counter() - start) * 1000
+    grown = threading.active_count() - threads
+    print(f"{cycles} pause / resume cycles: {elapsed:.1f} ms, {grown} new threads, "
+          f"{scheduler.pending()} pending, {timer.remaining():.2f} s remaining")
+
+    fast = QuestionTimer(0.05, fired.append, "fast", scheduler=scheduler)
+    for _ in range(cycles):
+        fast.resume()
+        fast.pause()
+    fast.resume()
+    fast.resume()  # resuming a running timer does nothing
+    time.sleep(0.2)
+    print(f"fired: {fired}")
+
+    if grown > 0 or scheduler.pending() != 0 or fired != ["fast"]:
+        print("FAILED")
+        sys.exit(1)
+
+
+# games per second on one core the headless engine should reach ("thousands of full games per
+# second"); a game is ~400 transitions through the presenter, scheduler and score history
+ENGINE_TARGET = 1000
+
+
+def bench_engine(args):
+    """full games per second on the headless engine, with random contestants"""
+    from jparty.retrieve import process_game_board_from_html
+    from jparty.simulation import GameSimulator
+
+    games = 0
+    elapsed = 0
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is None or not all(b.complete() for b in game_data.rounds):
+            continue
+        simulator = GameSimulator(game_data, players=3, seed=0)
+        simulator.play()  # not timed: imports numpy and warms up the caches
+        n = max(args.repeat, 200)
+        start = time.perf_counter()
+        for _ in range(n):
+            engine = simulator.play()
+            if not all(b.finished() for b in game_data.rounds[:-1]):
+                print(f"FAILED: game {game_id} ended with clues left")
+                sys.exit(1)
+            if engine.scheduler.pending():
+                print(f"FAILED: game {game_id} ended with timers pending")
+                sys.exit(1)
+        t = time.perf_counter() - start
+        games += n
+        elapsed += t
+        clues = engine.question_number
+        print(
+            f"{game_id}: {n} games in {t * 1000:.0f} ms ({n / t:.0f} games/s, "
+            f"{t / n * 1000:.2f} ms per game, {t / n / clues * 1e6:.1f} us per clue)"
+        )
+
+    if games:
+        rate = games / elapsed
+        print(f"total: {rate:.0f} games/s (target {ENGINE_TARGET} games/s on one core)")
+        if rate < ENGINE_TARGET:
+            # not a failure of the rules, and left open: a clue is ~30 presenter hooks (7 of
+            # them lectern updates), a response timer and a few score writes, each a Python call
+            print(f"OPEN: {ENGINE_TARGET / rate:.1f}x short of the target")
+
+
+def bench_journal(args):
+    """cost of journaling a game, and whether replaying its journal rebuilds the game"""
+    import tempfile
+    from pathlib import Path
+    import numpy as np
+    from jparty.engine import GameEngine
+    from jparty.journal import GameJournal, read_journal, replay
+    from jparty.retrieve import process_game_board_from_html
+    from jparty.scheduler import SimulatedScheduler
+    from jparty.simulation import GameSimulator, HeadlessPresenter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for game_id in saved_game_ids(args):
+            html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+            game_data = process_game_board_from_html(html, game_id)
+            if game_data is None or not all(b.complete() for b in game_data.rounds):
+                continue
+            path = Path(tmp) / f"{game_id}.jsonl"
+            journal = GameJournal(path)
+            simulator = GameSimulator(game_data, players=3, seed=0, journal=journal)
+            played = simulator.play()
+            journal.close()
+            records = read_journal(path)
+            if records[-1] != ["end"]:
+                print(f"FAILED: journal of game {game_id} does not end the game")
+                sys.exit(1)
+
+            def resumed(n):
+                simulator.reset_data()
+                engine = GameEngine(HeadlessPresenter(simulator.rng), SimulatedScheduler())
+                engine.data = game_data
+                replay(engine, records[:n])
+                engine.resume()
+                return engine
+
+            # a crash just before the end rebuilds the whole game
+            engine = resumed(len(records) - 1)
+            if not np.array_equal(engine.scores.totals(), played.scores.totals()):
+                print(f"FAILED: game {game_id} replayed other scores")
+                sys.exit(1)
+            for p, q in zip(engine.players, played.players):
+                if (p.token, p.score) != (q.token, q.score):
+                    print(f"FAILED: game {game_id} replayed {p.name} with score {p.score}")
+                    sys.exit(1)
+            if not all(b.finished() for b in game_data.rounds[:-1]):
+                print(f"FAILED: game {game_id} replayed with clues left")
+                sys.exit(1)
+            # a crash anywhere else can be resumed
+            for n in range(1, len(records)):
+                resumed(n)
+            # a clue judged but not closed goes back on the board, the judgement undone
+            n = next(n for n, r in enumerate(records) if r[0] == "judge")
+            opened = max(i for i in range(n) if records[i][0] == "open")
+            before = [p.score for p in resumed(opened).players]
+            engine = resumed(n + 1)
+            _, r, i, j = records[opened]
+            if game_data.rounds[r].get_question(i, j).complete or [
+                p.score for p in engine.players
+            ] != before:
+                print(f"FAILED: game {game_id} replayed a clue that was not closed as played")
+                sys.exit(1)
+
+            replay_ms = timeit(lambda: resumed(len(records) - 1), args.repeat)
+            size = path.stat().st_size
+            journal = GameJournal(path)
+            n = 100000
+            start = time.perf_counter()
+            for i in range(n):
+                journal.append("judge", i % 3, i)
+            append_us = (time.perf_counter() - start) / n * 1e6
+            journal.close()
+            print(
+                f"{game_id}: {len(records)} records, {size} bytes, "
+                f"append {append_us:.1f} us, replay {replay_ms:.2f} ms, "
+                f"{journal.batches} batched writes"
+            )
+
+
+def bench_arbitration(args):
+    """how often the earliest press wins a close race, by arrival order and by estimated press time"""
+    import random
+
+    from jparty.buzz_arbiter import BuzzArbiter, ClockSync
+    from jparty.constants import BUZZ_COMPENSATION_MARGIN, BUZZ_MAX_COMPENSATION, BUZZ_WINDOW
+
+    rng = random.Random(0)
+    # one way latency in seconds: fixed part, mean of the exponential Wi-Fi jitter
+    links = [(0.002, 0.001), (0.010, 0.004), (0.035, 0.015)]
+    offsets = [rng.uniform(-1000, 1000) for _ in links]  # phone clock minus ours
+
+    def delay(link):
+        base, jitter = links[link]
+        return base + rng.expovariate(1 / jitter)
+
+    syncs = [ClockSync() for _ in links]
+    now = 0.0
+    for _ in range(16):
+        for i, sync in enumerate(syncs):
+            t0 = now
+            tc = t0 + delay(i) + offsets[i]
+            t1 = tc - offsets[i] + delay(i)
+            sync.add_sync(t0, tc, t1)
+            sync.add_rtt(delay(i) + delay(i))
+        now += 2
+    for i, sync in enumerate(syncs):
+        error = (sync.offset - offsets[i]) * 1000
+        print(f"player {i}: rtt {sync.rtt * 1000:.1f} ms, offset error {error:+.1f} ms")
+
+    def race(presses, use_clock):
+        """players by estimated press, as decided by an arbiter, of the buzzes that made the window"""
+        arrivals = sorted((press + delay(i), i) for i, press in enumerate(presses))
+        windows = []
+        decided = []
+        arbiter = BuzzArbiter(decided.extend, lambda d, f: windows.append(f), BUZZ_WINDOW)
+        first = arrivals[0][0]
+        for arrival, i in arrivals:
+            if arrival - first > BUZZ_WINDOW:
+                break
+            client_time = presses[i] + offsets[i] if use_clock else None
+            press = syncs[i].press_time(
+                arrival, client_time, BUZZ_MAX_COMPENSATION, BUZZ_COMPENSATION_MARGIN
+            )
+            arbiter.submit(i, press, arrival)
+        windows[0]()
+        return arrivals[0][1], decided[0].player
+
+    n = max(args.repeat, 5000)
+    fair = {"arrival order": 0, "round trip time": 0, "round trip time and clock": 0}
+    for _ in range(n):
+        presses = [now + rng.uniform(0, 0.03) for _ in links]
+        earliest = presses.index(min(presses))
+        by_arrival, by_rtt = race(presses, use_clock=False)
+        _, by_clock = race(presses, use_clock=True)
+        fair["arrival order"] += by_arrival == earliest
+        fair["round trip time"] += by_rtt == earliest
+        fair["round trip time and clock"] += by_clock == earliest
+        now += 1
+    for name, wins in fair.items():
+        print(f"earliest press won by {name}: {wins / n:.1%} of {n} races within 30 ms")
+    if fair["round trip time and clock"] < fair["arrival order"]:
+        print("FAILED: arbitration was less fair than arrival order")
+        sys.exit(1)
+
+    # a phone whose clock jumped since the last sync, or that lies about its press time, gets
+    # no more head start than its round trip time explains
+    limit = syncs[0].rtt / 2 + BUZZ_COMPENSATION_MARGIN
+    for skew in (-1, -0.1, 0.1, 1):
+        arrival = now + delay(0)
+        press = syncs[0].press_time(
+            arrival, now + offsets[0] + skew, BUZZ_MAX_COMPENSATION, BUZZ_COMPENSATION_MARGIN
+        )
+        if not arrival - limit <= press <= arrival:
+            print(f"FAILED: a clock {skew:+} s off moved a buzz back {(arrival - press) * 1000:.0f} ms")
+            sys.exit(1)
+    print(f"clock off by up to 1 s: buzz moved back at most {limit * 1000:.1f} ms")
+
+
+def bench_gate(args):
+    """buzz gate under contention: one winner per clue, and the cost of turning a buzz away"""
+    import threading
+
+    from jparty.buzz_arbiter import BuzzGate, Claim
+    from jparty.model import Player
+
+    players = [Player(f"p{i}", None, i) for i in range(8)]
+    gate = BuzzGate()
+    clues = max(args.repeat, 2000)
+    wins = []
+    barrier = threading.Barrier(len(players) + 1)
+
+    def contestant(player):
+        for _ in range(clues):
+            barrier.wait()  # responses are open
+            claim = gate.claim(player)
+            if claim is not None:
+                wins.append(claim)
+            barrier.wait()  # everyone has buzzed
+
+    threads = [threading.Thread(target=contestant, args=(p,)) for p in players]
+    for t in threads:
+        t.start()
+    for _ in range(clues):
+        gate.open()
+        barrier.wait()
+        barrier.wait()
+        gate.close()
+    for t in threads:
+        t.join()
+    generations = [c.generation for c in wins]
+    print(f"{clues} clues, {len(players)} threads buzzing on each: {len(wins)} winners")
+    if len(wins) != clues or len(set(generations)) != clues:
+        print("FAILED: the gate did not pick exactly one winner per clue")
+        sys.exit(1)
+
+    # a claim made before the clue closed must not win it afterwards
+    gate.open()
+    claim = gate.claim(players[0])
+    gate.close()
+    if gate.won(claim):
+        print("FAILED: a stale claim won")
+        sys.exit(1)
+
+    # nor can a claim paired with the generation that locks its player out
+    gate.open(locked_out=players[0])
+    stale = Claim(players[0], gate.generation, time.monotonic())
+    if gate.claim(players[0]) is not None or gate.won(stale):
+        print("FAILED: a locked out player claimed the clue")
+        sys.exit(1)
+    gate.close()
+
+    gate.open()
+    gate.claim(players[0])
+    lose = timeit(lambda: [gate.claim(players[1]) for _ in range(1000)], args.repeat)
+    print(f"turning a buzz away at the gate: {lose:.3f} us")
+
+
+def bench_wire(args):
+    """encode cost and frame size of the websocket messages, compact frames against the JSON envelope"""
+    from jparty import wire
+
+    state = {
+        "name": "Alex",
+        "score": 12400,
+        "player_number": 2,
+        "active": True,
+        "buzzed": False,
+        "finalanswer": None,
+    }
+    messages = [
+        ("TOOLATE", ""),
+        ("PROMPTANSWER", ""),
+        ("PROMPTWAGER", "12400"),
+        ("EXISTS", {"page": "buzz", "score": 12400}),
+        ("PLAYER_STATE", state),
+    ]
+
+    def envelope(msg, text):
+        # the format before version 1: state encoded into a string, then again in the envelope
+        if not isinstance(text, str):
+            text = json.dumps(text)
+        return json.dumps({"message": msg, "text": text})
+
+    for msg, text in messages:
+        old = envelope(msg, text)
+        new = wire.encode(msg, text)
+        if wire.encode(msg, text, 0) != old:
+            print(f"FAILED: version 0 {msg} frame differs from the old format")
+            sys.exit(1)
+        old_ms = timeit(lambda: [envelope(msg, text) for _ in range(1000)], args.repeat)
+        new_ms = timeit(lambda: [wire.encode(msg, text) for _ in range(1000)], args.repeat)
+        print(
+            f"{msg:<13} {len(old):4d} -> {len(new):4d} bytes, "
+            f"encode {old_ms:.3f} -> {new_ms:.3f} us"
+        )
+
+    buzz = "b" + repr(123456.789)
+    old_buzz = json.dumps({"message": "BUZZ", "text": repr(123456.789)})
+    old_ms = timeit(lambda: [json.loads(old_buzz)["text"] for _ in range(1000)], args.repeat)
+    new_ms = timeit(lambda: [buzz[1:] for _ in range(1000) if buzz[:1] == wire.BUZZ], args.repeat)
+    print(f"BUZZ          {len(old_buzz):4d} -> {len(buzz):4d} bytes, decode {old_ms:.3f} -> {new_ms:.3f} us")
+
+
+def bench_lecterns(args):
+    """lectern frames and bytes sent in a simulated game, a full state per update against the hub"""
+    from jparty import wire
+    from jparty.lectern_hub import LecternHub
+    from jparty.pubsub import PubSubHub
+    from jparty.retrieve import process_game_board_from_html
+    from jparty.simulation import GameSimulator, HeadlessPresenter
+
+    class Lectern(object):
+        version = wire.VERSION
+
+        def __init__(self):
+            self.frames = []
+
+        def write_frame(self, frame):
+            self.frames.append(frame)
+
+    for game_id in saved_game_ids(args):
+        html = (args.games / f"{game_id}.html").read_text(encoding="utf-8")
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is None or not all(b.complete() for b in game_data.rounds):
+            continue
+
+        ticks = []
+        hub = LecternHub(PubSubHub(ticks.append))
+        lecterns = [Lectern() for _ in range(3)]
+        full_frames = []
+        last_states = {}
+
+        class LecternPresenter(HeadlessPresenter):
+            # like QtPresenter.lectern_update, every host action ends an event loop tick
+            def lectern_update(self, player, buzzed, active, show_final_answer):
+                state = {
+                    "name": player.name,
+                    "score": player.score,
+                    "player_number": player.player_number,
+                    "active": active,
+                    "buzzed": buzzed,
+                    "finalanswer": player.finalanswer if show_final_answer else None,
+                }
+                full_frames.append(wire.encode("PLAYER_STATE", state, 0))
+                last_states[player.player_number] = state
+                hub.update(player.player_number, state)
+
+            def activate(self, *idents):
+                super().activate(*idents)
+                while ticks:
+                    ticks.pop(0)()
+
+        for i, lectern in enumerate(lecterns):
+            hub.connect(i, lectern, None)
+        GameSimulator(game_data, players=3, seed=0, presenter=LecternPresenter).play()
+        while ticks:
+            ticks.pop(0)()
+
+        frames = [f for lectern in lecterns for f in lectern.frames[1:]]  # not the connect frames
+        print(
+            f"{game_id}: {len(full_frames)} full state frames, {sum(map(len, full_frames))} bytes -> "
+            f"{len(frames)} frames, {sum(map(len, frames))} bytes"
+        )
+        print(f"  hub: {hub}")
+        if hub.published != len(frames) or hub.updates != len(full_frames):
+            print("FAILED: the hub's counts do not match the frames sent")
+            sys.exit(1)
+        # what a lectern shows after applying the frames must be the last state of its player
+        for i, lectern in enumerate(lecterns):
+            shown = {}
+            for frame in lectern.frames:
+                if frame[0] == wire.SERVER_OPCODES["PLAYER_STATE"]:
+                    shown = json.loads(frame[1:])
+                elif frame[0] == wire.SERVER_OPCODES["PLAYER_DELTA"]:
+                    shown.update(json.loads(frame[1:]))
+            if shown != last_states[i]:
+                print(f"FAILED: lectern {i} does not show the last state of its player")
+                sys.exit(1)
+
+
+def bench_fanout(args):
+    """publishing to hundreds of spectators: frames encoded, time to deliver, longest IOLoop stall"""
+    from jparty import wire
+    from jparty.pubsub import PubSubHub
+
+    class Spectator(object):
+        version = wire.VERSION
+
+        def __init__(self):
+            self.frames = 0
+
+        def write_frame(self, frame):
+            self.frames += 1
+
+    board = {
+        "categories": [f"category {i}" for i in range(6)],
+        "values": [[200 * (j + 1) for j in range(5)] for _ in range(6)],
+        "active": [2, 3],
+    }
+    for n in (10, 100, 500):
+        callbacks = []
+        hub = PubSubHub(callbacks.append)
+        spectators = [Spectator() for _ in range(n)]
+        for spectator in spectators:
+            hub.subscribe("board", spectator)
+
+        messages = 100
+        stalls = []
+        start = time.perf_counter()
+        for _ in range(messages):
+            hub.publish("board", "BOARD", board)
+        while callbacks:
+            callback_start = time.perf_counter()
+            callbacks.pop(0)()
+            stalls.append(time.perf_counter() - callback_start)
+        elapsed = time.perf_counter() - start
+
+        naive = timeit(lambda: [wire.encode("BOARD", board) for _ in range(n)], args.repeat)
+        print(
+            f"{n:3d} spectators: {messages} messages delivered in {elapsed * 1000:.1f} ms, "
+            f"{hub.encoded} frames encoded, longest IOLoop callback {max(stalls) * 1000:.3f} ms, "
+            f"encoding per spectator would take {naive:.2f} ms per message"
+        )
+        if any(s.frames != messages for s in spectators) or hub.encoded != messages:
+            print("FAILED: every spectator must get every message, encoded once")
+            sys.exit(1)
+
+
+def bench_players(args):
+    """player lookups of the registry against the linear scans they replaced, and a reconnect storm"""
+    from jparty.model import Player
+    from jparty.player_registry import PlayerRegistry
+
+    class Socket(object):
+        pass
+
+    players = [Player(f"p{i}", Socket(), i) for i in range(8)]
+    registry = PlayerRegistry()
+    for p in players:
+        registry.add(p)
+    tokens = [p.token.hex() for p in players] * 1000
+
+    def scan():
+        for token in tokens:
+            next((p for p in players if p.token.hex() == token), None)
+
+    def lookup():
+        for token in tokens:
+            registry.with_token(token)
+
+    scanned, indexed = timeit(scan, args.repeat), timeit(lookup, args.repeat)
+    print(
+        f"{len(tokens)} token lookups: {scanned:.2f} ms scanning, {indexed:.2f} ms indexed "
+        f"({scanned / indexed:.0f}x)"
+    )
+
+    # every phone drops and rejoins a few times, closes of old sockets arriving late
+    old = {}
+    start = time.perf_counter()
+    for _ in range(100):
+        for p in players:
+            old[p] = p.waiter
+            registry.bind(registry.with_token(p.token.hex()), Socket())
+        for p in players:
+            registry.unbind(old[p])
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{100 * len(players)} reconnects in {elapsed:.2f} ms")
+    if any(registry.with_socket(p.waiter) is not p or registry.with_socket(old[p]) for p in players):
+        print("FAILED: each player must be reachable by its newest socket only")
+        sys.exit(1)
+    if any(registry.with_number(p.player_number) is not p for p in players):
+        print("FAILED: player numbers must resolve to their players")
+        sys.exit(1)
+
+
+def bench_audio(args):
+    """trigger to playback latency of the audio engine, against decoding a wav per play"""
+    from jparty.audio import AudioEngine, NullBackend, load_cue
+    from jparty.constants import REPO_ROOT
+
+    data = REPO_ROOT / "jparty" / "data"
+    cues = {name: data / f"{name}.wav" for name in ("dd", "stumped")}
+    for name, path in cues.items():
+        print(f"decode {name}.wav per play: {timeit(lambda: load_cue(name, path), args.repeat):.2f} ms")
+
+    backend = NullBackend()
+    engine = AudioEngine(backend, cues)
+    n = 1000
+    for i in range(n):
+        engine.play("dd" if i % 2 else "stumped").result()
+    print(f"{n} overlapping plays, trigger to playback: {engine.latency}")
+
+    # a looping cue is restarted every time it ends, until it is stopped
+    engine.stop()
+    before = len(backend.played)
+    engine.play("stumped", loop=True).result()
+    time.sleep(engine.cues["stumped"].duration * 3.5)
+    engine.stop("stumped")
+    time.sleep(engine.cues["stumped"].duration * 1.5)
+    plays = backend.played[before:].count("stumped")
+    engine.close()
+    print(f"loop: played {plays} times in 3.5 lengths of the cue")
+    if plays != 4:
+        print("FAILED: the loop did not restart once per length of the cue, or did not stop")
+        sys.exit(1)
+
+
+# startup budget of `run.py --profile-startup`, medians in ms
+STARTUP_IMPORT_BUDGET = 700
+STARTUP_FIRST_FRAME_BUDGET = 1500
+
+# two virtual screens, as JParty needs a second monitor
+OFFSCREEN_SCREENS = {
+    "screens": [
+        {"name": f"screen{i}", "x": 1280 * i, "y": 0, "width": 1280, "height": 800,
+         "logicalDpi": 96, "logicalBaseDpi": 96, "dpr": 1}
+        for i in range(2)
+    ]
+}
+
+
+def bench_startup(args):
+    """import time and time to first frame of the app, fails if they are over budget"""
+    import json
+    import os
+    import subprocess
+    import tempfile
+    from jparty.constants import REPO_ROOT
+    from jparty.startup_profile import FLAG, REPORT_PREFIX
+
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.offscreen:
+            config = os.path.join(tmp, "screens.json")
+            with open(config, "w") as f:
+                json.dump(OFFSCREEN_SCREENS, f)
+            env["QT_QPA_PLATFORM"] = f"offscreen:configfile={config}"
+
+        runs = []
+        for _ in range(args.repeat):
+            r = subprocess.run(
+                [sys.executable, str(REPO_ROOT / "run.py"), FLAG],
+                cwd=REPO_ROOT,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=120,
+            )
+            reports = [l for l in r.stdout.splitlines() if l.startswith(REPORT_PREFIX)]
+            if not reports:
+                print(f"FAILED: no startup profile (exit code {r.returncode})")
+                print(r.stderr[-2000:])
+                sys.exit(1)
+            runs.append(json.loads(reports[-1][len(REPORT_PREFIX):]))
+
+    imports = statistics.median(run["phases"]["imports"] for run in runs)
+    first_frame = statistics.median(run["phases"]["first frame"] for run in runs)
+    print(f"imports: {imports:.0f} ms (budget {STARTUP_IMPORT_BUDGET} ms)")
+    print(f"first frame: {first_frame:.0f} ms (budget {STARTUP_FIRST_FRAME_BUDGET} ms)")
+    packages = {}
+    for run in runs:
+        for package, ms in run["packages"].items():
+            packages.setdefault(package, []).append(ms)
+    for package, times in sorted(packages.items(), key=lambda x: -statistics.median(x[1]))[:10]:
+        print(f"  {package}: {statistics.median(times):.0f} ms")
+
+    if imports > STARTUP_IMPORT_BUDGET or first_frame > STARTUP_FIRST_FRAME_BUDGET:
+        print("FAILED: startup is over budget")
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "arbitration": bench_arbitration,
+    "audio": bench_audio,
+    "board": bench_board,
+    "cache": bench_cache,
+    "download": bench_download,
+    "engine": bench_engine,
+    "fanout": bench_fanout,
+    "gate": bench_gate,
+    "journal": bench_journal,
+    "lecterns": bench_lecterns,
+    "parse": bench_parse,
+    "players": bench_players,
+    "search": bench_search,
+    "startup": bench_startup,
+    "timers": bench_timers,
+    "wire": bench_wire,
+}
+
+parser = argparse.ArgumentParser()
+parser.add_argument("benchmark", choices=BENCHMARKS)
+parser.add_argument(
+    "game_ids", nargs="*", help="Saved game ids to use (default: all in --games)", default=None
+)
+parser.add_argument(
+    "--games",
+    type=Path,
+    default=FIXTURE_GAMES,
+    help="Directory of saved game html (default: fixtures/games, use jparty/data/saved_games for your own)",
+)
+parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+parser.add_argument(
+    "--offscreen", action="store_true", help="Run the app without a display (startup)"
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
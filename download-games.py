@@ -1,23 +1,42 @@
 """Script to download games"""
 
-from jparty.retrieve import get_game_html, process_game_board_from_html
-from jparty.constants import SAVED_GAMES
+from jparty.downloader import BulkDownloader, parse_game_ids
+from jparty.constants import DOWNLOAD_RATE, DOWNLOAD_BURST, DOWNLOAD_WORKERS
 import argparse
-import time
 
 parser = argparse.ArgumentParser()
 parser.add_argument(
-    "game_ids", nargs="*", help="List of all game ids you'd like to download", default=None
+    "game_ids",
+    nargs="*",
+    help="List of all game ids you'd like to download, ranges like 100-200 are inclusive",
+    default=None,
+)
+parser.add_argument(
+    "--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent downloads"
+)
+parser.add_argument(
+    "--rate", type=float, default=DOWNLOAD_RATE, help="Requests per second allowed to each host"
+)
+parser.add_argument(
+    "--burst", type=int, default=DOWNLOAD_BURST, help="Back-to-back requests allowed per host"
+)
+parser.add_argument(
+    "--checkpoint", default=None, help="Json file recording progress, reused to resume a run"
+)
+parser.add_argument(
+    "--game-url",
+    default=None,
+    help="Url template with {game_id} to download from instead of the Wayback Machine/J-Archive",
 )
 args = parser.parse_args()
 
-for game_id in args.game_ids:
-    print(f"Working on {game_id}")
-    game_html = get_game_html(game_id)
-    game_obj = process_game_board_from_html(game_html, game_id)
-    if (SAVED_GAMES / f"{game_id}.html").exists():
-        print("Game already saved")
-        continue
-    with (SAVED_GAMES / f"{game_id}.html").open("w+", encoding="utf-8") as f:
-        f.write(game_html)
-    time.sleep(5)
\ No newline at end of file
+downloader = BulkDownloader(
+    workers=args.workers,
+    rate=args.rate,
+    burst=args.burst,
+    checkpoint=args.checkpoint,
+    game_url=args.game_url,
+)
+failed = downloader.run(parse_game_ids(args.game_ids))
+if failed:
+    print(f"Failed: {' '.join(str(game_id) for game_id in sorted(failed))}")
@@ -0,0 +1,184 @@
+import logging
+import queue
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from jparty.metrics import LatencyHistogram
+
+# cue name -> wav file in the data folder
+CUES = {
+    "intro": "intro.wav",
+    "final": "final.wav",
+    "dd": "dd.wav",
+    "stumped": "stumped.wav",
+}
+
+
+@dataclass
+class Cue:
+    name: str
+    audio_data: bytes
+    num_channels: int
+    bytes_per_sample: int
+    sample_rate: int
+
+    @property
+    def duration(self):
+        frames = len(self.audio_data) / (self.num_channels * self.bytes_per_sample)
+        return frames / self.sample_rate
+
+
+def load_cue(name, path):
+    """decode a wav file into a Cue"""
+    with wave.open(str(path), "rb") as f:
+        return Cue(name, f.readframes(f.getnframes()), f.getnchannels(), f.getsampwidth(), f.getframerate())
+
+
+class SimpleaudioBackend(object):
+    """plays cues on the sound card, each playback is its own simpleaudio stream so they overlap"""
+
+    def __init__(self):
+        import simpleaudio
+
+        self.simpleaudio = simpleaudio
+
+    def play(self, cue):
+        return self.simpleaudio.play_buffer(
+            cue.audio_data, cue.num_channels, cue.bytes_per_sample, cue.sample_rate
+        )
+
+
+class NullPlayback(object):
+    def __init__(self, duration, clock):
+        self.clock = clock
+        self.end = clock() + duration
+
+    def is_playing(self):
+        return self.clock() < self.end
+
+    def stop(self):
+        self.end = self.clock()
+
+
+class NullBackend(object):
+    """plays nothing, for headless games and tests, a playback lasts as long as its cue would"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.played = []  # names of the cues played, in order
+
+    def play(self, cue):
+        self.played.append(cue.name)
+        return NullPlayback(cue.duration, self.clock)
+
+
+@dataclass
+class Voice:
+    cue: Cue
+    playback: object
+    loop: bool
+
+
+class AudioEngine(object):
+    """Plays preloaded cues from one playback thread fed by a command queue
+
+    Every cue is decoded once, when the engine is made. play and stop only queue a command, so
+    the GUI thread never waits on the disk or the sound card. Cues can overlap, and looping cues
+    are restarted by the playback thread when they end. The time from a play call to the start
+    of playback is kept in `latency`.
+
+    Args:
+        backend: SimpleaudioBackend, or NullBackend to play nothing
+        cues: {cue name: wav path}
+        poll_interval: seconds between checks for looping cues that ended
+    """
+
+    def __init__(self, backend=None, cues=None, poll_interval=0.02):
+        if cues is None:
+            from jparty.utils import resource_path
+
+            cues = {name: resource_path(file) for name, file in CUES.items()}
+        self.backend = backend if backend is not None else SimpleaudioBackend()
+        self.poll_interval = poll_interval
+        self.latency = LatencyHistogram()
+        self.cues = {}
+        for name, path in cues.items():
+            try:
+                self.cues[name] = load_cue(name, path)
+            except (OSError, EOFError, wave.Error) as e:
+                logging.error(f"Cannot load sound {name} from {path}: {e}")
+        self.__commands = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name="audio", daemon=True)
+        self.__thread.start()
+
+    def play(self, name, loop=False):
+        """start playing a cue, returns a Future that is done once playback started"""
+        future = Future()
+        self.__commands.put(("play", name, loop, time.perf_counter(), future))
+        return future
+
+    def stop(self, name=None):
+        """stop every playback of a cue, or of all cues if name is None"""
+        self.__commands.put(("stop", name, False, time.perf_counter(), None))
+
+    def close(self):
+        self.__commands.put(("close", None, False, time.perf_counter(), None))
+        self.__thread.join(timeout=1)
+
+    def __run(self):
+        voices = []
+        while True:
+            looping = any(v.loop for v in voices)
+            try:
+                command = self.__commands.get(timeout=self.poll_interval if looping else None)
+            except queue.Empty:
+                command = None
+
+            if command is not None:
+                kind, name, loop, queued, future = command
+                if kind == "close":
+                    for v in voices:
+                        v.playback.stop()
+                    return
+                if kind == "stop":
+                    for v in voices:
+                        if name is None or v.cue.name == name:
+                            v.playback.stop()
+                    voices = [v for v in voices if name is not None and v.cue.name != name]
+                elif kind == "play":
+                    voice = self.__start(name, loop, future)
+                    if voice is not None:
+                        self.latency.record((time.perf_counter() - queued) * 1000)
+                        voices.append(voice)
+
+            # restart looping cues that ended and forget the rest
+            playing = []
+            for v in voices:
+                if v.playback.is_playing():
+                    playing.append(v)
+                elif v.loop:
+                    try:
+                        v.playback = self.backend.play(v.cue)
+                    except Exception as e:
+                        logging.error(f"Cannot loop sound {v.cue.name}: {e}")
+                        continue
+                    playing.append(v)
+            voices = playing
+
+    def __start(self, name, loop, future):
+        cue = self.cues.get(name)
+        if cue is None:
+            logging.warning(f"No sound {name} to play")
+            future.set_result(None)
+            return None
+        try:
+            playback = self.backend.play(cue)
+        except Exception as e:
+            logging.error(f"Cannot play sound {name}: {e}")
+            future.set_exception(e)
+            return None
+        future.set_result(playback)
+        return Voice(cue, playback, loop)
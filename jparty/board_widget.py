@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import QWidget, QGridLayout
 from PyQt6.QtGui import QPalette
 
 
-from jparty.game import Board
+from jparty.model import Board
 from jparty.style import MyLabel, CARDPAL, JBLUE, DARKBLUE
 
 
@@ -107,6 +107,7 @@ class BoardWidget(QWidget):
 
         self.questionwidget = None
         self.question_labels = []
+        self.__cards = {}  # id(question) -> QuestionCard showing it
 
         self.grid_layout = QGridLayout()
 
@@ -134,6 +135,7 @@ class BoardWidget(QWidget):
         self.show()
 
     def load_round(self, round):
+        self.__cards = {}
         gl = self.grid_layout
         for x in range(Board.size[0]):
             for y in range(Board.size[1] + 1):
@@ -143,7 +145,17 @@ class BoardWidget(QWidget):
                 else:
                     # Questions
                     q = round.get_question(x, y - 1)
-                    gl.itemAtPosition(y, x).widget().question = q
+                    card = gl.itemAtPosition(y, x).widget()
+                    card.question = q
+                    if q is not None:
+                        self.__cards[id(q)] = card
+
+    def card(self, q):
+        """the card showing question q, None if it is not on the board"""
+        card = self.__cards.get(id(q))
+        if card is None or card.question is not q:
+            return None
+        return card
 
     def resizeEvent(self, event):
         self.grid_layout.setSpacing(self.width() // 150)
@@ -153,6 +165,7 @@ class BoardWidget(QWidget):
         return self.game.current_round
 
     def clear(self):
+        self.__cards = {}
         gl = self.grid_layout
         for x in range(Board.size[0]):
             for y in range(Board.size[1] + 1):
@@ -0,0 +1,189 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+class ClockSync(object):
+    """Round trip time and clock offset of one buzzer connection
+
+    Round trip times come from timestamped websocket pings, answered by the browser's network
+    stack. The offset between the phone's clock and ours comes from SYNC exchanges: we send our
+    time t0, the phone answers with its time tc and we get the answer at t1, so
+    offset = tc - (t0 + t1) / 2. As in NTP, the sample with the shortest round trip is trusted,
+    since it has the least room for asymmetric delays.
+
+    Args:
+        samples: number of recent samples to keep of each kind
+    """
+
+    def __init__(self, samples=16):
+        self.rtts = deque(maxlen=samples)
+        self.syncs = deque(maxlen=samples)  # (round trip, offset)
+
+    def add_rtt(self, rtt):
+        self.rtts.append(rtt)
+
+    def add_sync(self, t0, tc, t1):
+        rtt = t1 - t0
+        if rtt < 0:
+            return
+        self.syncs.append((rtt, tc - (t0 + t1) / 2))
+        self.rtts.append(rtt)
+
+    @property
+    def rtt(self):
+        """shortest recent round trip time in seconds, None before the first sample"""
+        return min(self.rtts) if self.rtts else None
+
+    @property
+    def offset(self):
+        """phone clock minus our clock in seconds, None before the first SYNC answer"""
+        return min(self.syncs)[1] if self.syncs else None
+
+    def press_time(self, arrival, client_time=None, max_compensation=0.3, margin=0.02):
+        """estimated time, on our clock, at which a buzz that arrived at `arrival` was pressed
+
+        The buzz is moved back by at most half the round trip time plus `margin`, and never by
+        more than max_compensation seconds, so a phone cannot claim more head start than its
+        connection explains. Within that, the phone's timestamp of the press is used if it sent
+        one and the clocks are synced. A timestamp that puts the press after the arrival, or more
+        than a round trip before it, means the offset is off, e.g. the phone's clock was changed
+        since the last sync, and it is ignored in favour of half the round trip time.
+        """
+        rtt = self.rtt
+        if rtt is None:
+            return arrival
+        limit = min(rtt / 2 + margin, max_compensation)
+        offset = self.offset
+        if client_time is not None and offset is not None:
+            delay = arrival - (client_time - offset)
+            if -margin <= delay <= rtt + margin:
+                return arrival - min(max(delay, 0), limit)
+        return arrival - min(rtt / 2, limit)
+
+
+@dataclass
+class Buzz:
+    player: object
+    arrival: float
+    press: float
+
+
+class BuzzArbiter(object):
+    """Decides races between buzzes by estimated press time instead of arrival
+
+    The first buzz opens a collection window; buzzes that arrive before it closes are sorted
+    by press time and handed to decide, earliest first, so the earliest player that is
+    allowed to answer claims the BuzzGate. Every race with more than one player is logged with the
+    margins between them, to audit fairness.
+
+    Runs on the IOLoop thread, which also calls submit.
+
+    Args:
+        decide: decide(buzzes) with the Buzz of each player in a window, earliest press first
+        call_later: call_later(delay, f), e.g. IOLoop.call_later
+        window: seconds to collect buzzes for after the first one arrives
+        describe: describe(player) for the log
+    """
+
+    def __init__(self, decide, call_later, window, describe=str):
+        self.decide = decide
+        self.describe = describe
+        self.call_later = call_later
+        self.window = window
+        self.races = 0  # windows with more than one player
+        self.reordered = 0  # races not won by the first buzz to arrive
+        self.__buzzes = None
+
+    def submit(self, player, press, arrival):
+        """add a buzz to the open window, opening one if there is none"""
+        if self.__buzzes is None:
+            self.__buzzes = {}
+            self.call_later(self.window, self.close_window)
+        previous = self.__buzzes.get(player)
+        if previous is None or press < previous.press:
+            self.__buzzes[player] = Buzz(player, arrival, press)
+
+    def close_window(self):
+        buzzes = sorted(self.__buzzes.values(), key=lambda b: b.press)
+        self.__buzzes = None
+        if len(buzzes) > 1:
+            self.log_race(buzzes)
+        self.decide(buzzes)
+
+    def log_race(self, buzzes):
+        self.races += 1
+        winner = buzzes[0]
+        first_arrival = min(buzzes, key=lambda b: b.arrival)
+        decision = f"buzz race won by {self.describe(winner.player)}"
+        decision += f" (compensated {(winner.arrival - winner.press) * 1000:.1f} ms)"
+        if first_arrival is not winner:
+            self.reordered += 1
+            decision += f", first to arrive was {self.describe(first_arrival.player)}"
+        margins = ", ".join(
+            f"{self.describe(b.player)} pressed +{(b.press - winner.press) * 1000:.1f} ms"
+            f" and arrived {(b.arrival - winner.arrival) * 1000:+.1f} ms"
+            for b in buzzes[1:]
+        )
+        logging.info(f"{decision}: {margins}")
+
+
+@dataclass
+class Claim:
+    player: object
+    generation: int
+    decided: float  # time.monotonic() of the claim
+
+
+class BuzzGate(object):
+    """Who gets a clue, decided on the thread the buzz arrives on
+
+    While responses are open the gate holds a single token, and the first buzz to pop it wins,
+    without a lock: list.pop is atomic. Every open and close starts a new generation, so a
+    claim that raced with the clue closing is recognised as stale by `won`, and later buzzes
+    are turned away without waiting for the GUI thread.
+
+    open and close are called by the game, claim from any thread.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self.accepting = False
+        self.locked_out = None  # the player who already answered this clue
+        self.__token = []
+
+    def open(self, locked_out=None):
+        self.locked_out = locked_out
+        self.generation += 1
+        # the token carries who is locked out, so claim never pairs a token with the lockout of
+        # another generation
+        self.__token = [(self.generation, locked_out)]
+        self.accepting = True
+
+    def close(self):
+        self.accepting = False
+        self.generation += 1
+        self.__token = []
+
+    def claim(self, player):
+        """a Claim if player is the first to buzz since responses opened, None otherwise"""
+        token = self.__token
+        try:
+            generation, locked_out = token[0]
+        except IndexError:
+            return None
+        if player is locked_out:
+            return None
+        # each list only ever holds its one token, so this pops the token that was checked
+        try:
+            token.pop()
+        except IndexError:
+            return None
+        return Claim(player, generation, time.monotonic())
+
+    def won(self, claim):
+        """whether responses are still open for the clue claim was made on"""
+        if claim.player is self.locked_out:
+            return False
+        return claim.generation == self.generation
@@ -6,9 +6,11 @@ function sleep(ms) {
 
 var last_buzz = new Date().getTime();
 
-async function buzz() {
+async function buzz(event) {
+    // time of the touch on this phone's clock, the server corrects it for the clock offset
+    var pressed = (event && event.timeStamp) ? event.timeStamp : performance.now();
     if (!$("#buzzer").prop("disabled")) {
-        send("BUZZ");
+        send("BUZZ", String(pressed));
         $("#buzzer").prop("disabled", true);
 
         setTimeout(function () {
@@ -60,9 +62,16 @@ function getToken() {
   return "";
 }
 
+// wire protocol version 1: a one letter opcode, then the payload (see jparty/wire.py)
+const PROTOCOL_VERSION = 1;
+const OPCODES = {BUZZ: "b", SYNC: "y", NAME: "n", CHECK_IF_EXISTS: "c", WAGER: "w", ANSWER: "a"};
+const MESSAGES = {
+    n: "NEW", t: "TOKEN", e: "EXISTS", g: "GAMESTARTED", f: "FULL", w: "PROMPTWAGER",
+    a: "PROMPTANSWER", l: "TOOLATE", x: "LOCKEDOUT", y: "SYNC"
+};
+
 function send(msg, text="") {
-    var message = {message:msg, text: text};
-    updater.socket.send(JSON.stringify(message));
+    updater.socket.send(OPCODES[msg] + text);
 }
 function wagerForm() {
     var amount =$("input[name='wager']").val().replace(/[\s,]/g, '');
@@ -128,7 +137,7 @@ $(document).ready(function() {
     if (cookie != "") {
         console.log("checking token "+cookie)
         updater.socket.onopen = function (event) {
-            updater.socket.send(JSON.stringify({message:"CHECK_IF_EXISTS", text:cookie}));
+            send("CHECK_IF_EXISTS", cookie);
         };
     } else {
         console.log("no cookie")
@@ -174,13 +183,18 @@ var updater = {
     socket: null,
 
     start: function() {
-        var url = "ws://" + location.host + "/buzzersocket";
+        var url = "ws://" + location.host + "/buzzersocket?v=" + PROTOCOL_VERSION;
         updater.socket = new WebSocket(url);
         updater.socket.onclose = function(event) { location.reload(true); };
         updater.socket.onmessage = function(event) {
-            jsondata = JSON.parse(event.data);
-            switch (jsondata.message) {
-                case "GAMEFULL":
+            var received = performance.now();
+            var message = MESSAGES[event.data.charAt(0)];
+            var text = event.data.substring(1);
+            switch (message) {
+                case "SYNC":
+                    send("SYNC", text + "," + received);
+                    break;
+                case "FULL":
                     alert("Game has too many players!")
                     window.location.reload()
                     break;
@@ -189,25 +203,32 @@ var updater = {
                     break;
                 case "TOKEN":
                     load_page("buzz");
-                    setToken(jsondata.text);
+                    setToken(text);
                     break;
                 case "NEW":
                     load_page("name");
                     resizeCanvas();
                     break;
                 case "EXISTS":
-                    console.log("Already exists" + jsondata.text);
-                    state = JSON.parse(jsondata.text);
+                    console.log("Already exists" + text);
+                    state = JSON.parse(text);
                     set_max_wager(state.score);
                     load_page(state.page);
                     break;
                 case "PROMPTWAGER":
-                    set_max_wager(jsondata.text);
+                    set_max_wager(text);
                     load_page("wager");
                     break;
                 case "PROMPTANSWER":
                     load_page("answer");
                     break;
+                case "LOCKEDOUT":
+                    // someone else got the clue, or this player already answered it
+                    $("#buzzer").addClass("locked-out");
+                    setTimeout(function () {
+                        $("#buzzer").removeClass("locked-out");
+                    }, 500);
+                    break;
                 case "TOOLATE":
                     answerForm();
                     break;
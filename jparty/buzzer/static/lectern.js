@@ -1,3 +1,7 @@
+// wire protocol version 1: a one letter opcode, then the payload (see jparty/wire.py)
+const PROTOCOL_VERSION = 1;
+const MESSAGES = {s: "PLAYER_STATE", d: "PLAYER_DELTA", z: "NO_PLAYER"};
+
 var updater = {
     socket: null,
     playerNumber: null,
@@ -7,10 +11,11 @@ var updater = {
     lightsInterval: null,
     lightsRunning: false,
     currentLightStage: 0,
+    state: {},
 
     start: function() {
         this.playerNumber = typeof playerNumber !== 'undefined' ? playerNumber : 0;
-        var url = "ws://" + location.host + "/lecternsocket?player=" + this.playerNumber;
+        var url = "ws://" + location.host + "/lecternsocket?player=" + this.playerNumber + "&v=" + PROTOCOL_VERSION;
         updater.socket = new WebSocket(url);
         
         updater.socket.onopen = function(event) {
@@ -19,8 +24,7 @@ var updater = {
         };
         
         updater.socket.onmessage = function(event) {
-            var jsondata = JSON.parse(event.data);
-            updater.handleMessage(jsondata);
+            updater.handleMessage(MESSAGES[event.data.charAt(0)], event.data.substring(1));
         };
         
         updater.socket.onerror = function(error) {
@@ -33,16 +37,23 @@ var updater = {
         };
     },
 
-    handleMessage: function(jsondata) {
-        switch (jsondata.message) {
+    handleMessage: function(message, text) {
+        switch (message) {
             case "PLAYER_STATE":
-                updater.updatePlayerState(JSON.parse(jsondata.text));
+                updater.state = JSON.parse(text);
+                updater.updatePlayerState(updater.state);
+                break;
+            case "PLAYER_DELTA":
+                // only the fields that changed since the last state
+                Object.assign(updater.state, JSON.parse(text));
+                updater.updatePlayerState(updater.state);
                 break;
             case "NO_PLAYER":
+                updater.state = {};
                 updater.showNoPlayer();
                 break;
             default:
-                console.log("Unknown message:", jsondata.message);
+                console.log("Unknown message:", message);
         }
     },
 
@@ -9,4 +9,31 @@ REPO_ROOT = Path(__file__).resolve().parent.parent
 SAVED_GAMES = REPO_ROOT / "jparty" / "data" / "saved_games"
 SAVED_GAMES.mkdir(parents=True, exist_ok=True)
 QUESTION_MEDIA = REPO_ROOT / "jparty" / "data" / "question_media"
-QUESTION_MEDIA.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+QUESTION_MEDIA.mkdir(parents=True, exist_ok=True)
+GAME_PACKS = REPO_ROOT / "jparty" / "data" / "game_packs"
+GAME_PACKS.mkdir(parents=True, exist_ok=True)
+MEDIA_MANIFEST = REPO_ROOT / "jparty" / "data" / "media_manifest.json"
+GAME_CACHE = REPO_ROOT / "jparty" / "data" / "game_cache"
+GAME_CACHE.mkdir(parents=True, exist_ok=True)
+HTTP_CACHE = REPO_ROOT / "jparty" / "data" / "http_cache"
+HTTP_CACHE.mkdir(parents=True, exist_ok=True)
+JOURNAL = REPO_ROOT / "jparty" / "data" / "journal.jsonl"
+JOURNAL_FLUSH_INTERVAL = 0.5  # seconds between batched journal writes
+GAME_SCORES = REPO_ROOT / "jparty" / "data" / "game_scores"
+SAVE_SCORE_GRAPHS = True  # also write the end of game graphs to GAME_SCORES
+CLUE_INDEX = REPO_ROOT / "jparty" / "data" / "clue_index.sqlite"
+GAME_POOL_SIZE = 3  # games kept ready for the Random button
+GAME_POOL_MAX_BYTES = 8 * 1024 * 1024
+# a Wayback Machine game is two requests to web.archive.org (cdx lookup and snapshot) and the
+# old download loop slept 5 s after each game: pairs at 0.4 requests/s keep that load on a host,
+# with the fetch time the old loop added on top hidden by concurrent workers
+DOWNLOAD_RATE = 0.4  # requests per second to each host
+DOWNLOAD_BURST = 2  # requests a host may receive back to back
+DOWNLOAD_WORKERS = 2
+GAME_FETCH_DEADLINE = 30  # seconds to get a game page from any source
+GAME_FETCH_HEDGE_DELAY = 2  # seconds before the next source is raced against a slow one
+PING_INTERVAL = 0.19  # seconds between timestamped pings to each buzzer
+CLOCK_SYNC_EVERY = 10  # pings between clock syncs with each buzzer
+BUZZ_WINDOW = 0.06  # seconds to collect buzzes for before the earliest press wins
+BUZZ_MAX_COMPENSATION = 0.3  # most seconds a buzz can be moved back to its estimated press
+BUZZ_COMPENSATION_MARGIN = 0.02  # seconds a buzz can be moved back beyond half the round trip
@@ -1,17 +1,32 @@
 import logging
-import tornado.escape
 import tornado.ioloop
 import tornado.web
 import tornado.websocket
 from tornado.options import define, options
 
 import os
+import struct
+import time
 from threading import Thread
 import socket
 
+from jparty import wire
 from jparty.environ import root
-from jparty.game import Player
-from jparty.constants import MAXPLAYERS, PORT
+from jparty.model import Player
+from jparty.metrics import LatencyHistogram
+from jparty.buzz_arbiter import BuzzArbiter, ClockSync
+from jparty.lectern_hub import LecternHub
+from jparty.pubsub import PubSubHub, valid_topic
+from jparty.player_registry import PlayerRegistry
+from jparty.constants import (
+    MAXPLAYERS,
+    PORT,
+    PING_INTERVAL,
+    CLOCK_SYNC_EVERY,
+    BUZZ_WINDOW,
+    BUZZ_COMPENSATION_MARGIN,
+    BUZZ_MAX_COMPENSATION,
+)
 
 
 define("port", default=PORT, help="run on the given port", type=int)
@@ -22,16 +37,18 @@ class Application(tornado.web.Application):
         handlers = [
             (r"/", WelcomeHandler),
             (r"/play", BuzzerHandler),
-            (r"/buzzersocket", BuzzerSocketHandler),
+            # frames on these routes are tiny and latency critical, so they are not compressed
+            (r"/buzzersocket", BuzzerSocketHandler, dict(compression=None)),
             (r"/lectern", LecternHandler),
-            (r"/lecternsocket", LecternSocketHandler),
+            (r"/lecternsocket", LecternSocketHandler, dict(compression=None)),
+            (r"/spectatorsocket", SpectatorSocketHandler, dict(compression=None)),
         ]
         settings = dict(
             cookie_secret="",
             template_path=os.path.join(os.path.join(root, "buzzer", "templates")),
             static_path=os.path.join(root, "buzzer", "static"),
             xsrf_cookies=False,
-            websocket_ping_interval=0.19,
+            websocket_ping_interval=PING_INTERVAL,
         )
         super(Application, self).__init__(handlers, **settings)
         self.controller = controller
@@ -56,23 +73,61 @@ class BuzzerSocketHandler(tornado.websocket.WebSocketHandler):
     cache = []
     cache_size = 400
 
-    def initialize(self):
+    def initialize(self, compression=None):
         # self.name = None
         self.controller = self.application.controller
+        self.compression = compression
+        self.version = wire.VERSION
         self.player = None
+        self.clock_sync = ClockSync()
+        self.pinger = None
+        self.pings = 0
+
+    @property
+    def ping_interval(self):
+        # replaced by our own timestamped pings, which also keep the connection alive
+        return 0
 
     def get_compression_options(self):
         # Non-None enables compression with default options.
-        return {}
+        return self.compression
 
     def open(self):
         self.set_nodelay(True)
+        self.version = wire.version_of(self.get_argument("v", "0"))
+        if self.version is None:
+            logging.error(f"Unknown buzzer protocol version {self.get_argument('v')}")
+            self.close()
+            return
+        self.pinger = tornado.ioloop.PeriodicCallback(self.timed_ping, PING_INTERVAL * 1000)
+        self.pinger.start()
+        self.sync_clock()
+
+    def timed_ping(self):
+        try:
+            self.ping(struct.pack("!d", time.monotonic()))
+        except tornado.websocket.WebSocketClosedError:
+            return
+        self.pings += 1
+        if self.pings % CLOCK_SYNC_EVERY == 0:
+            self.sync_clock()
+
+    def on_pong(self, data):
+        if len(data) == 8:
+            self.clock_sync.add_rtt(time.monotonic() - struct.unpack("!d", data)[0])
+
+    def sync_clock(self):
+        # not through send, which logs every message
+        try:
+            self.write_message(wire.encode("SYNC", repr(time.monotonic()), self.version))
+        except tornado.websocket.WebSocketClosedError:
+            pass
 
     def send(self, msg, text=""):
-        data = {"message": msg, "text": text}
         try:
-            self.write_message(data)
-            logging.info(f"Sent {data}")
+            frame = wire.encode(msg, text, self.version)
+            self.write_message(frame)
+            logging.info(f"Sent {frame}")
         except:
             logging.error(f"Error sending message {msg}", exc_info=True)
 
@@ -85,19 +140,22 @@ class BuzzerSocketHandler(tornado.websocket.WebSocketHandler):
         else:
             logging.info(f"Reconnected {p}")
             self.player = p
-            p.connected = True
-            p.waiter = self
-            self.send("EXISTS", tornado.escape.json_encode(p.state()))
+            self.controller.registry.bind(p, self)
+            self.send("EXISTS", p.state())
 
     def on_message(self, message):
         # do this first to kill latency
-        if "BUZZ" in message:
-            self.buzz()
+        arrival = time.monotonic()
+        if self.version and message[:1] == wire.BUZZ:
+            self.buzz(arrival, message[1:])
             return
-        parsed = tornado.escape.json_decode(message)
-        msg = parsed["message"]
-        text = parsed["text"]
-        if msg == "NAME":
+        msg, text = wire.decode(message, self.version)
+        if msg == "BUZZ":
+            self.buzz(arrival, text)
+        elif msg == "SYNC":
+            t0, tc = text.split(",")
+            self.clock_sync.add_sync(float(t0), float(tc) / 1000, arrival)
+        elif msg == "NAME":
             self.init_player(text)
         elif msg == "CHECK_IF_EXISTS":
             logging.info(f"Checking if {text} exists")
@@ -117,19 +175,27 @@ class BuzzerSocketHandler(tornado.websocket.WebSocketHandler):
             self.send("GAMESTARTED")
             return
 
-        if len(self.controller.connected_players) >= MAXPLAYERS:
+        registry = self.controller.registry
+        if len(registry) >= MAXPLAYERS:
             self.send("FULL")
             return
-        player_index = len(self.controller.connected_players)
-        self.player = Player(name, self, player_index)
+        self.player = Player(name, self, registry.next_number())
         self.application.controller.new_player(self.player)
         logging.info(
             f"New Player: {self.player} {self.request.remote_ip} {self.player.token.hex()}"
         )
         self.send("TOKEN", self.player.token.hex())
 
-    def buzz(self):
-        self.application.controller.buzz(self.player)
+    def buzz(self, arrival, text=""):
+        # the phone sends the time of the press in ms on its clock, older pages send nothing
+        try:
+            client_time = float(text) / 1000
+        except ValueError:
+            client_time = None
+        press = self.clock_sync.press_time(
+            arrival, client_time, BUZZ_MAX_COMPENSATION, BUZZ_COMPENSATION_MARGIN
+        )
+        self.controller.arbiter.submit(self.player, press, arrival)
 
     def wager(self, text):
         self.application.controller.wager(self.player, int(text))
@@ -139,7 +205,9 @@ class BuzzerSocketHandler(tornado.websocket.WebSocketHandler):
         self.send("TOOLATE")
 
     def on_close(self):
-        pass
+        if self.pinger is not None:
+            self.pinger.stop()
+        self.controller.registry.unbind(self)
 
 
 class LecternHandler(tornado.web.RequestHandler):
@@ -149,15 +217,22 @@ class LecternHandler(tornado.web.RequestHandler):
 
 
 class LecternSocketHandler(tornado.websocket.WebSocketHandler):
-    def initialize(self):
+    def initialize(self, compression=None):
         self.controller = self.application.controller
+        self.compression = compression
+        self.version = wire.VERSION
         self.player_number = None
 
     def get_compression_options(self):
-        return {}
+        return self.compression
 
     def open(self):
         self.set_nodelay(True)
+        self.version = wire.version_of(self.get_argument("v", "0"))
+        if self.version is None:
+            logging.error(f"Unknown lectern protocol version {self.get_argument('v')}")
+            self.close()
+            return
         try:
             # Get player number from query string
             player_arg = self.get_argument("player", "0")
@@ -165,39 +240,73 @@ class LecternSocketHandler(tornado.websocket.WebSocketHandler):
             if self.player_number < 0 or self.player_number >= MAXPLAYERS:
                 raise ValueError(f"Player number {self.player_number} out of range")
             logging.info(f"Lectern connected for player {self.player_number}")
-            self.controller.lectern_connections[self.player_number] = self
             self.send_initial_state()
         except (ValueError, TypeError) as e:
             logging.error(f"Invalid player number for lectern: {e}")
             self.close()
 
-    def send(self, msg, text=""):
-        data = {"message": msg, "text": text}
+    def write_frame(self, frame):
+        # written for every update of the player, so not logged
         try:
-            self.write_message(data)
-            logging.info(f"Sent to lectern {self.player_number}: {data}")
-        except:
-            logging.error(f"Error sending message to lectern {self.player_number}: {msg}", exc_info=True)
+            self.write_message(frame)
+        except tornado.websocket.WebSocketClosedError:
+            pass
 
     def send_initial_state(self):
-        if self.player_number is not None and self.controller.game:
+        player = None
+        if self.controller.game:
             player = self.controller.get_player_by_number(self.player_number)
-            if player:
-                state = self.controller.get_player_state_dict(player)
-                self.send("PLAYER_STATE", tornado.escape.json_encode(state))
-            else:
-                self.send("NO_PLAYER", "")
+        state = self.controller.get_player_state_dict(player) if player else None
+        self.controller.lectern_hub.connect(self.player_number, self, state)
 
     def on_message(self, message):
         pass
 
     def on_close(self):
         if self.player_number is not None:
-            if self.player_number in self.controller.lectern_connections:
-                del self.controller.lectern_connections[self.player_number]
+            self.controller.lectern_hub.disconnect(self)
             logging.info(f"Lectern disconnected for player {self.player_number}")
 
 
+class SpectatorSocketHandler(tornado.websocket.WebSocketHandler):
+    """Game state for screens that are not a player's, e.g. a TV in the room or a stream
+
+    The topics to follow are given as ?topics=scores,board,timer,lectern/0 and the current state
+    of each is sent on connect. Spectators only listen, and only speak version 1.
+    """
+
+    def initialize(self, compression=None):
+        self.controller = self.application.controller
+        self.compression = compression
+        self.version = wire.VERSION
+
+    def get_compression_options(self):
+        return self.compression
+
+    def open(self):
+        self.set_nodelay(True)
+        topics = [t for t in self.get_argument("topics", "").split(",") if t]
+        if not topics or not all(valid_topic(t) for t in topics):
+            logging.error(f"Invalid spectator topics {topics}")
+            self.close()
+            return
+        for topic in topics:
+            self.controller.pubsub.subscribe(topic, self)
+        logging.info(f"Spectator connected for {', '.join(topics)}")
+
+    def write_frame(self, frame):
+        try:
+            self.write_message(frame)
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    def on_message(self, message):
+        pass
+
+    def on_close(self):
+        self.controller.pubsub.unsubscribe(self)
+
+
 class BuzzerController:
     def __init__(self, game):
         self.thread = None
@@ -207,9 +316,17 @@ class BuzzerController:
             self
         )  # this is to remove sleep mode on Macbook network card
         self.port = options.port
-        self.connected_players = []
+        self.registry = PlayerRegistry()
         self.accepting_players = True
-        self.lectern_connections = {}
+        self.pubsub = PubSubHub(tornado.ioloop.IOLoop.current().add_callback)
+        self.lectern_hub = LecternHub(self.pubsub)
+        self.arbiter = BuzzArbiter(
+            self.decide_buzzes,
+            lambda delay, f: tornado.ioloop.IOLoop.current().call_later(delay, f),
+            BUZZ_WINDOW,
+            describe=lambda p: f"player {p.player_number}",
+        )
+        self.decision_latency = LatencyHistogram()  # from a buzz reaching the socket to its claim
 
     def start(self, threaded=True, tries=0):
         try:
@@ -228,22 +345,43 @@ class BuzzerController:
         else:
             tornado.ioloop.IOLoop.current().start()
 
+    @property
+    def connected_players(self):
+        return self.registry.players
+
+    @connected_players.setter
+    def connected_players(self, players):
+        self.registry.replace(players)
+
     def restart(self):
         for p in self.connected_players:
-            p.waiter.close()
-        self.connected_players = []
+            if p.waiter is not None:
+                p.waiter.close()
+        self.registry.clear()
         self.accepting_players = True
 
-    def buzz(self, player):
-        if self.game:
-            i_player = self.game.players.index(player)
-            self.game.buzz_trigger.emit(i_player)
-        else:
-            i_player = self.connected_players.index(player)
-            self.game.buzz_hint_trigger.emit(i_player)
+    def decide_buzzes(self, buzzes):
+        # on the IOLoop thread, earliest press first: only the player who claims the buzz gate
+        # is sent to the GUI while responses are open, the others are locked out right away
+        gate = self.game.buzz_gate
+        for buzz in buzzes:
+            player = buzz.player
+            if player is None:
+                continue
+            claim = gate.claim(player)
+            if claim is not None:
+                self.decision_latency.record((claim.decided - buzz.arrival) * 1000)
+                self.game.buzz_trigger.emit(player, claim)
+            elif gate.accepting:
+                self.decision_latency.record((time.monotonic() - buzz.arrival) * 1000)
+                if player.waiter is not None:
+                    player.waiter.send("LOCKEDOUT")
+            else:
+                # no clue open, the game shows a buzz hint
+                self.game.buzz_trigger.emit(player, None)
 
     def wager(self, player, amount):
-        i_player = self.game.players.index(player)
+        i_player = self.registry.index(player)
         self.game.wager_trigger.emit(i_player, amount)
 
     def answer(self, player, guess):
@@ -252,7 +390,7 @@ class BuzzerController:
             player.page = "null"
 
     def new_player(self, player):
-        self.connected_players.append(player)
+        self.registry.add(player)
         self.game.new_player_trigger.emit()
 
     @classmethod
@@ -269,34 +407,30 @@ class BuzzerController:
             return f"{localip}:{self.port}"
 
     def player_with_token(self, token):
-        for p in self.connected_players:
-            logging.info(f"{p.token}, {token}")
-            if p.token.hex() == token:
-                logging.info("MATCH")
-                return p
-        return None
+        return self.registry.with_token(token)
 
     def open_wagers(self, players=None):
         if players is None:
             players = self.connected_players
 
         for p in players:
-            p.waiter.send("PROMPTWAGER", str(max(p.score, 0)))
+            if p.waiter is not None:  # None until a resumed player rejoins
+                p.waiter.send("PROMPTWAGER", str(max(p.score, 0)))
             p.page = "wager"
 
     def prompt_answers(self):
         for p in self.connected_players:
-            p.waiter.send("PROMPTANSWER")
+            if p.waiter is not None:
+                p.waiter.send("PROMPTANSWER")
             p.page = "answer"
 
     def toolate(self):
         for p in self.connected_players:
-            p.waiter.send("TOOLATE")
+            if p.waiter is not None:
+                p.waiter.send("TOOLATE")
 
     def get_player_by_number(self, player_number):
-        if self.game and player_number < len(self.game.players):
-            return self.game.players[player_number]
-        return None
+        return self.registry.with_number(player_number)
 
     def get_player_state_dict(self, player):
         return {
@@ -308,10 +442,29 @@ class BuzzerController:
             "finalanswer": getattr(player, 'finalanswer', None),
         }
 
+    def publish_scores(self, players):
+        scores = [
+            {"player_number": p.player_number, "name": p.name, "score": p.score} for p in players
+        ]
+        self.pubsub.publish("scores", "SCORES", scores)
+
+    def publish_board(self, board, active_question=None):
+        # the value of each clue still on the board by category and row, 0 once played
+        values = [
+            [q.value if q is not None and not q.complete else 0 for q in column]
+            for column in board.grid
+        ]
+        active = list(active_question.index) if active_question is not None else None
+        board_state = {"categories": board.categories, "values": values, "active": active}
+        self.pubsub.publish("board", "BOARD", board_state)
+
+    def publish_timer(self, timer):
+        if timer is None:
+            timer_state = {"running": False, "remaining": 0}
+        else:
+            timer_state = {"running": timer.running, "remaining": round(timer.remaining(), 3)}
+        self.pubsub.publish("timer", "TIMER", timer_state)
+
     def broadcast_to_lecterns(self, player_number, state_dict):
-        if player_number in self.lectern_connections:
-            lectern = self.lectern_connections[player_number]
-            try:
-                lectern.send("PLAYER_STATE", tornado.escape.json_encode(state_dict))
-            except:
-                logging.error(f"Error broadcasting to lectern {player_number}", exc_info=True)
+        # from any thread, sent from the IOLoop with the other updates of this tick
+        self.lectern_hub.update(player_number, state_dict)
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from jparty.constants import SAVED_GAMES, DOWNLOAD_RATE, DOWNLOAD_BURST, DOWNLOAD_WORKERS
+from jparty.retrieve import fetch_game_html, process_game_board_from_html, save_game_html
+from jparty.http_client import HttpClient
+
+
+def parse_game_ids(args):
+    """Expand "123" and "100-200" (inclusive) arguments into a list of game ids"""
+    game_ids = []
+    for arg in args:
+        if "-" in arg:
+            start, end = arg.split("-", 1)
+            game_ids.extend(range(int(start), int(end) + 1))
+        else:
+            game_ids.append(int(arg))
+    return game_ids
+
+
+class TokenBucket(object):
+    """Allow `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.capacity, self.__tokens + (now - self.__last) * self.rate
+                )
+                self.__last = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait_time = (1 - self.__tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class RateLimitedSession(requests.Session):
+    """Pooled session that waits on a per-host token bucket before every request"""
+
+    def __init__(self, rate, burst=1, pool_size=10, timeout=30):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def bucket(self, host):
+        with self.__lock:
+            if host not in self.__buckets:
+                self.__buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.__buckets[host]
+
+    def request(self, method, url, *args, **kwargs):
+        self.bucket(urlsplit(url).netloc).acquire()
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, *args, **kwargs)
+
+
+class BulkDownloader(object):
+    """Download many games into SAVED_GAMES with a bounded pool of workers
+
+    Args:
+        workers: number of concurrent downloads
+        rate: requests per second allowed to each host
+        burst: requests a host may receive back to back
+        checkpoint: path of a json file recording finished and failed ids, used to resume
+        game_url: url template with a `{game_id}` field to download from instead of the
+            wayback machine / j-archive (e.g. a local mirror)
+    """
+
+    def __init__(
+        self,
+        workers=DOWNLOAD_WORKERS,
+        rate=DOWNLOAD_RATE,
+        burst=DOWNLOAD_BURST,
+        checkpoint=None,
+        game_url=None,
+    ):
+        self.workers = workers
+        # the bulk download writes SAVED_GAMES itself, so keep it out of the response cache
+        self.client = HttpClient(RateLimitedSession(rate, burst, pool_size=workers), cache=False, timeout=None)
+        self.checkpoint = checkpoint
+        self.game_url = game_url
+        self.done = set()
+        self.failed = set()
+        self.__lock = threading.Lock()
+        self.load_checkpoint()
+
+    def load_checkpoint(self):
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return
+        with open(self.checkpoint, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.done = set(state.get("done", []))
+        # failed ids are retried on resume
+        logging.info(f"Resuming with {len(self.done)} finished games")
+
+    def save_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        with self.__lock:
+            state = {"done": sorted(self.done), "failed": sorted(self.failed)}
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint)
+
+    def pending(self, game_ids):
+        """ids that are neither saved nor finished in a previous run, before any network work"""
+        return [
+            game_id
+            for game_id in game_ids
+            if game_id not in self.done and not (SAVED_GAMES / f"{game_id}.html").exists()
+        ]
+
+    def fetch(self, game_id):
+        if self.game_url is not None:
+            r = self.client.get(self.game_url.format(game_id=game_id), endpoint="mirror")
+            r.raise_for_status()
+            return r.text
+        return fetch_game_html(game_id, self.client)
+
+    def download(self, game_id):
+        game_html = self.fetch(game_id)
+        game_data = process_game_board_from_html(game_html, game_id)
+        save_game_html(game_id, game_html, game_data)
+        if game_data is None:
+            print(f"{game_id} is incomplete")
+
+    def run(self, game_ids, checkpoint_every=20):
+        todo = self.pending(game_ids)
+        print(f"{len(game_ids) - len(todo)} games already saved, downloading {len(todo)}")
+        todo = iter(todo)
+        finished = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            try:
+                while True:
+                    # keep at most two downloads per worker in flight
+                    while len(running) < 2 * self.workers:
+                        game_id = next(todo, None)
+                        if game_id is None:
+                            break
+                        running[executor.submit(self.download, game_id)] = game_id
+                    if not running:
+                        break
+                    completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        game_id = running.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logging.error(f"Cannot download game {game_id}: {e}")
+                            print(f"{game_id} failed: {e}")
+                            with self.__lock:
+                                self.failed.add(game_id)
+                        else:
+                            print(f"Saved {game_id}")
+                            with self.__lock:
+                                self.done.add(game_id)
+                                self.failed.discard(game_id)
+                        finished += 1
+                        if finished % checkpoint_every == 0:
+                            self.save_checkpoint()
+            except KeyboardInterrupt:
+                print("Interrupted, waiting for running downloads")
+                for future in running:
+                    future.cancel()
+                raise
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+                self.save_checkpoint()
+        return self.failed
@@ -0,0 +1,516 @@
+import logging
+import time
+
+from jparty.buzz_arbiter import BuzzGate
+from jparty.metrics import LatencyHistogram
+from jparty.model import FinalBoard
+from jparty.scheduler import QuestionTimer, default_scheduler
+from jparty.score_history import ScoreHistory
+from jparty.constants import FJTIME, QUESTIONTIME
+
+# a module logger, as the engine logs on every clue and logging.info goes through the root
+# logger's handler check on every call
+log = logging.getLogger(__name__)
+
+
+class Presenter(object):
+    """What a GameEngine shows and asks for, every hook does nothing by default
+
+    The Qt windows are one presenter, tests and simulations use others.
+    """
+
+    def activate(self, *idents):
+        """host actions (e.g. "BACK_TO_BOARD") that are now allowed"""
+
+    def deactivate(self, *idents):
+        """host actions that are no longer allowed"""
+
+    def start_game(self, board):
+        pass
+
+    def load_round(self, board):
+        pass
+
+    def load_question(self, q):
+        pass
+
+    def daily_double(self, q):
+        pass
+
+    def request_dd_wager(self, player, max_wager):
+        """the daily double wager of player, None if it was not given"""
+        return None
+
+    def show_dd_question(self, q):
+        pass
+
+    def review_image(self, q):
+        pass
+
+    def hide_question(self):
+        pass
+
+    def responses_lights(self, on):
+        pass
+
+    def player_lights(self, player, on):
+        pass
+
+    def player_buzzed(self, player):
+        pass
+
+    def player_answered(self, player):
+        pass
+
+    def buzz_hint(self, player):
+        pass
+
+    def stumped(self):
+        pass
+
+    def score_changed(self, player):
+        pass
+
+    def board_changed(self, board, active_question):
+        pass
+
+    def timer_changed(self, timer):
+        """the response timer started, paused or ended, None when there is none"""
+        pass
+
+    def lectern_update(self, player, buzzed, active, show_final_answer):
+        pass
+
+    def load_final(self, q):
+        pass
+
+    def open_wagers(self):
+        pass
+
+    def wagers_in(self):
+        pass
+
+    def open_final(self, q):
+        pass
+
+    def final_prompt(self):
+        pass
+
+    def final_timeout(self):
+        pass
+
+    def load_final_judgement(self):
+        pass
+
+    def final_judging(self, player):
+        pass
+
+    def final_answer_shown(self, player, answer):
+        pass
+
+    def final_wager_shown(self, player):
+        pass
+
+    def end_game(self, winners):
+        pass
+
+
+class GameEngine(object):
+    """The rules of a game: board selection, buzzing, judging, wagers and scores
+
+    The engine only talks to its presenter and reads time from its scheduler, so it runs without
+    a display and, with a SimulatedScheduler, faster than real time.
+
+    Args:
+        presenter: Presenter that shows the game
+        scheduler: Scheduler for the response timers
+        journal: GameJournal that records every transition, None to keep no journal
+        question_time: seconds to buzz in on a clue
+        final_time: seconds to answer Final Jeopardy
+    """
+
+    def __init__(
+        self,
+        presenter=None,
+        scheduler=None,
+        journal=None,
+        question_time=QUESTIONTIME,
+        final_time=FJTIME,
+    ):
+        super().__init__()
+        self.presenter = presenter or Presenter()
+        self.scheduler = scheduler or default_scheduler()
+        self.journal = journal
+        self.question_time = question_time
+        self.final_time = final_time
+
+        self.question_number = 1
+        self.data = None
+        self.game_id = None
+
+        self.current_round = None
+        self.players = []
+        self.scores = ScoreHistory()  # live players and the original contestants
+
+        self.active_question = None
+        self.buzz_gate = BuzzGate()
+        self.accepting_responses = False
+        self.answering_player = None
+        self.previous_answerer = None
+        self.lights_latency = LatencyHistogram()  # from a buzz winning to the lights going on
+        self.timer = None
+        self.soliciting_player = False  # part of selecting who found a daily double
+
+        self.judgement_round = 0
+        self.sorted_players = None
+
+    @property
+    def accepting_responses(self):
+        return self.buzz_gate.accepting
+
+    @accepting_responses.setter
+    def accepting_responses(self, accepting):
+        if accepting:
+            self.buzz_gate.open(locked_out=self.previous_answerer)
+        else:
+            self.buzz_gate.close()
+
+    def reset(self):
+        self.players = []
+        self.scores = ScoreHistory()  # live players and the original contestants
+        self.question_number = 1
+        self.active_question = None
+        self.current_round = None
+        self.answering_player = None
+        self.timer = None
+        self.data = None
+        self.game_id = None
+        self.judgement_round = 0
+        self.sorted_players = None
+
+    def record(self, kind, *fields):
+        if self.journal is not None:
+            self.journal.append(kind, *fields)
+
+    def activate(self, *idents):
+        self.presenter.activate(*idents)
+
+    def deactivate(self, *idents):
+        self.presenter.deactivate(*idents)
+
+    def valid_game(self):
+        return self.data is not None and all(b.complete() for b in self.data.rounds)
+
+    def start_game(self):
+        self.current_round = self.data.rounds[0]
+        for p in self.players:
+            self.scores.row(p, str(p.player_number))
+        self.record(
+            "start",
+            self.game_id,
+            [[p.name, p.token.hex(), p.player_number] for p in self.players],
+        )
+        self.presenter.start_game(self.current_round)
+        self.presenter.board_changed(self.current_round, None)
+
+    def resume(self):
+        """show a game rebuilt by jparty.journal.replay and allow the host to carry on"""
+        board = self.current_round
+        final = isinstance(board, FinalBoard)
+        self.presenter.start_game(self.data.rounds[-2] if final else board)
+        self.presenter.board_changed(board, None)
+        for player in self.players:
+            self.presenter.score_changed(player)
+            self.update_lectern(player)
+
+        if not final:
+            if board.finished():
+                self.activate("NEXT_ROUND")
+            return
+
+        self.presenter.load_final(board.question)
+        if self.sorted_players is not None:
+            self.presenter.load_final_judgement()
+            self.activate("FINAL_NEXT_PLAYER")
+        elif all(p.wager is not None for p in self.players):
+            self.presenter.wagers_in()
+            self.activate("OPEN_FINAL")
+        else:
+            self.start_final()
+
+    def load_image_review_screen(self, q):
+        self.active_question = q
+        self.presenter.review_image(q)
+
+    def accept_image(self):
+        log.info("Proposed question image accepted")
+        self.load_question(self.active_question)
+
+    def no_image_needed(self):
+        log.info("No image needed for question")
+        self.active_question.image = False
+        self.active_question.image_url = None
+        self.load_question(self.active_question)
+
+    def load_question(self, q):
+        self.active_question = q
+        self.record("open", self.data.rounds.index(self.current_round), *q.index)
+        if q.dd:
+            log.info("Daily double!")
+            self.presenter.daily_double(q)
+            self.soliciting_player = True
+        else:
+            self.activate("OPEN_RESPONSES")
+        self.presenter.load_question(q)
+        self.presenter.board_changed(self.current_round, q)
+
+    def get_dd_wager(self, player):
+        self.answering_player = player
+        self.soliciting_player = False
+        try:
+            round_index = self.data.rounds.index(self.current_round)
+        except ValueError:
+            round_index = 1
+
+        max_wager = max(self.answering_player.score, 1000 if round_index == 0 else 2000)
+        wager = self.presenter.request_dd_wager(player, max_wager)
+        if wager is None:
+            self.soliciting_player = True
+            return False
+
+        self.active_question.value = wager
+        self.record("dd", player.player_number, wager)
+        self.activate("CORRECT_ANSWER", "INCORRECT_ANSWER")
+        self.presenter.show_dd_question(self.active_question)
+
+    def open_responses(self):
+        self.presenter.responses_lights(True)
+        self.accepting_responses = True
+
+        if not self.timer:
+            self.timer = QuestionTimer(self.question_time, self.stumped, scheduler=self.scheduler)
+
+        self.timer.start()
+        self.presenter.timer_changed(self.timer)
+
+    def close_responses(self):
+        self.timer.pause()
+        self.accepting_responses = False
+        self.presenter.responses_lights(True)
+        self.presenter.timer_changed(self.timer)
+
+    def buzz(self, i_player):
+        self.buzz_player(self.players[i_player])
+
+    def buzz_player(self, player, claim=None):
+        """a buzz from player, with the Claim it already made on the buzz gate if it came over
+        the network, otherwise the claim is made here"""
+        if claim is None:
+            claim = self.buzz_gate.claim(player)
+        if (
+            claim is not None
+            and claim.player is not self.previous_answerer
+            and self.buzz_gate.won(claim)
+        ):
+            log.info("buzz (%.6f s)", self.scheduler.clock())
+            self.accepting_responses = False
+            self.timer.pause()
+            self.presenter.timer_changed(self.timer)
+            self.previous_answerer = player
+            self.record("buzz", player.player_number)
+            self.presenter.player_buzzed(player)
+
+            self.answering_player = player
+            self.activate("CORRECT_ANSWER", "INCORRECT_ANSWER")
+            self.presenter.responses_lights(False)
+            self.lights_latency.record((time.monotonic() - claim.decided) * 1000)
+            self.update_lectern(player, buzzed=True)
+        elif self.active_question is None:
+            self.presenter.buzz_hint(player)
+
+    def answer_given(self):
+        self.deactivate("CORRECT_ANSWER", "INCORRECT_ANSWER")
+        self.presenter.player_answered(self.answering_player)
+        answering_player = self.answering_player
+        self.answering_player = None
+        if answering_player:
+            self.update_lectern(answering_player, buzzed=False)
+
+    def correct_answer(self):
+        new_score = self.answering_player.score + self.active_question.value
+        self.scores.set_score(self.answering_player, self.question_number, new_score)
+        self.record("judge", self.answering_player.player_number, new_score)
+        if self.timer:
+            self.timer.cancel()
+
+        self.set_score(self.answering_player, new_score)
+        self.presenter.responses_lights(False)
+        self.answer_given()
+        self.back_to_board()
+
+    def incorrect_answer(self):
+        new_score = self.answering_player.score - self.active_question.value
+        self.scores.set_score(self.answering_player, self.question_number, new_score)
+        self.record("judge", self.answering_player.player_number, new_score)
+        self.set_score(self.answering_player, new_score)
+        self.answer_given()
+        if self.active_question.dd:
+            self.back_to_board()
+        else:
+            self.open_responses()
+
+    def stumped(self):
+        self.accepting_responses = False
+        self.presenter.stumped()
+        self.presenter.timer_changed(self.timer)
+        self.activate("BACK_TO_BOARD")
+
+    def update_original_player_scores(self):
+        for name, delta in self.active_question.actual_results or []:
+            self.scores.add(name, self.question_number, delta, original=True)
+        self.scores.extend_to(self.question_number)
+
+    def back_to_board(self):
+        log.info("back_to_board")
+        self.record("back")
+        self.presenter.hide_question()
+        self.timer = None
+        self.presenter.timer_changed(None)
+        self.current_round.complete_question(self.active_question)
+        self.update_original_player_scores()
+        self.question_number += 1
+        self.active_question = None
+        self.presenter.board_changed(self.current_round, None)
+        self.previous_answerer = None
+        self.answering_player = None
+        # Clear the buzzed and active state on every lectern
+        lectern_update = self.presenter.lectern_update
+        for player in self.players:
+            lectern_update(player, False, False, False)
+        if self.current_round.finished():
+            log.info("NEXT ROUND")
+            self.activate("NEXT_ROUND")
+
+    def next_round(self):
+        log.info("next round")
+        i = self.data.rounds.index(self.current_round)
+        log.info(f"ROUND {i}")
+        self.current_round = self.data.rounds[i + 1]
+        self.record("round", i + 1)
+
+        if isinstance(self.current_round, FinalBoard):
+            self.presenter.load_final(self.current_round.question)
+            self.active_question = self.current_round.question
+            self.presenter.board_changed(self.current_round, self.active_question)
+            self.update_original_player_scores()
+            self.start_final()
+        else:
+            self.presenter.load_round(self.current_round)
+            self.presenter.board_changed(self.current_round, None)
+
+    def start_final(self):
+        log.info("start final")
+        for player in self.players:
+            self.presenter.player_lights(player, True)
+
+        self.presenter.open_wagers()
+
+    def wager(self, i_player, amount):
+        player = self.players[i_player]
+        player.wager = amount
+        self.record("wager", player.player_number, amount)
+        self.presenter.player_lights(player, False)
+        log.info(f"{player} wagered {amount}")
+        if all(p.wager is not None for p in self.players):
+            self.presenter.wagers_in()
+            self.activate("OPEN_FINAL")
+
+    def answer(self, player, guess):
+        player.finalanswer = guess
+        self.record("answer", player.player_number, guess)
+        log.info(f"{player} guessed {guess}")
+
+    def open_final(self):
+        self.presenter.open_final(self.active_question)
+        self.activate("FINAL_OPEN_RESPONSES")
+
+    def final_open_responses(self):
+        self.presenter.responses_lights(True)
+        self.presenter.final_prompt()
+
+        self.timer = QuestionTimer(self.final_time, self.final_finished_song, scheduler=self.scheduler)
+        self.timer.start()
+        self.presenter.timer_changed(self.timer)
+
+    def final_finished_song(self):
+        log.info("Final song ended")
+        self.presenter.final_timeout()
+        self.presenter.timer_changed(self.timer)
+        self.accepting_responses = False
+        self.activate("FINAL_NEXT_PLAYER")
+
+    def final_next_player(self):
+        for p in self.players:
+            self.presenter.player_lights(p, False)
+
+        if self.judgement_round == 0:
+            self.presenter.load_final_judgement()
+            self.sorted_players = sorted(self.players, key=lambda x: x.score)
+
+        elif self.judgement_round == len(self.players):
+            self.end_game()
+            return
+
+        self.answering_player = self.sorted_players[self.judgement_round]
+        self.record("judging", self.answering_player.player_number)
+        self.presenter.final_judging(self.answering_player)
+        self.update_lectern(self.answering_player, show_final_answer=False)
+        self.activate("FINAL_SHOW_ANSWER")
+
+    def final_show_answer(self):
+        answer = self.answering_player.finalanswer
+        if answer == "":
+            answer = "________"
+
+        self.presenter.final_answer_shown(self.answering_player, answer)
+        self.update_lectern(self.answering_player, show_final_answer=True)
+        self.activate("FINAL_CORRECT_ANSWER", "FINAL_INCORRECT_ANSWER")
+
+    def final_correct_answer(self):
+        ap = self.answering_player
+        new_score = ap.score + ap.wager
+        self.scores.set_score(ap, self.question_number, new_score)
+        self.record("judge", ap.player_number, new_score)
+        self.set_score(ap, new_score)
+        self.final_judgement_given()
+
+    def final_incorrect_answer(self):
+        ap = self.answering_player
+        new_score = ap.score - ap.wager
+        self.scores.set_score(ap, self.question_number, new_score)
+        self.record("judge", ap.player_number, new_score)
+        self.set_score(ap, new_score)
+        self.final_judgement_given()
+
+    def final_judgement_given(self):
+        self.deactivate("FINAL_CORRECT_ANSWER", "FINAL_INCORRECT_ANSWER")
+        self.presenter.final_wager_shown(self.answering_player)
+        self.activate("FINAL_NEXT_PLAYER")
+        self.judgement_round += 1
+
+    def end_game(self):
+        top_score = max([p.score for p in self.players])
+        winners = [p for p in self.players if p.score == top_score]
+        self.record("end")
+        self.presenter.end_game(winners)
+        log.info("Game over!")
+        self.activate("GENERATE_GRAPHS")
+
+    def set_score(self, player, score):
+        player.score = score
+        self.presenter.score_changed(player)
+        self.update_lectern(player)
+
+    def update_lectern(self, player, buzzed=False, show_final_answer=False):
+        active = self.answering_player is player if self.answering_player else False
+        self.presenter.lectern_update(player, buzzed, active, show_final_answer)
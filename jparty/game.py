@@ -1,21 +1,23 @@
 from PyQt6.QtCore import Qt, QObject, pyqtSignal
+from PyQt6.QtGui import QImage
 from PyQt6.QtWidgets import QInputDialog, QApplication
 
 
-import threading
 import time
 from dataclasses import dataclass
 import os
-import sys
-import simpleaudio as sa
 from collections.abc import Iterable
 import logging
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 
-from jparty.utils import SongPlayer, resource_path, CompoundObject
-from jparty.constants import FJTIME, QUESTIONTIME, REPO_ROOT
+from jparty.utils import CompoundObject
+from jparty.audio import AudioEngine
+from jparty.metrics import LatencyHistogram
+from jparty.scheduler import Scheduler
+from jparty.engine import GameEngine, Presenter
+from jparty.journal import GameJournal, replay
+from jparty.retrieve import get_game
+from jparty.score_graphs import GraphRenderer
+from jparty.constants import GAME_SCORES, SAVE_SCORE_GRAPHS
 
 
 MAX_PLAYERS = 6
@@ -28,43 +30,6 @@ index_to_key = {
     5: Qt.Key.Key_Y,
 }
 
-class QuestionTimer(object):
-    def __init__(self, interval, f, *args, **kwargs):
-        super().__init__()
-        self.f = f
-        self.args = args
-        self.kwargs = kwargs
-        self.interval = interval
-        self.__thread = None
-        self.__start_time = None
-        self.__elapsed_time = 0
-
-    def run(self, i):
-        thread = self.__thread
-        time.sleep(i)
-        if thread == self.__thread:
-            self.f(*self.args, **self.kwargs)
-
-    def start(self):
-        """wrapper for resume"""
-        self.resume()
-
-    def cancel(self):
-        """wrapper for pause"""
-        self.pause()
-
-    def pause(self):
-        self.__thread = None
-        self.__elapsed_time += time.time() - self.__start_time
-
-    def resume(self):
-        self.__thread = threading.Thread(
-            target=self.run, args=(self.interval - self.__elapsed_time,)
-        )
-        self.__thread.start()
-        self.__start_time = time.time()
-
-
 @dataclass
 class KeystrokeEvent:
     key: int
@@ -73,47 +38,74 @@ class KeystrokeEvent:
     active: bool = False
     persistent: bool = False
     func_args: int = None
+    order: int = 0  # registration order, events sharing a key are called in this order
 
 
 class KeystrokeManager(object):
     def __init__(self):
         super().__init__()
         self.__events = {}
+        self.__active = {}  # key -> {ident: event} for the active events bound to that key
+        self.latency = LatencyHistogram()
 
     def addEvent(
         self, ident, key, func, hint_setter=None, active=False, persistent=False, func_args=None
     ):
+        if ident in self.__events:
+            self.__unindex(ident)
         self.__events[ident] = KeystrokeEvent(
-            key, func, hint_setter, active, persistent, func_args
+            key, func, hint_setter, active, persistent, func_args, len(self.__events)
         )
+        if active:
+            self.__active.setdefault(key, {})[ident] = self.__events[ident]
+
+    def __unindex(self, ident):
+        e = self.__events[ident]
+        active = self.__active.get(e.key)
+        if active is not None:
+            active.pop(ident, None)
 
     def call(self, key):
-        """this is split in to two for loops so one execution doesnt cause another event to trigger"""
-        events_to_call = []
-        for ident, event in self.__events.items():
-            if event.active and event.key == key:
-                logging.info(f"Calling {ident}")
-                events_to_call.append(event)
-                if not event.persistent:
-                    self._deactivate(ident)
-
-        for event in events_to_call:
+        """this is split in to two loops so one execution doesnt cause another event to trigger"""
+        start = time.perf_counter()
+        active = self.__active.get(key)
+        if not active:
+            # a key with nothing to do is still a dispatch
+            self.latency.record((time.perf_counter() - start) * 1000)
+            return
+        events_to_call = sorted(active.items(), key=lambda item: item[1].order)
+        for ident, event in events_to_call:
+            logging.debug(f"Calling {ident}")
+            if not event.persistent:
+                self._deactivate(ident)
+
+        for _, event in events_to_call:
             if event.func_args is not None:
                 event.func(event.func_args)
             else:
                 event.func()
+        self.latency.record((time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        """active events by key, for debugging"""
+        return {
+            key: sorted(active, key=lambda ident: self.__events[ident].order)
+            for key, active in self.__active.items()
+            if active
+        }
 
     def _activate(self, ident):
         logging.info(f"Activating {ident}")
         e = self.__events[ident]
         e.active = True
-        e.hint_setter(True)
+        self.__active.setdefault(e.key, {})[ident] = e
         if e.hint_setter:
             e.hint_setter(True)
 
     def _deactivate(self, ident):
         e = self.__events[ident]
         e.active = False
+        self.__unindex(ident)
         if e.hint_setter:
             e.hint_setter(False)
 
@@ -132,93 +124,175 @@ class KeystrokeManager(object):
             self._deactivate(idents)
 
 
-@dataclass
-class Question:
-    index: tuple
-    text: str
-    answer: str
-    category: str
-    value: int = -1
-    dd: bool = False
-    complete: bool = False
-    image: bool = False
-    image_url: str = None
-    actual_results: str = None
-
-
-class Board(object):
-    size = (6, 5)
-
-    def __init__(self, categories, questions, dj=False):
-        self.categories = categories
-        self.dj = dj
-        if not questions is None:
-            self.questions = questions
-        else:
-            self.questions = []
+class QtPresenter(Presenter):
+    """Shows a Game on the host and main windows"""
 
-    def get_question(self, i, j):
-        for q in self.questions:
-            if q.index == (i, j):
-                return q
-        return None
+    def __init__(self, game):
+        self.game = game
 
-    def complete(self):
-        return len(self.questions) == 30
+    @property
+    def dc(self):
+        return self.game.dc
 
+    def activate(self, *idents):
+        self.game.keystroke_manager.activate(*idents)
 
-class FinalBoard(Board):
-    size = (1, 1)
+    def deactivate(self, *idents):
+        self.game.keystroke_manager.deactivate(*idents)
 
-    def __init__(self, category, question):
-        super().__init__([category], [question], dj=False)
-        self.category = category
-        self.question = question
+    def start_game(self, board):
+        self.dc.hide_welcome_widgets()
+        self.dc.board_widget.load_round(board)
+        self.game.buzzer_controller.accepting_players = False
+        self.game.audio.stop("intro")
 
-    def complete(self):
-        return len(self.questions) == 1
+    def load_round(self, board):
+        self.dc.board_widget.load_round(board)
 
+    def load_question(self, q):
+        self.dc.load_question(q)
+        self.dc.remove_card(q)
 
-@dataclass
-class GameData:
-    rounds: list
-    date: str
-    comments: str
+    def daily_double(self, q):
+        self.game.audio.play("dd")
 
+    def request_dd_wager(self, player, max_wager):
+        wager, given = QInputDialog.getInt(
+            self.game.host_display,
+            "Wager",
+            f"How much do they wager? (min: 5, max: ${max_wager})",
+            min=5,
+            max=max_wager,
+        )
+        return wager if given else None
+
+    def show_dd_question(self, q):
+        self.dc.question_widget.show_question()
+
+    def review_image(self, q):
+        self.game.host_display.load_image_review_screen(q)
+
+    def hide_question(self):
+        self.dc.hide_question()
+
+    def responses_lights(self, on):
+        self.dc.borders.lights(on)
+
+    def player_lights(self, player, on):
+        self.dc.player_widget(player).set_lights(on)
+
+    def player_buzzed(self, player):
+        self.dc.player_widget(player).run_lights()
+
+    def player_answered(self, player):
+        self.dc.player_widget(player).stop_lights()
+
+    def buzz_hint(self, player):
+        self.dc.player_widget(player).buzz_hint()
+
+    def stumped(self):
+        self.game.audio.play("stumped")
+        self.dc.borders.flash()
+
+    def score_changed(self, player):
+        self.dc.player_widget(player).update_score()
+        if self.game.buzzer_controller:
+            self.game.buzzer_controller.publish_scores(self.game.players)
 
-class Game(QObject):
-    buzz_trigger = pyqtSignal(int)
+    def board_changed(self, board, active_question):
+        if self.game.buzzer_controller:
+            self.game.buzzer_controller.publish_board(board, active_question)
+
+    def timer_changed(self, timer):
+        if self.game.buzzer_controller:
+            self.game.buzzer_controller.publish_timer(timer)
+
+    def lectern_update(self, player, buzzed, active, show_final_answer):
+        buzzer_controller = self.game.buzzer_controller
+        if buzzer_controller:
+            state_dict = buzzer_controller.get_player_state_dict(player)
+            state_dict["buzzed"] = buzzed
+            state_dict["active"] = active
+            # Only include finalanswer if we're showing it
+            if not show_final_answer:
+                state_dict["finalanswer"] = None
+            self.game.lectern_update_trigger.emit(player.player_number, state_dict)
+
+    def load_final(self, q):
+        self.dc.load_final(q)
+        self.game.graph_renderer.warm_up()
+
+    def open_wagers(self):
+        self.game.buzzer_controller.open_wagers()
+
+    def wagers_in(self):
+        self.game.host_display.question_widget.hint_label.setText("Press space to show clue!")
+
+    def open_final(self, q):
+        self.dc.question_widget.show_question()
+
+    def final_prompt(self):
+        self.game.buzzer_controller.prompt_answers()
+        self.game.audio.play("final")
+
+    def final_timeout(self):
+        self.game.toolate_trigger.emit()
+        self.dc.borders.flash()
+
+    def load_final_judgement(self):
+        self.dc.load_final_judgement()
+        self.game.render_score_graphs()
+
+    def final_judging(self, player):
+        self.dc.player_widget(player).set_lights(True)
+        self.dc.final_window.guess_label.setText("")
+        self.dc.final_window.wager_label.setText("")
+
+    def final_answer_shown(self, player, answer):
+        self.dc.final_window.guess_label.setText(answer)
+
+    def final_wager_shown(self, player):
+        self.dc.final_window.wager_label.setText(str(player.wager))
+        # re-render with this judgement, replacing the render that has not started yet
+        self.game.render_score_graphs()
+
+    def end_game(self, winners):
+        for w in winners:
+            self.dc.player_widget(w).set_lights(True)
+
+        if len(winners) == 1:
+            self.dc.final_window.show_winner(winners[0])
+        else:
+            self.dc.final_window.show_tie()
+
+
+class Game(QObject, GameEngine):
+    """The game as played with the Qt windows and the buzzer server, rules are in GameEngine"""
+
+    buzz_trigger = pyqtSignal(object, object)  # player, Claim on the buzz gate or None
     new_player_trigger = pyqtSignal()
     wager_trigger = pyqtSignal(int, int)
     toolate_trigger = pyqtSignal()
     lectern_update_trigger = pyqtSignal(int, dict)
+    call_trigger = pyqtSignal(object)  # runs a function on the GUI thread
 
     def __init__(self):
-        super().__init__()
+        super().__init__(presenter=QtPresenter(self), journal=GameJournal())
 
         self.host_display = None
         self.main_display = None
         self.dc = None
-        self.question_number = 1
-        self.data = None
-
-        self.current_round = None
-        self.players = []
-        self.original_players = {}
-
-        self.active_question = None
-        self.accepting_responses = False
-        self.answering_player = None
-        self.previous_answerer = None
-        self.timer = None
-        self.soliciting_player = False  # part of selecting who found a daily double
-
-        self.song_player = SongPlayer()
-        self.__judgement_round = 0
-        self.__sorted_players = None
+        # question timers share one thread and fire on the GUI thread
+        self.scheduler = Scheduler(dispatch=self.call_trigger.emit)
 
+        self.audio = AudioEngine()
         self.buzzer_controller = None
 
+        self.graph_renderer = GraphRenderer()
+        self.graphs = None  # {graph set: QImage} once the end of game graphs are rendered
+        self.__graphs_request = 0
+        self.__show_graphs_when_rendered = False
+
         self.keystroke_manager = KeystrokeManager()
 
         self.keystroke_manager.addEvent(
@@ -286,23 +360,42 @@ class Game(QObject):
                 func_args=player_index
             )
         self.wager_trigger.connect(self.wager)
-        self.buzz_trigger.connect(self.buzz)
+        self.buzz_trigger.connect(self.buzz_player)
         self.new_player_trigger.connect(self.new_player)
         self.toolate_trigger.connect(self.__toolate)
         self.lectern_update_trigger.connect(self.__broadcast_lectern_update)
+        self.call_trigger.connect(self.__call)
 
     def startable(self):
         return self.valid_game() and len(self.buzzer_controller.connected_players) > 0
 
-    def begin(self):
-        self.song_player.play(repeat=True)
+    def begin(self, on_audio_error=None):
+        """play the intro; on_audio_error(e) is called on the GUI thread if it cannot be played"""
+        started = self.audio.play("intro", loop=True)
+        if on_audio_error is not None:
+
+            def check(future):
+                e = future.exception()
+                if e is not None:
+                    self.call_trigger.emit(lambda: on_audio_error(e))
+
+            started.add_done_callback(check)
 
     def start_game(self):
-        self.current_round = self.data.rounds[0]
-        self.dc.hide_welcome_widgets()
-        self.dc.board_widget.load_round(self.current_round)
-        self.buzzer_controller.accepting_players = False
-        self.song_player.stop()
+        self.game_id = os.environ.get("JPARTY_GAME_ID")
+        super().start_game()
+
+    def resume_game(self, game_id, records):
+        """carry on with a game from the journal of a run that crashed
+
+        The players are restored with their tokens, so their browsers rejoin as the same players.
+        """
+        logging.info(f"Resuming game {game_id}")
+        self.data = get_game(game_id)
+        replay(self, records)
+        self.buzzer_controller.connected_players = self.players
+        self.dc.scoreboard.refresh_players()
+        self.resume()
 
     def setDisplays(self, host_display, main_display):
         self.host_display = host_display
@@ -323,392 +416,76 @@ class Game(QObject):
         self.dc.scoreboard.refresh_players()
         self.host_display.welcome_widget.check_start()
         for player in self.players:
-            self._update_lectern_for_player(player)
+            self.update_lectern(player)
+        self.buzzer_controller.publish_scores(self.players)
 
     def remove_player(self, player):
-        self.players.remove(player)
-        player.waiter.close()
+        self.buzzer_controller.registry.remove(player)
+        if player.waiter is not None:
+            player.waiter.close()
         self.dc.scoreboard.refresh_players()
         self.host_display.welcome_widget.check_start()
-
-    def valid_game(self):
-        return self.data is not None and all(b.complete() for b in self.data.rounds)
-
-    def open_responses(self):
-        self.dc.borders.lights(True)
-        self.accepting_responses = True
-
-        if not self.timer:
-            self.timer = QuestionTimer(QUESTIONTIME, self.stumped)
-
-        self.timer.start()
-
-    def close_responses(self):
-        self.timer.pause()
-        self.accepting_responses = False
-        self.dc.borders.lights(True)
+        self.buzzer_controller.publish_scores(self.players)
 
     def keyboard_buzz(self):
         self.buzz(0)
 
-
-    def buzz(self, i_player):
-        player = self.players[i_player]
-        if self.accepting_responses and player is not self.previous_answerer:
-            logging.info(f"buzz ({time.time():.6f} s)")
-            self.accepting_responses = False
-            self.timer.pause()
-            self.previous_answerer = player
-            self.dc.player_widget(player).run_lights()
-
-            self.answering_player = player
-            self.keystroke_manager.activate("CORRECT_ANSWER", "INCORRECT_ANSWER")
-            self.dc.borders.lights(False)
-            self._update_lectern_for_player(player, buzzed=True)
-        elif self.active_question is None:
-            self.dc.player_widget(player).buzz_hint()
-        else:
-            pass
-
-    def answer_given(self):
-        self.keystroke_manager.deactivate("CORRECT_ANSWER", "INCORRECT_ANSWER")
-        self.dc.player_widget(self.answering_player).stop_lights()
-        answering_player = self.answering_player
-        self.answering_player = None
-        if answering_player:
-            self._update_lectern_for_player(answering_player, buzzed=False)
-
-    def update_original_player_scores(self):
-        buzzed_players = []
-        for player, score in self.active_question.actual_results:
-            if player not in self.original_players:
-                self.original_players[player] = [0 for _ in range(self.question_number)]
-            buzzed_players.append(player)
-            self.original_players[player].append(score + self.original_players[player][-1])
-        for player in self.original_players:
-            if player not in buzzed_players:
-                self.original_players[player].append(self.original_players[player][-1])
-
-    def back_to_board(self):
-        logging.info("back_to_board")
-        self.question_number += 1
-        self.dc.hide_question()
-        self.timer = None
-        self.active_question.complete = True
-        self.update_original_player_scores()
-        self.active_question = None
-        self.previous_answerer = None
-        # Clear active state for all players on lecterns
-        if self.answering_player:
-            self._update_lectern_for_player(self.answering_player, buzzed=False)
-        self.answering_player = None
-        # Update all players to ensure lecterns show correct state
-        for player in self.players:
-            self._update_lectern_for_player(player, buzzed=False)
-        if all(q.complete for q in self.current_round.questions):
-            logging.info("NEXT ROUND")
-            self.keystroke_manager.activate("NEXT_ROUND")
-
-    def accept_image(self):
-        logging.info("Proposed question image accepted")
-        self.load_question(self.active_question)
-
-    def no_image_needed(self):
-        logging.info("No image needed for question")
-        self.active_question.image = False
-        self.active_question.image_url = None
-        self.load_question(self.active_question)
-
-    def next_round(self):
-        logging.info("next round")
-        i = self.data.rounds.index(self.current_round)
-        logging.info(f"ROUND {i}")
-        self.current_round = self.data.rounds[i + 1]
-
-        if isinstance(self.current_round, FinalBoard):
-            self.dc.load_final(self.current_round.question)
-            self.active_question = self.current_round.question
-            self.update_original_player_scores()
-            self.start_final()
-        else:
-            self.dc.board_widget.load_round(self.current_round)
-
-    def start_final(self):
-        logging.info("start final")
-        for player in self.players:
-            self.dc.player_widget(player).set_lights(True)
-
-        self.buzzer_controller.open_wagers()
-
-    def wager(self, i_player, amount):
-        player = self.players[i_player]
-        player.wager = amount
-        self.dc.player_widget(player).set_lights(False)
-        logging.info(f"{player} wagered {amount}")
-        if all(p.wager is not None for p in self.players):
-            self.host_display.question_widget.hint_label.setText(
-                "Press space to show clue!"
-            )
-            self.keystroke_manager.activate("OPEN_FINAL")
-
-    def answer(self, player, guess):
-        player.finalanswer = guess
-        logging.info(f"{player} guessed {guess}")
-
-    def final_open_responses(self):
-        self.dc.borders.lights(True)
-        self.buzzer_controller.prompt_answers()
-
-        self.song_player.final()
-
-        self.timer = QuestionTimer(FJTIME, self.final_finished_song)
-        self.timer.start()
-
-    def final_next_player(self):
-        for p in self.players:
-            self.dc.player_widget(p).set_lights(False)
-
-        if self.__judgement_round == 0:
-            self.dc.load_final_judgement()
-            self.__sorted_players = sorted(self.players, key=lambda x: x.score)
-
-        elif self.__judgement_round == len(self.players):
-            self.end_game()
-            return
-
-        self.answering_player = self.__sorted_players[self.__judgement_round]
-
-        self.dc.player_widget(self.answering_player).set_lights(True)
-
-        self.dc.final_window.guess_label.setText("")
-        self.dc.final_window.wager_label.setText("")
-        
-        # Update lectern to show player name (answer will be shown in final_show_answer)
-        self._update_lectern_for_player(self.answering_player, show_final_answer=False)
-
-        self.keystroke_manager.activate("FINAL_SHOW_ANSWER")
-
-    def final_show_answer(self):
-        answer = self.answering_player.finalanswer
-        if answer == "":
-            answer = "________"
-
-        self.dc.final_window.guess_label.setText(answer)
-        # Update lectern to show final answer
-        self._update_lectern_for_player(self.answering_player, show_final_answer=True)
-        self.keystroke_manager.activate(
-            "FINAL_CORRECT_ANSWER", "FINAL_INCORRECT_ANSWER"
-        )
-
-    def final_correct_answer(self):
-        ap = self.answering_player
-        new_score = ap.score + ap.wager
-        ap.update_scores(self.question_number, new_score)
-        self.set_score(ap, ap.score + ap.wager)
-        self.final_judgement_given()
-
-    def final_incorrect_answer(self):
-        ap = self.answering_player
-        new_score = ap.score - ap.wager
-        ap.update_scores(self.question_number, new_score)
-        self.set_score(ap, new_score)
-        self.final_judgement_given()
-
-    def final_judgement_given(self):
-        self.keystroke_manager.deactivate(
-            "FINAL_CORRECT_ANSWER", "FINAL_INCORRECT_ANSWER"
-        )
-        self.dc.final_window.wager_label.setText(str(self.answering_player.wager))
-        self.keystroke_manager.activate("FINAL_NEXT_PLAYER")
-        self.__judgement_round += 1
-
-    def final_finished_song(self):
-        logging.info("Final song ended")
-        self.toolate_trigger.emit()
-        self.accepting_responses = False
-        self.dc.borders.flash()
-        self.keystroke_manager.activate("FINAL_NEXT_PLAYER")
-
-    def end_game(self):
-        top_score = max([p.score for p in self.players])
-        winners = [p for p in self.players if p.score == top_score]
-        for w in winners:
-            self.dc.player_widget(w).set_lights(True)
-
-        if len(winners) == 1:
-            self.dc.final_window.show_winner(winners[0])
-        else:
-            self.dc.final_window.show_tie()
-
-        # self.generate_final_score_graph()
-        logging.info("Game over!")
-        self.keystroke_manager.activate("GENERATE_GRAPHS")
+    def render_score_graphs(self):
+        """render the end of game graphs in the graph worker while Final Jeopardy is judged
+
+        Called when judging starts and after each judgement, graphs from an older call are ignored.
+        """
+        self.graphs = None
+        self.__graphs_request += 1
+        request = self.__graphs_request
+        series = {
+            "original": self.scores.series(original=True),
+            "current": self.scores.series(original=False),
+            "all": self.scores.series(),
+        }
+
+        def rendered(images):
+            # decode here, on the worker's callback thread, so the GUI thread only shows them
+            graphs = {name: QImage.fromData(png) for name, png in (images or {}).items()}
+            self.call_trigger.emit(lambda: self.__graphs_rendered(request, graphs))
+
+        save_dir = GAME_SCORES if SAVE_SCORE_GRAPHS else None
+        self.graph_renderer.render(self.game_id, series, rendered, save_dir)
+
+    def __graphs_rendered(self, request, graphs):
+        if request != self.__graphs_request:
+            return  # rendered for a game that was closed
+        self.graphs = graphs
+        if self.__show_graphs_when_rendered:
+            self.__show_graphs()
 
     def generate_final_score_graphs(self):
         self.keystroke_manager.deactivate("GENERATE_GRAPHS")
-        
-        for player_set in ["original", "current", "all"]:
-            self.generate_final_score_graph(player_set)
-        
-        # Ensure PyQt6 GUI is fully updated after all matplotlib operations
-        QApplication.processEvents()
-        
-        self.dc.load_final_graphs()
-        self.keystroke_manager.activate("CLOSE_GAME")
+        if self.graphs is None:
+            logging.info("Waiting for the score graphs")
+            self.__show_graphs_when_rendered = True
+            return
+        self.__show_graphs()
 
-    def generate_final_score_graph(self, players):
-        """create an image of score by question number"""
-        current_player_data = {player.player_number : player.score_by_question for player in self.players}
-        if players == "original":
-            data = self.original_players
-        elif players == "current":
-            data = current_player_data
-        elif players == "all":
-            data = current_player_data | self.original_players
-        
-        game_id = os.environ["JPARTY_GAME_ID"]
-        
-        # Isolate matplotlib operations to prevent interference with PyQt6
-        fig = None
-        try:
-            # Create matplotlib figure
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Plot each player's scores
-            for player, scores in data.items():
-                x_values = list(range(1, len(scores)+1))
-                ax.plot(x_values, scores, marker='o', label=str(player), linewidth=2, markersize=6)
-            
-            ax.set_xlabel('Question Number', fontsize=12)
-            ax.set_ylabel('Score', fontsize=12)
-            ax.set_title(f'Game {game_id}:Player Scores', fontsize=14, fontweight='bold')
-            ax.legend(loc='best')
-            ax.grid(True, alpha=0.3)
-            
-            # Save the figure
-            games_scores_dir = REPO_ROOT / "jparty" / "data" / "game_scores"
-            games_scores_dir.mkdir(exist_ok=True)
-            image_path = games_scores_dir / f"{game_id}-{players}.jpg"
-            
-            plt.tight_layout()
-            fig.savefig(str(image_path), dpi=150, bbox_inches='tight')
-        finally:
-            # Always clean up matplotlib state
-            if fig is not None:
-                plt.close(fig)  # Close figure to free memory
-            plt.close('all')  # Close all figures to ensure clean state
-            # Ensure matplotlib doesn't interfere with PyQt6
-            plt.ioff()  # Turn off interactive mode
-        
-        # Process PyQt6 events to ensure GUI stays responsive
-        QApplication.processEvents()
+    def __show_graphs(self):
+        self.__show_graphs_when_rendered = False
+        self.dc.load_final_graphs(self.graphs.get("all"))
+        self.keystroke_manager.activate("CLOSE_GAME")
 
     def close_game(self):
         self.buzzer_controller.restart()
         # Notify all lecterns that players are cleared
         if self.buzzer_controller:
-            for player_number in list(self.buzzer_controller.lectern_connections.keys()):
-                if player_number in self.buzzer_controller.lectern_connections:
-                    try:
-                        self.buzzer_controller.lectern_connections[player_number].send("NO_PLAYER", "")
-                    except:
-                        pass
-        self.players = []
-        self.original_players = {}
-        self.question_number = 1
-        self.active_question = None
-        self.current_round = None
-        self.answering_player = None
-        self.timer = None
-        self.data = None
-        self.__judgement_round = 0
+            self.buzzer_controller.lectern_hub.clear()
+        self.reset()
+        self.graphs = None
+        self.__graphs_request += 1
+        self.__show_graphs_when_rendered = False
         self.dc.restart()
         self.begin()
 
-    def get_dd_wager(self, player):
-        self.answering_player = player
-        self.soliciting_player = False
-        try:
-            logging.info(f"Current round is: {self.current_round}")
-            logging.info(f"Rounds are {self.data.rounds}")
-            round_index = self.data.rounds.index(self.current_round)
-        except:
-            round_index = 1
-
-        max_wager = max(
-            self.answering_player.score,
-            1000 if round_index == 0 else 2000)
-        wager_res = QInputDialog.getInt(
-            self.host_display,
-            "Wager",
-            f"How much do they wager? (min: 5, max: ${max_wager})",
-            min=5,
-            max=max_wager,
-        )
-        if not wager_res[1]:
-            self.soliciting_player = True
-            return False
-
-        wager = wager_res[0]
-        self.active_question.value = wager
-
-        self.keystroke_manager.activate("CORRECT_ANSWER", "INCORRECT_ANSWER")
-        self.dc.question_widget.show_question()
-
-    def load_image_review_screen(self, q):
-        self.active_question = q
-        self.host_display.load_image_review_screen(q)
-
-
-    def load_question(self, q):
-        self.active_question = q
-        if q.dd:
-            logging.info("Daily double!")
-            wo = sa.WaveObject.from_wave_file(resource_path("dd.wav"))
-            wo.play()
-            self.soliciting_player = True
-        else:
-            self.keystroke_manager.activate("OPEN_RESPONSES")
-        self.dc.load_question(q)
-        self.dc.remove_card(q)
-
-    def open_final(self):
-        self.dc.question_widget.show_question()
-        self.keystroke_manager.activate("FINAL_OPEN_RESPONSES")
-
-    def correct_answer(self):
-        new_score = self.answering_player.score + self.active_question.value
-        self.answering_player.update_scores(self.question_number, new_score) 
-        if self.timer:
-            self.timer.cancel()
-
-        self.set_score(
-            self.answering_player,
-            new_score,
-        )
-        self.dc.borders.lights(False)
-        self.answer_given()
-        self.back_to_board()
-
-    def incorrect_answer(self):
-        new_score = self.answering_player.score - self.active_question.value
-        self.answering_player.update_scores(self.question_number, new_score) 
-        self.set_score(
-            self.answering_player,
-            new_score,
-        )
-        self.answer_given()
-        if self.active_question.dd:
-            self.back_to_board()
-        else:
-            self.open_responses()
-            self.timer.resume()
-
-    def stumped(self):
-        self.accepting_responses = False
-        sa.WaveObject.from_wave_file(resource_path("stumped.wav")).play()
-        self.dc.borders.flash()
-        self.keystroke_manager.activate("BACK_TO_BOARD")
+    def __call(self, f):
+        f()
 
     def __toolate(self):
         self.buzzer_controller.toolate()
@@ -717,21 +494,6 @@ class Game(QObject):
         if self.buzzer_controller:
             self.buzzer_controller.broadcast_to_lecterns(player_number, state_dict)
 
-    def _update_lectern_for_player(self, player, buzzed=False, show_final_answer=False):
-        if self.buzzer_controller:
-            state_dict = self.buzzer_controller.get_player_state_dict(player)
-            state_dict["buzzed"] = buzzed
-            state_dict["active"] = (self.answering_player is player) if self.answering_player else False
-            # Only include finalanswer if we're showing it
-            if not show_final_answer:
-                state_dict["finalanswer"] = None
-            self.lectern_update_trigger.emit(player.player_number, state_dict)
-
-    def set_score(self, player, score):
-        player.score = score
-        self.dc.player_widget(player).update_score()
-        self._update_lectern_for_player(player)
-
     def adjust_score(self, player):
         new_score, answered = QInputDialog.getInt(
             self.host_display,
@@ -740,40 +502,19 @@ class Game(QObject):
             value=player.score,
         )
         if answered:
+            self.record("score", player.player_number, new_score)
+            self.scores.set_score(player, self.scores.last, new_score)
             self.set_score(player, new_score)
-        player.score_by_question[-1] = new_score
 
     def close(self):
-        self.song_player.stop()
+        logging.info(f"key dispatch latency: {self.keystroke_manager.latency}")
+        logging.info(f"audio latency: {self.audio.latency}")
+        logging.info(f"buzz to lights latency: {self.lights_latency}")
+        if self.buzzer_controller:
+            logging.info(f"buzz decision latency: {self.buzzer_controller.decision_latency}")
+            logging.info(f"lectern updates: {self.buzzer_controller.lectern_hub}")
+        self.host_display.welcome_widget.game_pool.stop()
+        self.audio.close()
+        self.journal.close()
+        self.graph_renderer.shutdown()
         QApplication.quit()
-
-
-class Player(object):
-    def __init__(self, name, waiter, player_number):
-        self.name = name
-        self.token = os.urandom(15)
-        # score at index 0 is start of game, 1 after first question
-        self.score_by_question = [0]
-        self.score = 0
-        self.waiter = waiter
-        self.wager = None
-        self.finalanswer = ""
-        self.page = "buzz"
-        self.player_number = player_number
-        self.key = index_to_key[player_number]
-
-    def __hash__(self):
-        return int.from_bytes(self.token, sys.byteorder)
-
-    def state(self):
-        return {"page": self.page, "score": self.score}
-    
-    def update_scores(self, question_number, new_score):
-        """update players score"""
-        if (len(self.score_by_question)) == question_number:
-            self.score_by_question.append(new_score)
-        else:
-            for _ in range(question_number - len(self.score_by_question)):
-                self.score_by_question.append(self.score_by_question[-1])
-            self.score_by_question.append(new_score)
-
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+
+from jparty.model import Question, Board, FinalBoard, GameData
+from jparty.constants import GAME_CACHE
+from jparty.media_manifest import media_names
+
+# bump whenever the parser or the layout below changes so stale entries are ignored
+CACHE_VERSION = 1
+
+
+def source_digest(html, game_id):
+    """Fingerprint of everything a parsed game depends on: the page html and the question media files"""
+    h = hashlib.sha1(html.encode("utf-8", errors="surrogatepass"))
+    for name in media_names(game_id):
+        h.update(b"\0" + name.encode("utf-8"))
+    return h.hexdigest()
+
+
+def cache_path(game_id):
+    return GAME_CACHE / f"{game_id}.json"
+
+
+def question_to_list(q):
+    return [
+        list(q.index),
+        q.text,
+        q.answer,
+        q.category,
+        q.value,
+        q.dd,
+        bool(q.image),
+        q.image_url,
+        q.actual_results,
+    ]
+
+
+def question_from_list(l):
+    index, text, answer, category, value, dd, image, image_url, actual_results = l
+    return Question(
+        tuple(index),
+        text,
+        answer,
+        category,
+        value,
+        dd,
+        image=image,
+        image_url=image_url,
+        actual_results=actual_results,
+    )
+
+
+def game_to_dict(game_data):
+    rounds = []
+    for board in game_data.rounds:
+        if isinstance(board, FinalBoard):
+            rounds.append({"final": question_to_list(board.question)})
+        else:
+            rounds.append(
+                {
+                    "categories": list(board.categories),
+                    "dj": board.dj,
+                    "questions": [question_to_list(q) for q in board.questions],
+                }
+            )
+    return {"rounds": rounds, "date": str(game_data.date), "comments": str(game_data.comments)}
+
+
+def game_from_dict(d):
+    rounds = []
+    for r in d["rounds"]:
+        if "final" in r:
+            question = question_from_list(r["final"])
+            rounds.append(FinalBoard(question.category, question))
+        else:
+            questions = [question_from_list(q) for q in r["questions"]]
+            rounds.append(Board(r["categories"], questions, dj=r["dj"]))
+    return GameData(rounds, d["date"], d["comments"])
+
+
+def load_cached_game(game_id, digest):
+    """Return the cached GameData for this game, or None if it is missing or stale"""
+    path = cache_path(game_id)
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.error(f"Cannot read cached game {game_id}: {e}")
+        return None
+
+    if entry.get("version") != CACHE_VERSION or entry.get("source") != digest:
+        logging.info(f"Cached game {game_id} is stale")
+        return None
+
+    try:
+        return game_from_dict(entry["game"])
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f"Corrupt cached game {game_id}: {e}")
+        return None
+
+
+def save_cached_game(game_id, digest, game_data):
+    entry = {"version": CACHE_VERSION, "source": digest, "game": game_to_dict(game_data)}
+    path = cache_path(game_id)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error(f"Cannot write cached game {game_id}: {e}")
@@ -0,0 +1,268 @@
+import csv
+import json
+import logging
+import threading
+from dataclasses import dataclass
+
+from jparty.constants import GAME_PACKS
+from jparty.http_client import default_client, GSHEET_TTL
+from jparty.retrieve import list_to_game
+
+PACK_SEPARATOR = "#"  # "<pack>#<n>" is game n (from 1) of a pack
+DOWNLOAD_CHUNK = 64 * 1024
+
+
+@dataclass
+class PackEntry:
+    title: str
+    offset: int  # byte offset of the first row of the game
+
+
+def split_pack_game_id(game_id):
+    """"themed.csv#40" -> ("themed.csv", 40), None if game_id is not a pack game"""
+    source, sep, number = str(game_id).rpartition(PACK_SEPARATOR)
+    if not sep or not source or not number.isdigit() or int(number) < 1:
+        return None
+    return source, int(number)
+
+
+def csv_records(f, offset=0):
+    """Yield (offset, row) for each csv record of a binary file, starting at a byte offset
+
+    Rows are read lazily, so a caller that stops early never reads the rest of the file.
+    """
+    f.seek(offset)
+    pos = offset
+
+    def lines():
+        nonlocal pos
+        for line in f:
+            if pos == 0 and line.startswith(b"\xef\xbb\xbf"):
+                line = line[3:]
+                pos += 3
+            pos += len(line)
+            yield line.decode("utf-8")
+
+    reader = csv.reader(lines())
+    while True:
+        start = pos
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        yield start, row
+
+
+class StreamedFile(object):
+    """Seekable binary file over the chunks of a download, which are read only as far as needed
+
+    Everything read is kept, so earlier offsets can be read again without downloading them twice.
+    """
+
+    def __init__(self, chunks, on_complete=None):
+        self.__chunks = iter(chunks)
+        self.__on_complete = on_complete
+        self.__data = bytearray()
+        self.__pos = 0
+        self.complete = False
+
+    def __read_chunk(self):
+        chunk = next(self.__chunks, None)
+        if chunk is None:
+            self.complete = True
+            if self.__on_complete is not None:
+                self.__on_complete()
+        else:
+            self.__data += chunk
+
+    def seek(self, offset):
+        self.__pos = offset
+
+    def tell(self):
+        return self.__pos
+
+    def readline(self):
+        searched = self.__pos
+        while True:
+            end = self.__data.find(b"\n", searched)
+            if end >= 0:
+                end += 1
+                break
+            if self.complete:
+                end = len(self.__data)
+                break
+            searched = len(self.__data)
+            self.__read_chunk()
+        line = bytes(self.__data[self.__pos : end])
+        self.__pos = max(self.__pos, end)
+        return line
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        # kept open, the next read carries on from what is already downloaded
+        pass
+
+
+def is_marker(row):
+    return len(row) > 0 and row[0].startswith(PACK_SEPARATOR)
+
+
+def blank(row):
+    return not any(cell.strip() for cell in row)
+
+
+class GamePack(object):
+    """Many custom games in one file, indexed on first read and parsed one game at a time
+
+    A csv pack (a local .csv file or a Google Sheet) is the rows of several custom game templates
+    one after another, each preceded by a marker row whose first cell starts with "#", e.g.
+    "# Game 1: Movies". A json pack (.json or .jsonl) has one game per line, either the rows of
+    the template or {"title": ..., "rows": [...]}.
+
+    Args:
+        source: name of a file in GAME_PACKS, or a Google Sheet file id
+        client: http client used to download Google Sheet packs
+    """
+
+    def __init__(self, source, client=None):
+        self.source = source
+        self.client = client
+        self.path = GAME_PACKS / source
+        self.local = self.path.is_file()
+        self.json = self.local and self.path.suffix in (".json", ".jsonl")
+        self.__data = None  # StreamedFile of the Google Sheet csv
+        self.__mtime = None
+        self.__entries = []
+        self.__scan_offset = 0  # where indexing stopped
+        self.__scanned = False
+        self.__rows = {}  # game number -> rows of the template
+        self.__lock = threading.Lock()
+
+    def __open(self):
+        if self.local:
+            return self.path.open("rb")
+        if self.__data is None:
+            client = self.client or default_client()
+            csv_url = f"https://docs.google.com/spreadsheet/ccc?key={self.source}&output=csv"
+            r = client.get(csv_url, endpoint="gsheet", cache_ttl=GSHEET_TTL, stream=True)
+            r.raise_for_status()
+            # a game near the start of a big pack is parsed before the rest is downloaded
+            self.__data = StreamedFile(r.iter_content(DOWNLOAD_CHUNK), on_complete=r.close)
+        return self.__data
+
+    def __check_fresh(self):
+        """forget the index and read games if the local file changed"""
+        if not self.local:
+            return
+        mtime = self.path.stat().st_mtime_ns
+        if mtime != self.__mtime:
+            self.__mtime = mtime
+            self.__entries = []
+            self.__scan_offset = 0
+            self.__scanned = False
+            self.__rows = {}
+
+    def __scan(self, f, count=None):
+        """index games until `count` are known, or to the end of the file if count is None"""
+        while not self.__scanned and (count is None or len(self.__entries) < count):
+            if self.json:
+                f.seek(self.__scan_offset)
+                line = f.readline()
+                if not line:
+                    self.__scanned = True
+                elif line.strip():
+                    self.__entries.append(PackEntry(None, self.__scan_offset))
+                self.__scan_offset += len(line)
+                continue
+
+            for offset, row in csv_records(f, self.__scan_offset):
+                if is_marker(row):
+                    self.__entries.append(PackEntry(row[0][1:].strip(), f.tell()))
+                    self.__scan_offset = f.tell()
+                    break
+                if not self.__entries and not blank(row):
+                    # a single game without markers, e.g. a plain custom game sheet
+                    self.__entries.append(PackEntry(None, offset))
+                    self.__scanned = True
+                    break
+            else:
+                self.__scanned = True
+
+    def __len__(self):
+        with self.__lock:
+            self.__check_fresh()
+            with self.__open() as f:
+                self.__scan(f)
+            return len(self.__entries)
+
+    def titles(self):
+        with self.__lock:
+            self.__check_fresh()
+            with self.__open() as f:
+                self.__scan(f)
+                if self.json:
+                    for entry in self.__entries:
+                        if entry.title is None:
+                            f.seek(entry.offset)
+                            game = json.loads(f.readline())
+                            entry.title = game.get("title", "") if isinstance(game, dict) else ""
+            return [entry.title for entry in self.__entries]
+
+    def game(self, number):
+        """GameData of game `number`, counting from 1
+
+        A new GameData every call, as playing a game marks its clues done and sets the Daily
+        Double wagers on it; only the rows are kept between calls.
+        """
+        with self.__lock:
+            self.__check_fresh()
+            rows = self.__rows.get(number)
+            if rows is None:
+                with self.__open() as f:
+                    self.__scan(f, number)
+                    if number > len(self.__entries):
+                        raise IndexError(f"{self.source} has only {len(self.__entries)} games")
+                    rows = self.__rows[number] = self.__read(f, self.__entries[number - 1].offset)
+        return list_to_game(rows)
+
+    def __read(self, f, offset):
+        if self.json:
+            f.seek(offset)
+            game = json.loads(f.readline())
+            return game["rows"] if isinstance(game, dict) else game
+
+        rows = []
+        for _, row in csv_records(f, offset):
+            if is_marker(row):
+                break
+            rows.append(row)
+        while rows and blank(rows[-1]):
+            rows.pop()
+        return rows
+
+
+_packs = {}
+_packs_lock = threading.Lock()
+
+
+def get_pack(source):
+    with _packs_lock:
+        if source not in _packs:
+            _packs[source] = GamePack(source)
+        return _packs[source]
+
+
+def load_pack_game(game_id):
+    """GameData for a "<pack>#<n>" game id"""
+    source, number = split_pack_game_id(game_id)
+    logging.info(f"Loading game {number} of pack {source}")
+    return get_pack(source).game(number)
@@ -0,0 +1,154 @@
+import logging
+import sys
+from collections import deque
+from threading import Thread, Condition
+from urllib.parse import urlsplit
+
+from jparty import http_client
+from jparty.retrieve import load_game, get_random_game
+from jparty.search_index import random_complete_game, game_complete
+from jparty.constants import GAME_POOL_SIZE, GAME_POOL_MAX_BYTES
+
+
+def game_size(game_data):
+    """rough number of bytes held by a parsed game"""
+    size = sys.getsizeof(game_data.date) + sys.getsizeof(game_data.comments)
+    for board in game_data.rounds:
+        size += sum(sys.getsizeof(c) for c in board.categories)
+        for q in board.questions:
+            size += sys.getsizeof(q) + sys.getsizeof(q.text) + sys.getsizeof(q.answer)
+            size += sys.getsizeof(q.category)
+            if q.actual_results:
+                size += sum(sys.getsizeof(name) + 64 for name, _ in q.actual_results)
+    return size
+
+
+def remote_image_urls(game_data):
+    """urls of the clue images that are shown from the web rather than from a local file"""
+    return [
+        q.image_url
+        for board in game_data.rounds
+        for q in board.questions
+        if q.image and q.image_url and urlsplit(str(q.image_url)).scheme in ("http", "https")
+    ]
+
+
+class GamePool(object):
+    """Keep a few complete games loaded in the background so Random is instant
+
+    Args:
+        size: most games kept ready
+        max_bytes: most memory (estimated with game_size) the ready games may use
+        retry_delay: seconds to wait after a random game turns out to be invalid
+    """
+
+    def __init__(self, size=GAME_POOL_SIZE, max_bytes=GAME_POOL_MAX_BYTES, retry_delay=0.25):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.retry_delay = retry_delay
+        self.__games = deque()  # (game_id, game_data, bytes)
+        self.__bytes = 0
+        self.__running = False
+        self.__condition = Condition()
+        self.__thread = None
+
+    def start(self):
+        """start filling the pool, or carry on after stop"""
+        if self.size <= 0:
+            return
+        with self.__condition:
+            self.__running = True
+            self.__condition.notify_all()
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__fill, name="game_pool", daemon=True)
+                self.__thread.start()
+
+    def stop(self):
+        """stop fetching games, e.g. while a game is played; the ready games are kept
+
+        A fetch already running is finished, no new one is started.
+        """
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+
+    def __len__(self):
+        return len(self.__games)
+
+    def pop(self):
+        """Return a ready (game_id, game_data), or None if the pool is empty"""
+        with self.__condition:
+            if not self.__games:
+                return None
+            game_id, game_data, size = self.__games.popleft()
+            self.__bytes -= size
+            self.__condition.notify_all()
+        return game_id, game_data
+
+    def take(self, game_id):
+        """Return the ready game with this id, or None if it is not in the pool"""
+        with self.__condition:
+            for entry in self.__games:
+                if str(entry[0]) == str(game_id):
+                    self.__games.remove(entry)
+                    self.__bytes -= entry[2]
+                    self.__condition.notify_all()
+                    return entry[1]
+        return None
+
+    def __full(self):
+        return len(self.__games) >= self.size or self.__bytes >= self.max_bytes
+
+    def __backoff(self, failures):
+        """wait longer after each failed attempt so a small catalog or no network does not spin"""
+        with self.__condition:
+            self.__condition.wait(min(self.retry_delay * 2**failures, 30))
+
+    def __prefetch_images(self, game_id, game_data):
+        """fetch remote clue images into the http cache, where the question card finds them"""
+        for url in remote_image_urls(game_data):
+            if not self.__running:
+                return
+            try:
+                r = http_client.get(url, endpoint="image", cache_ttl=http_client.IMAGE_TTL)
+                r.raise_for_status()
+            except Exception as e:
+                logging.error(f"Cannot prefetch image {url} of game {game_id}: {e}")
+
+    def __fill(self):
+        failures = 0
+        while True:
+            with self.__condition:
+                while self.__running and self.__full():
+                    self.__condition.wait()
+                if not self.__running:
+                    self.__thread = None
+                    return
+
+            game_id = None
+            try:
+                game_id = random_complete_game()
+                if game_id is None:
+                    game_id = get_random_game()
+                game_data = load_game(game_id)
+            except Exception as e:
+                logging.error(f"Cannot prefetch game {game_id}: {e}")
+                game_data = None
+
+            size = game_size(game_data) if game_complete(game_data) else None
+            with self.__condition:
+                added = (
+                    size is not None
+                    and size <= self.max_bytes
+                    and not any(str(g[0]) == str(game_id) for g in self.__games)
+                )
+                if added:
+                    self.__games.append((game_id, game_data, size))
+                    self.__bytes += size
+            if added:
+                failures = 0
+                self.__prefetch_images(game_id, game_data)
+                logging.info(f"Prefetched game {game_id} ({len(self.__games)} ready)")
+            else:
+                self.__backoff(failures)
+                failures += 1
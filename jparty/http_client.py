@@ -0,0 +1,270 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from jparty.constants import HTTP_CACHE
+
+DEFAULT_TIMEOUT = 10  # seconds
+
+# cache lifetimes in seconds, stale entries are revalidated with ETag / Last-Modified
+WAYBACK_CDX_TTL = 24 * 60 * 60
+WAYBACK_SNAPSHOT_TTL = 30 * 24 * 60 * 60  # snapshots never change
+JARCHIVE_GAME_TTL = 24 * 60 * 60
+GSHEET_TTL = 60  # custom games are edited while people prepare them
+WIKIMEDIA_TTL = 24 * 60 * 60
+IMAGE_TTL = 7 * 24 * 60 * 60
+
+
+@dataclass
+class EndpointStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    errors: int = 0
+    requests: int = 0  # requests that went over the network
+    total_ms: float = 0
+    max_ms: float = 0
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.requests if self.requests else 0
+
+    def __str__(self):
+        return (
+            f"hits {self.hits}, misses {self.misses}, revalidated {self.revalidated}, "
+            f"errors {self.errors}, network {self.requests} "
+            f"(mean {self.mean_ms:.0f} ms, max {self.max_ms:.0f} ms)"
+        )
+
+
+@dataclass
+class SourceStats:
+    """How often a source won a race to fetch something and how long it took"""
+
+    wins: int = 0
+    attempts: int = 0
+    completed: int = 0  # attempts that finished before the race was over
+    failures: int = 0
+    total_ms: float = 0
+    max_ms: float = 0
+
+    @property
+    def win_rate(self):
+        return self.wins / self.attempts if self.attempts else 0
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.completed if self.completed else 0
+
+    def __str__(self):
+        return (
+            f"won {self.wins}/{self.attempts} ({self.win_rate:.0%}), failed {self.failures} "
+            f"(mean {self.mean_ms:.0f} ms, max {self.max_ms:.0f} ms)"
+        )
+
+
+class CircuitBreaker(object):
+    """Skip a source for `cooldown` seconds after `threshold` failures in a row
+
+    Once the cooldown is over a single trial request is let through, success closes the breaker
+    and failure opens it for another cooldown.
+    """
+
+    def __init__(self, threshold=3, cooldown=300):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial = False
+        self.__lock = threading.Lock()
+
+    def allow(self):
+        with self.__lock:
+            if self.__opened_at is None:
+                return True
+            if self.__trial or time.monotonic() - self.__opened_at < self.cooldown:
+                return False
+            self.__trial = True
+            return True
+
+    def record_success(self):
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial = False
+
+    def record_failure(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial or self.__failures >= self.threshold:
+                self.__opened_at = time.monotonic()
+            self.__trial = False
+
+    @property
+    def open(self):
+        with self.__lock:
+            return self.__opened_at is not None
+
+
+def cached_response(url, meta, body):
+    r = requests.Response()
+    r.status_code = meta["status"]
+    r.url = url
+    r.encoding = meta["encoding"]
+    r.headers = CaseInsensitiveDict(meta["headers"])
+    r._content = body
+    r._content_consumed = True
+    return r
+
+
+class HttpClient(object):
+    """requests wrapper with keep-alive pooling, default timeouts, an on-disk response cache and per-endpoint stats
+
+    Args:
+        session: session to send requests with, a new pooled one if None
+        cache: whether responses may be read from and written to the disk cache
+        cache_dir: directory of the disk cache
+        timeout: default timeout of every request
+    """
+
+    def __init__(self, session=None, cache=True, cache_dir=HTTP_CACHE, timeout=DEFAULT_TIMEOUT):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.cache = cache
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def stats(self):
+        """snapshot of the counters of every endpoint"""
+        with self.__lock:
+            return {name: EndpointStats(**vars(s)) for name, s in self.__stats.items()}
+
+    def log_stats(self):
+        for name, s in sorted(self.stats().items()):
+            logging.info(f"http {name}: {s}")
+
+    def __count(self, endpoint, **counts):
+        with self.__lock:
+            s = self.__stats.setdefault(endpoint, EndpointStats())
+            for name, n in counts.items():
+                setattr(s, name, getattr(s, name) + n)
+
+    def __cache_paths(self, url, params):
+        key = url if not params else url + "?" + json.dumps(params, sort_keys=True)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json", self.cache_dir / f"{digest}.body"
+
+    def __read_cache(self, url, params):
+        meta_path, body_path = self.__cache_paths(url, params)
+        try:
+            with meta_path.open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def __write_cache(self, url, params, meta, body=None):
+        meta_path, body_path = self.__cache_paths(url, params)
+        suffix = f".{uuid.uuid4().hex}.tmp"
+        try:
+            if body is not None:
+                tmp_body = body_path.with_name(body_path.name + suffix)
+                tmp_body.write_bytes(body)
+                os.replace(tmp_body, body_path)
+            tmp_meta = meta_path.with_name(meta_path.name + suffix)
+            with tmp_meta.open("w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, meta_path)
+        except OSError as e:
+            logging.error(f"Cannot cache {url}: {e}")
+
+    def get(self, url, params=None, headers=None, endpoint="other", cache_ttl=None, **kwargs):
+        """GET url, served from the disk cache for up to cache_ttl seconds if cache_ttl is given"""
+        use_cache = self.cache and cache_ttl is not None
+        meta = body = None
+        if use_cache:
+            meta, body = self.__read_cache(url, params)
+            if meta is not None and time.time() - meta["stored_at"] < cache_ttl:
+                self.__count(endpoint, hits=1)
+                return cached_response(url, meta, body)
+
+        headers = dict(headers or {})
+        if meta is not None:
+            if meta["headers"].get("ETag"):
+                headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        if self.timeout is not None:  # None leaves the timeout to the session
+            kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            r = self.session.get(url, params=params, headers=headers, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.__count(endpoint, errors=1)
+            if meta is not None:
+                logging.error(f"Serving stale {url} after error: {e}")
+                return cached_response(url, meta, body)
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self.__lock:
+                s = self.__stats.setdefault(endpoint, EndpointStats())
+                s.requests += 1
+                s.total_ms += elapsed
+                s.max_ms = max(s.max_ms, elapsed)
+
+        if meta is not None and r.status_code == 304:
+            meta["stored_at"] = time.time()
+            self.__write_cache(url, params, meta)
+            self.__count(endpoint, revalidated=1)
+            return cached_response(url, meta, body)
+
+        self.__count(endpoint, misses=1)
+        if use_cache and r.status_code == 200 and not kwargs.get("stream"):
+            meta = {
+                "url": url,
+                "status": r.status_code,
+                "encoding": r.encoding,
+                "headers": {
+                    name: r.headers[name]
+                    for name in ("Content-Type", "ETag", "Last-Modified")
+                    if name in r.headers
+                },
+                "stored_at": time.time(),
+            }
+            self.__write_cache(url, params, meta, r.content)
+        return r
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def default_client():
+    """The client shared by the whole app"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def get(url, **kwargs):
+    return default_client().get(url, **kwargs)
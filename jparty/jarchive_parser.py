@@ -0,0 +1,400 @@
+"""Single-pass extraction of game data from a J-Archive page
+
+The reference parser in `jparty.retrieve` builds a full BeautifulSoup tree and then
+searches it once per clue. This parser instead walks the html once and collects only
+the pieces `retrieve` needs, mirroring how BeautifulSoup's html.parser tree builder
+nests elements so both produce the same game. The tokens come either from the stdlib
+`HTMLParser` or from a single regex scan, which is several times faster.
+"""
+
+from dataclasses import dataclass, field
+from html import unescape
+from html.parser import HTMLParser
+import re
+
+ANSWER_RE = re.compile(r'correct_response">(.*?)</em')
+
+# one token per match: comment, raw text element, tag, or other markup declaration
+TOKEN_RE = re.compile(
+    r"<!--(.*?)-->"
+    r"|<(script|style)\b((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>(.*?)</\2\s*>"
+    r"|<(/?)([a-zA-Z][^\t\n\r\f />\x00]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"
+    r"|<[!?][^>]*>",
+    re.S | re.I,
+)
+ATTR_RE = re.compile(r"""([^\s/>][^\s/=>]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?""")
+
+# elements BeautifulSoup closes as soon as they are opened
+VOID_ELEMENTS = frozenset(
+    [
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+        "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+        "command", "frame", "image", "isindex", "nextid", "spacer",
+    ]
+)
+
+
+@dataclass
+class ClueData:
+    text_id: str = None
+    text: str = None
+    image: bool = False
+    dd_value: str = None  # text of the daily double value cell, None if not a daily double
+    answer: str = None
+    wrong: list = field(default_factory=list)  # [name, text of the row after the name]
+    right: list = field(default_factory=list)
+    has_text: bool = False
+
+
+@dataclass
+class RoundData:
+    categories: list = field(default_factory=list)
+    clues: list = field(default_factory=list)
+    answer: str = None  # first correct response anywhere in the round
+
+
+@dataclass
+class PageData:
+    title: str = None
+    comments: str = None
+    rounds: list = field(default_factory=list)
+    final_rounds: list = field(default_factory=list)
+
+
+def serialize_starttag(tag, attrs):
+    """serialize a start tag the way BeautifulSoup does (after unescaping)"""
+    s = "<" + tag
+    for name, value in attrs:
+        if value is None:
+            value = ""
+        quote = "'" if '"' in value and "'" not in value else '"'
+        s += f" {name}={quote}{value}{quote}"
+    return s + ("/>" if tag in VOID_ELEMENTS else ">")
+
+
+class JArchiveParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.page = PageData()
+        self.__stack = []  # [tag, node id, parent node id, on_close]
+        self.__next_node = 0
+        self.__captures = []  # [parts, markup]
+        self.__markup_captures = 0
+
+        self.__title_node = None
+        self.__comments_waiting = False
+        self.__round = None
+        self.__final = False
+        self.__category_pending = False
+        self.__clue = None
+        self.__clue_rows = None  # [node id, parent node id, text] for rows of a final clue
+        self.__clue_responses = None  # [response, parent node id of the row, row node id]
+        self.__in_clue_text = False
+
+    def parse(self, html):
+        """tokenize with the stdlib HTMLParser"""
+        self.feed(html)
+        self.close()
+        while self.__stack:
+            self.__pop()
+        return self.page
+
+    def scan(self, html):
+        """tokenize with a single regex scan, calling the same handlers HTMLParser would"""
+        pos = 0
+        for m in TOKEN_RE.finditer(html):
+            start = m.start()
+            if start > pos:
+                self.handle_data(unescape(html[pos:start]))
+            pos = m.end()
+            tag = m.group(6)
+            if tag is not None:
+                tag = tag.lower()
+                if m.group(5):
+                    self.handle_endtag(tag)
+                    continue
+                attrs = m.group(7)
+                if attrs.endswith("/"):
+                    self.handle_startendtag(tag, parse_attrs(attrs[:-1]))
+                else:
+                    self.handle_starttag(tag, parse_attrs(attrs))
+            elif m.group(1) is not None:
+                self.handle_comment(m.group(1))
+            elif m.group(2) is not None:
+                tag = m.group(2).lower()
+                self.handle_starttag(tag, parse_attrs(m.group(3)))
+                if m.group(4):
+                    self.handle_data(m.group(4))
+                self.handle_endtag(tag)
+        if pos < len(html):
+            self.handle_data(unescape(html[pos:]))
+        while self.__stack:
+            self.__pop()
+        return self.page
+
+    def __capture(self, on_done, markup=False):
+        """collect the text of the element being opened and pass it to on_done when it closes"""
+        capture = [[], markup]
+        self.__captures.append(capture)
+        if markup:
+            self.__markup_captures += 1
+
+        def close():
+            # captures close innermost first, and remove() would compare by value
+            captures = self.__captures
+            for i in range(len(captures) - 1, -1, -1):
+                if captures[i] is capture:
+                    del captures[i]
+                    break
+            if markup:
+                self.__markup_captures -= 1
+            on_done("".join(capture[0]))
+
+        return close
+
+    def __pop(self):
+        tag, _, _, on_close = self.__stack.pop()
+        if on_close is not None:
+            on_close()
+        if self.__markup_captures:
+            for parts, markup in self.__captures:
+                if markup:
+                    parts.append(f"</{tag}>")
+
+    def handle_starttag(self, tag, attrs):
+        if self.__comments_waiting:
+            self.__comments_waiting = False
+            comments_element = True
+        else:
+            comments_element = False
+
+        if self.__markup_captures:
+            serialized = serialize_starttag(tag, attrs)
+            for parts, markup in self.__captures:
+                if markup:
+                    parts.append(serialized)
+
+        classes = ()
+        ident = None
+        clue = self.__clue
+        for name, value in attrs:
+            if name == "class" and value:
+                classes = value.split()
+            elif name == "id":
+                ident = value
+            if clue is not None and value and 'correct_response">' in value:
+                # older pages keep the response in a mouseover attribute
+                self.__found_answer(ANSWER_RE.search(value))
+
+        node = self.__next_node
+        self.__next_node += 1
+        parent = self.__stack[-1][1] if self.__stack else -1
+        closers = []
+
+        if comments_element:
+            closers.append(self.__capture(self.__set_comments))
+
+        if ident is not None:
+            if ident == "game_title" and self.__title_node is None:
+                self.__title_node = node
+            elif ident == "game_comments" and self.page.comments is None:
+                self.page.comments = ""
+                self.__comments_waiting = True
+
+        if tag == "h1" and parent == self.__title_node and self.page.title is None:
+            self.page.title = ""
+            closers.append(self.__capture(self.__set_title))
+
+        if classes:
+            if "round" in classes or "final_round" in classes:
+                closers.append(self.__open_round("final_round" in classes))
+            elif self.__round is not None:
+                if "category" in classes:
+                    self.__category_pending = True
+                if "category_name" in classes and self.__category_pending:
+                    self.__category_pending = False
+                    closers.append(self.__capture(self.__round.categories.append))
+                if "clue" in classes:
+                    closers.append(self.__open_clue())
+
+        if clue is not None:
+            if classes:
+                if "clue_value_daily_double" in classes and clue.dd_value is None:
+                    clue.dd_value = ""
+                    closers.append(self.__capture(self.__set_dd_value(clue)))
+                if "clue_text" in classes and not clue.has_text:
+                    clue.has_text = True
+                    clue.text_id = ident
+                    closers.append(self.__open_clue_text(clue))
+                if tag == "td" and ("wrong" in classes or "right" in classes):
+                    responses = clue.wrong if "wrong" in classes else clue.right
+                    row = self.__stack[-1]
+                    closers.append(
+                        self.__capture(self.__add_response(responses, row[2], row[1]))
+                    )
+            if tag == "a" and self.__in_clue_text:
+                clue.image = True
+            if tag == "tr" and self.__final:
+                closers.append(self.__capture(self.__add_row(node, parent)))
+
+        if (
+            tag == "em"
+            and attrs == [("class", "correct_response")]
+            and self.__round is not None
+            and (self.__round.answer is None or (clue is not None and clue.answer is None))
+        ):
+            closers.append(self.__capture(self.__set_answer, markup=True))
+
+        if not closers:
+            on_close = None
+        elif len(closers) == 1:
+            on_close = closers[0]
+        else:
+
+            def on_close():
+                for close in reversed(closers):
+                    close()
+
+        if tag in VOID_ELEMENTS:
+            if on_close is not None:
+                on_close()
+        else:
+            self.__stack.append([tag, node, parent, on_close])
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self.__comments_waiting = False
+        stack = self.__stack
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == tag:
+                while len(stack) > i:
+                    self.__pop()
+                return
+
+    def handle_data(self, data):
+        if self.__comments_waiting:
+            self.__comments_waiting = False
+            self.page.comments = data
+        for parts, _ in self.__captures:
+            parts.append(data)
+
+    def handle_comment(self, data):
+        if self.__comments_waiting:
+            self.__comments_waiting = False
+            self.page.comments = data
+
+    def __set_title(self, text):
+        self.page.title = text
+
+    def __set_comments(self, text):
+        self.page.comments = text
+
+    def __set_answer(self, text):
+        if "\n" in text:
+            # the reference regex does not match across lines
+            return
+        if self.__clue is not None and self.__clue.answer is None:
+            self.__clue.answer = text
+        if self.__round.answer is None:
+            self.__round.answer = text
+
+    def __found_answer(self, match):
+        if match is not None:
+            self.__set_answer(match.group(1))
+
+    def __open_round(self, final):
+        r = RoundData()
+        (self.page.final_rounds if final else self.page.rounds).append(r)
+        previous = (self.__round, self.__final, self.__category_pending)
+        self.__round, self.__final, self.__category_pending = r, final, False
+
+        def close():
+            self.__round, self.__final, self.__category_pending = previous
+
+        return close
+
+    def __open_clue(self):
+        clue = ClueData()
+        self.__round.clues.append(clue)
+        previous = (self.__clue, self.__clue_rows, self.__clue_responses, self.__in_clue_text)
+        self.__clue, self.__clue_rows, self.__clue_responses = clue, [], []
+        self.__in_clue_text = False
+
+        def close():
+            rows = self.__clue_rows
+            for response, row_parent, row_node in self.__clue_responses:
+                for node, parent, text in rows:
+                    if parent == row_parent and node > row_node:
+                        response[1] = text
+                        break
+            self.__clue, self.__clue_rows, self.__clue_responses, self.__in_clue_text = previous
+
+        return close
+
+    def __open_clue_text(self, clue):
+        previous = self.__in_clue_text
+        self.__in_clue_text = True
+
+        def set_text(text):
+            clue.text = text
+            self.__in_clue_text = previous
+
+        return self.__capture(set_text)
+
+    def __set_dd_value(self, clue):
+        def set_dd_value(text):
+            clue.dd_value = text
+
+        return set_dd_value
+
+    def __add_response(self, responses, row_parent, row_node):
+        response = [None, None]
+        responses.append(response)
+        self.__clue_responses.append((response, row_parent, row_node))
+
+        def add_response(text):
+            response[0] = text
+
+        return add_response
+
+    def __add_row(self, node, parent):
+        row = [node, parent, None]
+        self.__clue_rows.append(row)
+
+        def add_row(text):
+            row[2] = text
+
+        return add_row
+
+
+def parse_attrs(s):
+    if not s or s.isspace():
+        return []
+    attrs = []
+    for name, value in ATTR_RE.findall(s):
+        if not value:
+            value = None
+        else:
+            if value[0] in "\"'" and value[-1] == value[0] and len(value) > 1:
+                value = value[1:-1]
+            if "&" in value:
+                value = unescape(value)
+        attrs.append((name.lower(), value))
+    return attrs
+
+
+def parse_game_page(html, tokenizer="regex") -> PageData:
+    """Extract the game from a j-archive page
+
+    Args:
+        html: j-archive page html
+        tokenizer: "regex" for the fast scanner or "htmlparser" for the stdlib tokenizer
+    """
+    parser = JArchiveParser()
+    if tokenizer == "regex":
+        return parser.scan(html)
+    return parser.parse(html)
@@ -0,0 +1,224 @@
+import json
+import logging
+import os
+import threading
+
+from jparty.constants import JOURNAL, JOURNAL_FLUSH_INTERVAL
+from jparty.model import FinalBoard, Player
+from jparty.score_history import ScoreHistory
+
+
+class GameJournal(object):
+    """Append-only log of the transitions of the current game, one compact json record per line
+
+    append only queues the record, a writer thread writes and fsyncs the queued records in
+    batches every `flush_interval` seconds, so the GUI thread never waits on the disk. A crash
+    loses at most the last batch.
+
+    Records are lists, [kind, field, ...]:
+        ["start", game_id, [[name, token hex, player number], ...]]
+        ["open", round, category, row]    a clue is shown
+        ["dd", player, wager]
+        ["buzz", player]
+        ["judge", player, new score]      a response (or final answer) was judged
+        ["back"]                          back to the board, the clue is done
+        ["score", player, new score]      the host adjusted a score
+        ["round", round]
+        ["wager", player, amount]
+        ["answer", player, text]
+        ["judging", player]               final answer of player is judged next
+        ["end"]
+
+    Args:
+        path: journal file, rewritten when a game starts
+        flush_interval: seconds between batched writes
+    """
+
+    def __init__(self, path=JOURNAL, flush_interval=JOURNAL_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.__buffer = []
+        self.__truncate = False
+        self.__condition = threading.Condition()  # guards the buffer, never held on the disk
+        self.__write_lock = threading.Lock()  # keeps batches in order, held while writing
+        self.__thread = None
+        self.__closed = False
+        self.batches = 0
+
+    def append(self, kind, *fields):
+        line = json.dumps([kind, *fields], separators=(",", ":")) + "\n"
+        with self.__condition:
+            if kind == "start":
+                # a new game replaces the journal of the previous one
+                self.__buffer = []
+                self.__truncate = True
+            self.__buffer.append(line)
+            if self.__thread is None and not self.__closed:
+                self.__thread = threading.Thread(target=self.__run, name="journal", daemon=True)
+                self.__thread.start()
+
+    def flush(self):
+        """write the queued records now, from any thread"""
+        self.__write()
+
+    def close(self):
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify()
+            thread = self.__thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def discard(self):
+        """forget the journal, so the game it holds is not offered for resuming"""
+        with self.__write_lock:  # a batch being written would bring the file back
+            with self.__condition:
+                self.__buffer = []
+                self.__truncate = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                if self.__closed:
+                    self.__thread = None
+                    return
+                self.__condition.wait(self.flush_interval)
+            self.__write()
+
+    def __write(self):
+        # the batch is taken under the condition and written outside it, so append never waits
+        # on the disk; the write lock keeps a later batch from overtaking an earlier one
+        with self.__write_lock:
+            with self.__condition:
+                if not self.__buffer and not self.__truncate:
+                    return
+                lines, self.__buffer = self.__buffer, []
+                mode = "w" if self.__truncate else "a"
+                self.__truncate = False
+            self.__write_batch(lines, mode)
+
+    def __write_batch(self, lines, mode):
+        try:
+            with open(self.path, mode, encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.batches += 1
+        except OSError as e:
+            logging.error(f"Cannot write game journal {self.path}: {e}")
+
+
+def read_journal(path=JOURNAL):
+    """the records of a journal, up to a record torn by a crash"""
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Game journal {path} ends with a torn record")
+                    break
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def interrupted_game(path=JOURNAL):
+    """(game_id, records) of a game that was started but did not end, None if there is none"""
+    records = read_journal(path)
+    if not records or records[0][0] != "start" or records[-1][0] == "end":
+        return None
+    return records[0][1], records
+
+
+def replay(engine, records):
+    """Rebuild the players, scores and board of engine.data from the records of its journal
+
+    Nothing is shown, GameEngine.resume shows the result. A clue counts as played only once its
+    "back" record is in; a clue that was interrupted goes back on the board, with the scores of
+    the players judged on it as they were before it was opened.
+    """
+    _, game_id, players = records[0]
+    engine.game_id = game_id
+    engine.players = []
+    engine.scores = ScoreHistory()
+    by_number = {}
+    for name, token, number in players:
+        p = Player(name, None, number)
+        p.token = bytes.fromhex(token)
+        engine.players.append(p)
+        engine.scores.row(p, str(number))
+        by_number[number] = p
+    engine.current_round = engine.data.rounds[0]
+    engine.question_number = 1
+    engine.judgement_round = 0
+    engine.sorted_players = None
+    opened_scores = {}  # players judged on the open clue -> their score before it was opened
+    final_judged = False
+    dd_value = None  # value of the daily double being played, before the wager
+
+    for record in records[1:]:
+        kind, fields = record[0], record[1:]
+        if kind == "open":
+            r, i, j = fields
+            engine.current_round = engine.data.rounds[r]
+            engine.active_question = engine.current_round.get_question(i, j)
+            opened_scores = {}
+            dd_value = None
+        elif kind == "dd":
+            dd_value = engine.active_question.value
+            engine.active_question.value = fields[1]
+        elif kind == "judge":
+            p = by_number[fields[0]]
+            opened_scores.setdefault(p, p.score)
+            engine.scores.set_score(p, engine.question_number, fields[1])
+            p.score = fields[1]
+            final_judged = True
+        elif kind == "back":
+            finish_question(engine)
+            opened_scores = {}
+        elif kind == "score":
+            p = by_number[fields[0]]
+            p.score = fields[1]
+            engine.scores.set_score(p, engine.scores.last, fields[1])
+        elif kind == "round":
+            engine.current_round = engine.data.rounds[fields[0]]
+            if isinstance(engine.current_round, FinalBoard):
+                engine.active_question = engine.current_round.question
+                engine.update_original_player_scores()
+        elif kind == "wager":
+            by_number[fields[0]].wager = fields[1]
+        elif kind == "answer":
+            by_number[fields[0]].finalanswer = fields[1]
+        elif kind == "judging":
+            if engine.sorted_players is None:
+                engine.sorted_players = sorted(engine.players, key=lambda x: x.score)
+            engine.judgement_round = engine.sorted_players.index(by_number[fields[0]])
+            final_judged = False
+
+    if isinstance(engine.current_round, FinalBoard):
+        # the judgement of the last player judged is in, move on to the next one
+        if engine.sorted_players is not None and final_judged:
+            engine.judgement_round += 1
+    elif engine.active_question is not None:
+        for p, score in opened_scores.items():
+            p.score = score
+            engine.scores.set_score(p, engine.question_number, score)
+        if dd_value is not None:
+            engine.active_question.value = dd_value
+        engine.active_question = None
+    logging.info(f"Replayed {len(records)} journal records of game {game_id}")
+
+
+def finish_question(engine):
+    """what GameEngine.back_to_board does to the game state, without showing anything"""
+    engine.current_round.complete_question(engine.active_question)
+    engine.update_original_player_scores()
+    engine.question_number += 1
+    engine.active_question = None
@@ -0,0 +1,44 @@
+import logging
+import sys
+import threading
+import time
+
+
+class LazyModule(object):
+    """Stand-in for a module that is imported on first attribute access
+
+    Use it for heavy dependencies that are not needed to show the first window, e.g.
+    `bs4 = lazy_import("bs4")` and then `bs4.BeautifulSoup(...)` as usual.
+    """
+
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+        self.__lock = threading.Lock()
+
+    def __load(self):
+        with self.__lock:
+            if self.__module is None:
+                start = time.perf_counter()
+                __import__(self.__name)  # through __import__, so the startup profiler sees it
+                self.__module = sys.modules[self.__name]
+                elapsed = (time.perf_counter() - start) * 1000
+                logging.debug(f"lazily imported {self.__name} in {elapsed:.0f} ms")
+        return self.__module
+
+    @property
+    def loaded(self):
+        return self.__module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.__module or self.__load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self.__name!r} ({state})>"
+
+
+def lazy_import(name):
+    """the module if it was imported already, otherwise a LazyModule that imports it when used"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,95 @@
+import threading
+
+from jparty.pubsub import lectern_topic
+
+
+class LecternHub(object):
+    """Publishes player state to the lecterns, once per event loop tick and only what changed
+
+    update and clear can be called from any thread; they record the latest state of a player
+    and schedule a single flush on the IOLoop, so a burst of updates in one game transition
+    becomes at most one message per player. The hub remembers the state last published for
+    each player and only publishes the fields that differ, or nothing if none do. Lecterns
+    subscribe to the player's topic on the PubSubHub, which sends the full state to new
+    lecterns and to lecterns speaking version 0 of the wire protocol.
+
+    Args:
+        pubsub: PubSubHub to publish on
+    """
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+        self.sent = {}  # player number -> state last published, None for no player
+        self.updates = 0
+        self.published = 0  # messages published for updates
+        self.unchanged = 0  # flushed states equal to what the lecterns already show
+        self.__pending = {}  # player number -> latest state, None for no player
+        self.__cleared = False
+        self.__scheduled = False
+        self.__lock = threading.Lock()
+
+    def update(self, player_number, state):
+        with self.__lock:
+            self.updates += 1
+            self.__pending[player_number] = state
+            self.__schedule()
+
+    def clear(self):
+        """show no player on every lectern"""
+        with self.__lock:
+            self.__pending = {}
+            self.__cleared = True
+            self.__schedule()
+
+    def __schedule(self):
+        if not self.__scheduled:
+            self.__scheduled = True
+            self.pubsub.schedule(self.flush)
+
+    def connect(self, player_number, lectern, state):
+        """a lectern connected, state is the player's state or None if there is no player"""
+        topic = lectern_topic(player_number)
+        if player_number not in self.sent:
+            self.sent[player_number] = state
+            self.pubsub.retain(topic, *full_state(state))
+        self.pubsub.subscribe(topic, lectern)
+
+    def disconnect(self, lectern):
+        self.pubsub.unsubscribe(lectern)
+
+    def flush(self):
+        with self.__lock:
+            pending, self.__pending = self.__pending, {}
+            cleared, self.__cleared = self.__cleared, False
+            self.__scheduled = False
+            if cleared:
+                self.updates += len(self.sent)
+
+        if cleared:
+            for player_number in self.sent:
+                pending.setdefault(player_number, None)
+        for player_number, state in pending.items():
+            previous = self.sent.get(player_number)
+            if state == previous:
+                self.unchanged += 1
+                continue
+            self.sent[player_number] = state
+            topic = lectern_topic(player_number)
+            if state is None or previous is None:
+                self.pubsub.publish(topic, *full_state(state))
+            else:
+                changed = {k: v for k, v in state.items() if previous.get(k) != v}
+                self.pubsub.publish(topic, "PLAYER_DELTA", changed, full=full_state(state))
+            self.published += 1
+
+    def __str__(self):
+        saved = self.updates - self.published
+        return (
+            f"{self.updates} updates, {self.published} published, {saved} saved "
+            f"({self.unchanged} unchanged, the rest coalesced)"
+        )
+
+
+def full_state(state):
+    """(message, payload) that shows state on a lectern"""
+    return ("NO_PLAYER", "") if state is None else ("PLAYER_STATE", state)
@@ -4,7 +4,6 @@ from PyQt6.QtWidgets import QApplication, QMessageBox
 import sys
 import requests
 import logging
-from simpleaudio._simpleaudio import SimpleaudioError
 
 
 from jparty.game import Game
@@ -14,13 +13,16 @@ from jparty.style import JPartyStyle
 from jparty.utils import resource_path
 from jparty.logger import qt_exception_hook
 from jparty.constants import PORT
+from jparty import http_client, startup_profile
+from jparty.journal import interrupted_game
+from jparty.search_index import index_saved_games_in_background
 
 
 def check_internet():
     """check internet connection"""
     try:
-        requests.get("http://www.j-archive.com/")
-    except requests.exceptions.ConnectionError:  # This is the correct syntax
+        http_client.get("http://www.j-archive.com/", endpoint="check-internet")
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
         logging.error("Connection Error")
         QMessageBox.critical(
             None,
@@ -65,13 +67,47 @@ def check_second_monitor():
         sys.exit(1)
 
 
+def offer_resume(game):
+    """ask to carry on with a game that JParty closed in the middle of"""
+    interrupted = interrupted_game()
+    if interrupted is None:
+        return
+    game_id, records = interrupted
+    logging.info(f"Found interrupted game {game_id}")
+    answer = QMessageBox.question(
+        None,
+        "Resume game?",
+        f"JParty closed in the middle of game {game_id}. Resume it?\n\n"
+        "Players rejoin by opening the buzzer page again on the same device.",
+    )
+    if answer != QMessageBox.StandardButton.Yes:
+        game.journal.discard()
+        return
+    try:
+        game.resume_game(game_id, records)
+    except Exception:
+        # kept, e.g. the game page may be fetched next time; a new game replaces it
+        logging.exception(f"Cannot resume game {game_id}")
+        game.reset()
+        QMessageBox.warning(
+            None,
+            "Cannot resume game",
+            f"JParty could not resume game {game_id}. It will be offered again next time, "
+            "unless a new game is started.",
+        )
+
+
 def main():
+    profile = startup_profile.active()
+    if profile is not None:
+        profile.mark("imports")
 
     QApplication.setStyle(JPartyStyle())
     app = QApplication(sys.argv)
 
     check_second_monitor()
-    check_internet()
+    if profile is None:  # a profile measures JParty, not the network
+        check_internet()
     app.setFont(QFont("Verdana"))
 
     i = QFontDatabase.addApplicationFont(
@@ -94,13 +130,18 @@ def main():
     host_window = HostDisplayWindow(game)
     game.setDisplays(host_window, main_window)
     
-    try:
-        game.begin()
-    except SimpleaudioError as e:
-        audio_error()
-        exit(1)
+    # a missing audio device is reported once the event loop runs, without waiting for it here
+    game.begin(on_audio_error=lambda e: (audio_error(), app.exit(1)))
+
+    if profile is None:
+        offer_resume(game)
+        index_saved_games_in_background()  # so Random can pick the games already saved
+    else:
+        # report once the windows have painted, then quit
+        profile.mark("windows")
+        first_frame = startup_profile.first_frame(lambda: (startup_profile.finish(), app.quit()))
 
-    song_player = game.song_player
+    audio = game.audio
 
 
 
@@ -109,7 +150,9 @@ def main():
         r = app.exec()
     finally:
         logging.info("terminated")
-        if song_player:
-            song_player.stop()
+        game.journal.close()
+        http_client.default_client().log_stats()
+        if audio:
+            audio.close()
 
         sys.exit(r)
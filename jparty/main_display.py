@@ -135,8 +135,8 @@ class DisplayWindow(QMainWindow):
         self.final_display = FinalDisplay(self.game, self)
         self.final_window = self.final_display.answer_widget
 
-    def load_final_graphs(self):
-        self.graph_display = GraphDisplay(self)
+    def load_final_graphs(self, image):
+        self.graph_display = GraphDisplay(self, image)
         self.question_widget.setVisible(False)
         self.final_display.setVisible(False)
         self.board_layout.replaceWidget(self.question_widget, self.graph_display)
@@ -151,9 +151,9 @@ class DisplayWindow(QMainWindow):
                 return pw
 
     def remove_card(self, q):
-        for label in self.board_widget.question_labels:
-            if label.question is q:
-                label.question = None
+        card = self.board_widget.card(q)
+        if card is not None:
+            card.question = None
 
     def restart(self):
         # If graph_display is in the layout, replace it with board_widget first
@@ -215,6 +215,7 @@ class HostDisplayWindow(DisplayWindow):
     def hide_welcome_widgets(self):
         super().hide_welcome_widgets()
         self.scoreboard.hide_close_buttons()
+        self.welcome_widget.game_pool.stop()  # no downloads while the game is played
 
     def load_image_review_screen(self, q):
         self.on_image_question = True
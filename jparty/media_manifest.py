@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import threading
+
+from jparty.constants import QUESTION_MEDIA, MEDIA_MANIFEST
+
+
+class MediaManifest(object):
+    """Index of the question media folders, so finding a clue's media is a dict lookup
+
+    Each QUESTION_MEDIA/<game_id> folder is listed once and remembered together with its mtime,
+    in memory and in a json file. A folder is listed again only when its mtime changes.
+
+    Args:
+        media_dir: folder holding one media folder per game
+        path: json file the manifest is kept in between runs
+    """
+
+    def __init__(self, media_dir=QUESTION_MEDIA, path=MEDIA_MANIFEST):
+        self.media_dir = media_dir
+        self.path = path
+        self.__games = None  # game_id -> {"mtime": ns, "names": [file names]}
+        self.__lock = threading.Lock()
+
+    def __load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.__games = json.load(f)
+        except FileNotFoundError:
+            self.__games = {}
+        except (OSError, ValueError) as e:
+            logging.error(f"Cannot read media manifest, rebuilding: {e}")
+            self.__games = {}
+
+    def __save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.__games, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Cannot write media manifest: {e}")
+
+    def names(self, game_id):
+        """Sorted names of the media files of a game"""
+        game_id = str(game_id)
+        game_media_path = self.media_dir / game_id
+        try:
+            mtime = game_media_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self.__lock:
+            if self.__games is None:
+                self.__load()
+            entry = self.__games.get(game_id)
+            if entry is not None and entry["mtime"] == mtime:
+                return entry["names"]
+
+            names = [] if mtime is None else sorted(f.name for f in game_media_path.iterdir())
+            if mtime is None and entry is None:
+                return names  # nothing to remember for games without media
+            if mtime is None:
+                del self.__games[game_id]
+            else:
+                self.__games[game_id] = {"mtime": mtime, "names": names}
+            self.__save()
+            return names
+
+    def game_media(self, game_id):
+        """Map "round-col-row" to the path of the media file of each clue of a game"""
+        media = {}
+        for name in self.names(game_id):
+            media.setdefault(os.path.splitext(name)[0], str(self.media_dir / str(game_id) / name))
+        return media
+
+
+_manifest = MediaManifest()
+
+
+def game_media(game_id):
+    return _manifest.game_media(game_id)
+
+
+def media_names(game_id):
+    return _manifest.names(game_id)
@@ -0,0 +1,53 @@
+import bisect
+import math
+
+# upper bounds of the histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, math.inf)
+
+
+class LatencyHistogram(object):
+    """Counts of latencies in fixed buckets, cheap enough to record on every event
+
+    Not locked: record from a single thread (the GUI thread or the IOLoop).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0
+        self.max_ms = 0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+    def percentile(self, p):
+        """upper bound of the bucket holding the p-th percentile (0-100)"""
+        if not self.count:
+            return 0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            f"<={bound}ms": n for bound, n in zip(self.buckets, self.counts) if n
+        }
+
+    def __str__(self):
+        return (
+            f"n {self.count}, mean {self.mean_ms:.3f} ms, p50 {self.percentile(50):.3f} ms, "
+            f"p99 {self.percentile(99):.3f} ms, max {self.max_ms:.3f} ms"
+        )
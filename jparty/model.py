@@ -0,0 +1,93 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class Question:
+    index: tuple
+    text: str
+    answer: str
+    category: str
+    value: int = -1
+    dd: bool = False
+    complete: bool = False
+    image: bool = False
+    image_url: str = None
+    actual_results: str = None
+
+
+class Board(object):
+    """A round of questions, stored in a size[0] x size[1] grid indexed by (category, row)"""
+
+    size = (6, 5)
+
+    def __init__(self, categories, questions, dj=False):
+        self.categories = categories
+        self.dj = dj
+        if not questions is None:
+            self.questions = questions
+        else:
+            self.questions = []
+        self.grid = [[None] * self.size[1] for _ in range(self.size[0])]
+        for q in self.questions:
+            i, j = q.index
+            if 0 <= i < self.size[0] and 0 <= j < self.size[1]:
+                self.grid[i][j] = q
+        self.remaining = sum(not q.complete for q in self.questions)
+
+    def get_question(self, i, j):
+        if 0 <= i < self.size[0] and 0 <= j < self.size[1]:
+            return self.grid[i][j]
+        return None
+
+    def complete_question(self, q):
+        """mark a question of this board as played"""
+        if not q.complete:
+            q.complete = True
+            self.remaining -= 1
+
+    def finished(self):
+        """whether every question has been played"""
+        return self.remaining == 0
+
+    def complete(self):
+        return len(self.questions) == 30
+
+
+class FinalBoard(Board):
+    size = (1, 1)
+
+    def __init__(self, category, question):
+        super().__init__([category], [question], dj=False)
+        self.category = category
+        self.question = question
+
+    def complete(self):
+        return len(self.questions) == 1
+
+
+@dataclass
+class GameData:
+    rounds: list
+    date: str
+    comments: str
+
+
+class Player(object):
+    def __init__(self, name, waiter, player_number):
+        self.name = name
+        self.token = os.urandom(15)
+        self.score = 0  # the scores by question are in the game's ScoreHistory
+        self.waiter = waiter
+        self.wager = None
+        self.finalanswer = ""
+        self.page = "buzz"
+        self.player_number = player_number
+
+    def __hash__(self):
+        # the hash of the token bytes is computed once and cached by them, and players are
+        # hashed for every score change
+        return hash(self.token)
+
+    def state(self):
+        return {"page": self.page, "score": self.score}
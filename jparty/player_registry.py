@@ -0,0 +1,89 @@
+import threading
+
+
+class PlayerRegistry(object):
+    """The players of the game, indexed by token, player number and buzzer socket
+
+    `players` is the list the game plays with, in joining order; the indexes make every lookup
+    the controller does on a message O(1), which matters when all the phones reconnect at
+    once. Changes are made under a lock, so a lookup from the IOLoop never sees a player in
+    one index and not yet in another, and a reconnecting phone is bound to its player in one
+    step: the old socket stops resolving to the player as the new one starts.
+    """
+
+    def __init__(self, players=None):
+        self.__lock = threading.Lock()
+        self.replace(players if players is not None else [])
+
+    def replace(self, players):
+        """play with the list players from now on, e.g. the players of a resumed game"""
+        with self.__lock:
+            self.players = players
+            self.__by_token = {p.token.hex(): p for p in players}
+            self.__by_number = {p.player_number: p for p in players}
+            self.__by_socket = {p.waiter: p for p in players if p.waiter is not None}
+            self.__positions = {p: i for i, p in enumerate(players)}
+
+    def clear(self):
+        self.replace([])
+
+    def __len__(self):
+        return len(self.players)
+
+    def next_number(self):
+        """lowest player number not taken"""
+        number = 0
+        while number in self.__by_number:
+            number += 1
+        return number
+
+    def add(self, player):
+        with self.__lock:
+            self.__positions[player] = len(self.players)
+            self.players.append(player)
+            self.__by_token[player.token.hex()] = player
+            self.__by_number[player.player_number] = player
+            if player.waiter is not None:
+                self.__by_socket[player.waiter] = player
+
+    def remove(self, player):
+        with self.__lock:
+            self.players.remove(player)
+            self.__by_token.pop(player.token.hex(), None)
+            if self.__by_number.get(player.player_number) is player:
+                del self.__by_number[player.player_number]
+            if player.waiter is not None:
+                self.__by_socket.pop(player.waiter, None)
+            self.__positions = {p: i for i, p in enumerate(self.players)}
+
+    def bind(self, player, socket):
+        """make socket the connection of player, replacing the one it had"""
+        with self.__lock:
+            if player.waiter is not None:
+                self.__by_socket.pop(player.waiter, None)
+            player.waiter = socket
+            player.connected = True
+            self.__by_socket[socket] = player
+
+    def unbind(self, socket):
+        """socket closed, its player has no connection until it binds a new one"""
+        with self.__lock:
+            player = self.__by_socket.pop(socket, None)
+            if player is not None and player.waiter is socket:
+                player.waiter = None
+                player.connected = False
+            return player
+
+    def with_token(self, token):
+        """player with the token in hex, None if there is none"""
+        return self.__by_token.get(token)
+
+    def with_number(self, player_number):
+        return self.__by_number.get(player_number)
+
+    def with_socket(self, socket):
+        return self.__by_socket.get(socket)
+
+    def index(self, player):
+        """position of player in players"""
+        return self.__positions[player]
@@ -0,0 +1,128 @@
+import threading
+from collections import deque
+
+from jparty import wire
+
+# topics spectators can subscribe to, besides the lectern of each player
+SPECTATOR_TOPICS = ("scores", "board", "timer")
+FANOUT_CHUNK = 64  # frames written per IOLoop callback, so buzzes are read in between
+
+
+def lectern_topic(player_number):
+    return f"lectern/{player_number}"
+
+
+def valid_topic(topic):
+    if topic in SPECTATOR_TOPICS:
+        return True
+    prefix, _, number = topic.partition("/")
+    return prefix == "lectern" and number.isdigit()
+
+
+class Topic(object):
+    def __init__(self):
+        self.subscribers = []
+        self.retained = None  # (message, payload) that brings a new subscriber up to date
+
+
+class PubSubHub(object):
+    """Topics of game state that lecterns and spectators subscribe to over websockets
+
+    A published message is encoded once per wire protocol version and the same frame is
+    written to every subscriber. Delivery runs on the IOLoop in chunks of FANOUT_CHUNK frames,
+    so hundreds of spectators never hold up a buzz for long, and messages are delivered in the
+    order they were published. Each topic keeps the full state it was last published with,
+    which is sent to new subscribers.
+
+    publish can be called from any thread, everything else from the IOLoop.
+    Subscribers need a `version` of the wire protocol and a `write_frame(frame)`.
+
+    Args:
+        schedule: schedule(f) runs f on the IOLoop, e.g. IOLoop.add_callback
+        chunk: frames written per IOLoop callback
+    """
+
+    def __init__(self, schedule, chunk=FANOUT_CHUNK):
+        self.schedule = schedule
+        self.chunk = chunk
+        self.topics = {}
+        self.published = 0
+        self.encoded = 0
+        self.written = 0
+        self.__queue = deque()
+        self.__delivery = None  # (subscribers, frames by version, message, full, next index)
+        self.__scheduled = False
+        self.__lock = threading.Lock()
+
+    def topic(self, name):
+        topic = self.topics.get(name)
+        if topic is None:
+            topic = self.topics[name] = Topic()
+        return topic
+
+    def subscribe(self, name, subscriber):
+        topic = self.topic(name)
+        topic.subscribers.append(subscriber)
+        if topic.retained is not None:
+            subscriber.write_frame(wire.encode(*topic.retained, subscriber.version))
+            self.written += 1
+
+    def unsubscribe(self, subscriber):
+        """remove subscriber from every topic"""
+        for topic in self.topics.values():
+            if subscriber in topic.subscribers:
+                topic.subscribers.remove(subscriber)
+
+    def retain(self, name, msg, payload=""):
+        """set the state sent to new subscribers, without publishing it"""
+        self.topic(name).retained = (msg, payload)
+
+    def publish(self, name, msg, payload="", full=None):
+        """send a message to the subscribers of a topic
+
+        full is the (message, payload) of the whole state when msg is only a change to it; it
+        is sent instead to subscribers on version 0 of the protocol, and to new subscribers.
+        """
+        with self.__lock:
+            self.published += 1
+            self.__queue.append((name, (msg, payload), full or (msg, payload)))
+            if not self.__scheduled:
+                self.__scheduled = True
+                self.schedule(self.__pump)
+
+    def __pump(self):
+        budget = self.chunk
+        while budget > 0:
+            if self.__delivery is None:
+                with self.__lock:
+                    if not self.__queue:
+                        self.__scheduled = False
+                        return
+                    name, message, full = self.__queue.popleft()
+                topic = self.topic(name)
+                topic.retained = full
+                self.__delivery = [tuple(topic.subscribers), {}, message, full, 0]
+
+            subscribers, frames, message, full, start = self.__delivery
+            end = min(len(subscribers), start + budget)
+            for subscriber in subscribers[start:end]:
+                version = subscriber.version
+                frame = frames.get(version)
+                if frame is None:
+                    frame = frames[version] = wire.encode(*(message if version else full), version)
+                    self.encoded += 1
+                subscriber.write_frame(frame)
+            self.written += end - start
+            budget -= end - start
+            if end == len(subscribers):
+                self.__delivery = None
+            else:
+                self.__delivery[4] = end
+        self.schedule(self.__pump)  # let the IOLoop read buzzes before the next chunk
+
+    def __str__(self):
+        subscribers = sum(len(t.subscribers) for t in self.topics.values())
+        return (
+            f"{len(self.topics)} topics, {subscribers} subscribers, {self.published} published, "
+            f"{self.encoded} frames encoded, {self.written} written"
+        )
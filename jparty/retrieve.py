@@ -1,13 +1,34 @@
-import requests
-from bs4 import BeautifulSoup
 from html import unescape
 import re
 import json
-from jparty.game import Question, Board, FinalBoard, GameData
+from jparty.model import Question, Board, FinalBoard, GameData
+from jparty.lazy_import import lazy_import
 import logging
 import csv
 import os
-from jparty.constants import MONIES, SAVED_GAMES, QUESTION_MEDIA
+import queue
+import threading
+import time
+from jparty.constants import (
+    MONIES,
+    SAVED_GAMES,
+    GAME_FETCH_DEADLINE,
+    GAME_FETCH_HEDGE_DELAY,
+)
+from jparty.jarchive_parser import ClueData, parse_game_page
+from jparty.media_manifest import game_media
+from jparty.game_cache import source_digest, load_cached_game, save_cached_game
+from jparty.http_client import (
+    default_client,
+    CircuitBreaker,
+    SourceStats,
+    WAYBACK_CDX_TTL,
+    WAYBACK_SNAPSHOT_TTL,
+    JARCHIVE_GAME_TTL,
+    GSHEET_TTL,
+)
+
+bs4 = lazy_import("bs4")  # only the reference parser and the random game page need it
 
 
 def list_to_game(s):
@@ -43,15 +64,17 @@ def list_to_game(s):
     return GameData(boards, date, comments)
 
 
-def get_Gsheet_game(file_id):
+def get_Gsheet_game(file_id, client=None):
+    client = client or default_client()
     csv_url = f"https://docs.google.com/spreadsheet/ccc?key={file_id}&output=csv"
-    with requests.get(csv_url, stream=True) as r:
-        lines = (line.decode("utf-8") for line in r.iter_lines())
-        r3 = csv.reader(lines)
-        return list_to_game(list(r3))
+    r = client.get(csv_url, endpoint="gsheet", cache_ttl=GSHEET_TTL)
+    lines = (line.decode("utf-8") for line in r.iter_lines())
+    r3 = csv.reader(lines)
+    return list_to_game(list(r3))
 
 
-def get_game_html(game_id):
+def get_saved_game_html(game_id):
+    """the saved page of a game, None if it is not saved"""
     saved_game_path = SAVED_GAMES / f"{game_id}.html"
     if saved_game_path.exists():
         print("game is saved, try using saved game")
@@ -61,30 +84,204 @@ def get_game_html(game_id):
                 return game_html
         except UnicodeDecodeError:
             print("UnicodeDecodeError on saved game, trying from internet")
+    return None
+
+
+def available_sources():
+    sources = [name for name in GAME_SOURCES if SOURCE_BREAKERS[name].allow()]
+    if not sources:  # every source is cooling down, better to try than to fail
+        sources = list(GAME_SOURCES)
+    return sources
+
+
+def fetch_game_html(game_id, client=None):
+    """Fetch a game page from the GAME_SOURCES one at a time, the next one only if a source fails
+
+    For bulk downloads, which must not ask every source for every game; there is no deadline,
+    as the requests of a rate limited client may wait their turn for a long time.
+    """
+    client = client or default_client()
+    errors = []
+    for name in available_sources():
+        print(f"using {name}")
+        with SOURCE_STATS_LOCK:
+            SOURCE_STATS[name].attempts += 1
+        start = time.perf_counter()
+        try:
+            html = GAME_SOURCES[name](game_id, client, None)
+        except Exception as e:
+            record_source_result(name, e, time.perf_counter() - start)
+            logging.error(f"{name} failed for game {game_id}: {e}")
+            errors.append(f"{name}: {e}")
+        else:
+            record_source_result(name, None, time.perf_counter() - start, won=True)
+            return html
+    raise Exception(f"Cannot fetch game {game_id}: " + "; ".join(errors))
+
+
+def fetch_game_hedged(
+    game_id, client=None, deadline=GAME_FETCH_DEADLINE, hedge_delay=GAME_FETCH_HEDGE_DELAY
+):
+    """Race the GAME_SOURCES for a game page, (html, GameData) of the first one that parses into a game
+
+    Sources start in order, each one hedge_delay seconds after the previous one or as soon as
+    it fails. Sources whose circuit breaker is open are skipped. If no page parses into a game
+    before the deadline, the first page fetched is returned with None so the caller sees an
+    incomplete game.
+    """
+    client = client or default_client()
+    sources = available_sources()
+
+    results = queue.Queue()
+    cancel = threading.Event()
+
+    def fetch(name):
+        start = time.perf_counter()
+        try:
+            html = GAME_SOURCES[name](game_id, client, cancel)
+            game_data = None if cancel.is_set() else process_game_board_from_html(html, game_id)
+        except Exception as e:
+            results.put((name, None, None, e, time.perf_counter() - start))
+        else:
+            results.put((name, html, game_data, None, time.perf_counter() - start))
+
+    end = time.monotonic() + deadline
+    next_start = time.monotonic()
+    started = finished = 0
+    fallback = None
+    errors = []
     try:
-        print("using wayback machine")
-        game_html = get_wayback_game_html(game_id)
-    except Exception as e:
-        print("using j-archive")
-        logging.error(e)
-        game_html = get_jarchive_game_html(game_id)
-    return game_html
+        while finished < len(sources):
+            now = time.monotonic()
+            if now >= end:
+                break
+            if started < len(sources) and now >= next_start:
+                print(f"using {sources[started]}")
+                with SOURCE_STATS_LOCK:
+                    SOURCE_STATS[sources[started]].attempts += 1
+                threading.Thread(
+                    target=fetch, args=(sources[started],), name="game_fetch", daemon=True
+                ).start()
+                started += 1
+                next_start = now + hedge_delay
+            wait = end - now
+            if started < len(sources):
+                wait = min(wait, next_start - now)
+            try:
+                name, html, game_data, error, elapsed = results.get(timeout=max(wait, 0))
+            except queue.Empty:
+                continue
+            finished += 1
+            record_source_result(name, error, elapsed, won=game_data is not None)
+            if game_data is not None:
+                return html, game_data
+            if error is not None:
+                logging.error(f"{name} failed for game {game_id}: {error}")
+                errors.append(f"{name}: {error}")
+            elif fallback is None:
+                fallback = html
+            next_start = time.monotonic()
+    finally:
+        cancel.set()
+        log_source_stats()
+
+    if fallback is not None:
+        return fallback, None
+    if finished < len(sources):
+        errors.append(f"no response within {deadline} s")
+    raise Exception(f"Cannot fetch game {game_id}: " + "; ".join(errors))
+
+
+def record_source_result(name, error, elapsed, won=False):
+    elapsed *= 1000
+    with SOURCE_STATS_LOCK:
+        stats = SOURCE_STATS[name]
+        stats.completed += 1
+        stats.wins += int(won)
+        stats.total_ms += elapsed
+        stats.max_ms = max(stats.max_ms, elapsed)
+        if error is not None:
+            stats.failures += 1
+    if error is None:
+        SOURCE_BREAKERS[name].record_success()
+    else:
+        SOURCE_BREAKERS[name].record_failure()
+
+
+def log_source_stats():
+    with SOURCE_STATS_LOCK:
+        stats = {name: SourceStats(**vars(s)) for name, s in SOURCE_STATS.items()}
+    for name, stats in stats.items():
+        logging.info(f"game source {name}: {stats}")
+
+
+def save_game_html(game_id, game_html, game_data=None):
+    """Write a game page to SAVED_GAMES via a temp file so a partial write never looks like a saved game
+
+    game_data is the page parsed, if it is a game it is added to the clue index, so it can be
+    searched and picked as a random complete game right away.
+    """
+    from jparty.search_index import index_game
+
+    saved_game_path = SAVED_GAMES / f"{game_id}.html"
+    tmp_path = SAVED_GAMES / f".{game_id}.html.tmp"
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(game_html)
+    os.replace(tmp_path, saved_game_path)
+    if game_data is not None:
+        index_game(game_id, game_data, source_digest(game_html, game_id))
 
 def get_game(game_id):
+    set_current_game_id(game_id)
+    return load_game(game_id)
+
+
+def set_current_game_id(game_id):
     os.environ["JPARTY_GAME_ID"] = str(game_id)
+
+
+def load_game(game_id):
+    """Like get_game, but without making it the current game"""
+    from jparty.game_pack import split_pack_game_id, load_pack_game
+
+    if split_pack_game_id(game_id) is not None:
+        return load_pack_game(game_id)
     if len(str(game_id)) < 7:
-        game_html = get_game_html(game_id)
-        return process_game_board_from_html(game_html, game_id)
+        game_html = get_saved_game_html(game_id)
+        if game_html is not None:
+            return process_game_board_cached(game_html, game_id)
+        # the race already parsed the page that won it
+        game_html, game_data = fetch_game_hedged(game_id)
+        if game_data is not None:
+            # saved, so the next load reads the page from disk and the game from the cache
+            try:
+                save_game_html(game_id, game_html, game_data)
+            except Exception as e:
+                logging.error(f"Cannot save game {game_id}: {e}")
+            save_cached_game(game_id, source_digest(game_html, game_id), game_data)
+        return game_data
     else:
         return get_Gsheet_game(str(game_id))
 
 
+def process_game_board_cached(html, game_id) -> GameData:
+    """Like process_game_board_from_html, but reuse the parsed game from the cache when the source is unchanged"""
+    digest = source_digest(html, game_id)
+    game_data = load_cached_game(game_id, digest)
+    if game_data is None:
+        game_data = process_game_board_from_html(html, game_id)
+        if game_data is not None:
+            save_cached_game(game_id, digest, game_data)
+    return game_data
+
+
 def findanswer(clue):
     return re.findall(r'correct_response">(.*?)</em', unescape(str(clue)))[0]
 
-def get_jarchive_game_html(game_id):
+def get_jarchive_game_html(game_id, client=None):
+    client = client or default_client()
     game_url = f"http://www.j-archive.com/showgame.php?game_id={game_id}"
-    r = requests.get(game_url)
+    r = client.get(game_url, endpoint="jarchive-game", cache_ttl=JARCHIVE_GAME_TTL)
     return r.text
 
 def find_question_media(game_id: int, round: int, index: tuple) -> str:
@@ -95,15 +292,9 @@ def find_question_media(game_id: int, round: int, index: tuple) -> str:
         round: round number, 1-jeopardy, 2-double jeopardy
         index: (category, question) index, from top left 0-indexed
     """
-    game_media_path = QUESTION_MEDIA / str(game_id)
-    if game_media_path.exists():
-        potential_filename = f"{round}-{index[0]}-{index[1]}"
-        for media_file in game_media_path.iterdir():
-            if media_file.stem == potential_filename:
-                return str(media_file)
-    return False
-
-def get_actual_player_results(clue: BeautifulSoup, value: int):
+    return game_media(game_id).get(f"{round}-{index[0]}-{index[1]}", False)
+
+def get_actual_player_results(clue: "bs4.BeautifulSoup", value: int):
     """Get the results from the actual jeopardy contestants"""
     dd_value = clue.find(class_="clue_value_daily_double")
     if dd_value is not None:
@@ -119,7 +310,7 @@ def get_actual_player_results(clue: BeautifulSoup, value: int):
         answers.append([right_answer.text, value])
     return answers
 
-def get_actual_player_final(clue: BeautifulSoup) -> list[list[str]]:
+def get_actual_player_final(clue: "bs4.BeautifulSoup") -> list[list[str]]:
     answers = []
     wrong_players = clue.find_all("td", {"class": "wrong"})
     for player_answer in wrong_players:
@@ -131,9 +322,119 @@ def get_actual_player_final(clue: BeautifulSoup) -> list[list[str]]:
         answers.append([player_answer.text, value])
     return answers
 
-def process_game_board_from_html(html, game_id) -> GameData:
-    """Given j-archive html, produce a game data object"""
-    soup = BeautifulSoup(html, "html.parser")
+def process_game_board_from_html(html, game_id, backend=None) -> GameData:
+    """Given j-archive html, produce a game data object
+
+    Args:
+        html: j-archive page html
+        game_id: game id
+        backend: key of PARSER_BACKENDS, defaults to $JPARTY_PARSER or "singlepass"
+    """
+    if backend is None:
+        backend = os.environ.get("JPARTY_PARSER", "singlepass")
+    return PARSER_BACKENDS[backend](html, game_id)
+
+
+def process_game_board_singlepass(html, game_id, tokenizer="regex") -> GameData:
+    """Build the game from one walk over the html with JArchiveParser"""
+    page = parse_game_page(html, tokenizer)
+    if page.title is None:
+        raise ValueError(f"{game_id} has no game title")
+    datesearch = re.search(r"- \w+, (.*?)$", page.title)
+    if datesearch is None:
+        return None
+    date = datesearch.groups()[0]
+    comments = page.comments or ""
+    media = game_media(game_id)
+
+    # Normal Rounds
+    boards = []
+    rounds = page.rounds
+    # Use only Double and Triple Jeopardy for Celebrity Jeopardy
+    if len(rounds) == 3:
+        rounds = rounds[:2]
+    for i, ro in enumerate(rounds):
+        categories = ro.categories
+        questions = []
+        dds = 0
+        for clue in ro.clues:
+            if not clue.has_text:
+                print(f"{game_id} is inccomplete")
+                logging.info("this game is incomplete")
+                return None
+            index_key = clue.text_id
+            index = (
+                int(index_key[-3]) - 1,
+                int(index_key[-1]) - 1,
+            )  # get index from id string
+            dd = clue.dd_value is not None
+            if dd:
+                dds += 1
+            if dds > i + 1:
+                dd = False
+            value = MONIES[i][index[1]]
+            if clue.answer is None:
+                raise ValueError(f"{game_id} has a clue without a correct response")
+            image_likely = clue.image
+            image_url = None
+            potential_media_file = media.get(f"{i}-{index[0]}-{index[1]}", False)
+            if potential_media_file:
+                image_likely = True
+                image_url = potential_media_file
+            questions.append(
+                Question(
+                    index,
+                    clue.text,
+                    clue.answer,
+                    categories[index[0]],
+                    value,
+                    dd,
+                    image=image_likely,
+                    image_url=image_url,
+                    actual_results=clue_player_results(clue, value),
+                )
+            )
+        boards.append(Board(categories, questions, dj=(i == 1)))
+
+    # Final Jeopardy
+    final_round = page.final_rounds[0]
+    category = final_round.categories[0]
+    clue = final_round.clues[0]
+    actual_results = clue_player_final(clue)
+    if not clue.has_text:
+        logging.info("this game is incomplete")
+        return None
+    question = Question(
+        (0, 0), clue.text, final_round.answer, category, actual_results=actual_results
+    )
+
+    boards.append(FinalBoard(category, question))
+
+    return GameData(boards, date, comments)
+
+
+def clue_player_results(clue: ClueData, value: int):
+    """Get the results from the actual jeopardy contestants"""
+    if clue.dd_value is not None:
+        value = int(clue.dd_value[5:].replace(",", ""))
+    answers = [[name, -value] for name, _ in clue.wrong if name != "Triple Stumper"]
+    if clue.right:
+        answers.append([clue.right[0][0], value])
+    return answers
+
+
+def clue_player_final(clue: ClueData) -> list[list[str]]:
+    answers = []
+    for sign, responses in ((-1, clue.wrong), (1, clue.right)):
+        for name, wager_row in responses:
+            value = int(wager_row.strip()[1:].replace(",", ""))
+            answers.append([name, sign * value])
+    return answers
+
+
+def process_game_board_reference(html, game_id) -> GameData:
+    """Given j-archive html, produce a game data object using BeautifulSoup"""
+    soup = bs4.BeautifulSoup(html, "html.parser")
     datesearch = re.search(
         r"- \w+, (.*?)$", soup.select("#game_title > h1")[0].text
     )
@@ -216,12 +517,21 @@ def process_game_board_from_html(html, game_id) -> GameData:
 
     return GameData(boards, date, comments)
 
-def get_wayback_game_html(game_id):
+
+PARSER_BACKENDS = {
+    "singlepass": process_game_board_singlepass,
+    "htmlparser": lambda html, game_id: process_game_board_singlepass(html, game_id, "htmlparser"),
+    "reference": process_game_board_reference,
+}
+
+
+def get_wayback_game_html(game_id, client=None, cancel=None):
+    client = client or default_client()
     # kudos to Abhi Kumbar: https://medium.com/analytics-vidhya/the-wayback-machine-scraper-63238f6abb66
     # this query's the wayback cdx api for possible instances of the saved jarchive page with the specified game id & returns the latest one
     JArchive_url = f"j-archive.com/showgame.php?game_id={str(game_id)}"  # use the url w/o the http:// or https:// to include both in query
     url = f'http://web.archive.org/cdx/search/cdx?url={JArchive_url}&collapse=digest&limit=-2&fastLatest=true&output=json'  # for some reason, using limit=-1 does not work
-    urls = requests.get(url).text
+    urls = client.get(url, endpoint="wayback-cdx", cache_ttl=WAYBACK_CDX_TTL).text
     parse_url = json.loads(urls)  # parses the JSON from urls.
     if len(parse_url) == 0:  # if no results, return None
         logging.info("no games found in wayback")
@@ -237,10 +547,22 @@ def get_wayback_game_html(game_id):
         final_url = f'http://web.archive.org/web/{waylink}'
         url_list.append(final_url)
     latest_url = url_list[-1]
-    r = requests.get(latest_url)
+    if cancel is not None and cancel.is_set():  # another source already won
+        raise Exception("cancelled")
+    r = client.get(latest_url, endpoint="wayback-snapshot", cache_ttl=WAYBACK_SNAPSHOT_TTL)
     return r.text
 
 
+# game page sources in the order they are tried, called with (game_id, client, cancel)
+GAME_SOURCES = {
+    "wayback": get_wayback_game_html,
+    "j-archive": lambda game_id, client, cancel: get_jarchive_game_html(game_id, client),
+}
+SOURCE_BREAKERS = {name: CircuitBreaker() for name in GAME_SOURCES}
+SOURCE_STATS = {name: SourceStats() for name in GAME_SOURCES}
+SOURCE_STATS_LOCK = threading.Lock()
+
+
 def get_game_sum(soup):
     date = re.search(
         r"- \w+, (.*?)$", soup.select("#game_title > h1")[0].contents[0]
@@ -252,8 +574,8 @@ def get_game_sum(soup):
 
 def get_random_game():
     """Use j-archive's random game feature to get a random game id"""
-    r = requests.get("http://j-archive.com/")
-    soup = BeautifulSoup(r.text, "html.parser")
+    r = default_client().get("http://j-archive.com/", endpoint="jarchive-random")
+    soup = bs4.BeautifulSoup(r.text, "html.parser")
 
     link = soup.find_all(class_="splash_clue_footer")[1].find("a")["href"]
     return int(link[21:])
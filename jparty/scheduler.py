@@ -0,0 +1,216 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class Scheduler(object):
+    """Run callbacks at deadlines on the monotonic clock, all timers sharing one thread
+
+    Args:
+        dispatch: called with a zero-argument function when it is due, to run it on another
+            thread (e.g. a signal to the GUI thread). None runs it on the scheduler thread.
+        clock: monotonic clock in seconds
+    """
+
+    def __init__(self, dispatch=None, clock=time.monotonic):
+        self.dispatch = dispatch
+        self.clock = clock
+        self.__heap = []  # [deadline, seq, f], f is None once cancelled
+        self.__cancelled = 0
+        self.__seq = itertools.count()
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__running = False
+
+    def call_at(self, deadline, f):
+        """Run f at deadline, returns an entry for cancel"""
+        entry = [deadline, next(self.__seq), f]
+        with self.__condition:
+            heapq.heappush(self.__heap, entry)
+            if self.__thread is None:
+                self.__running = True
+                self.__thread = threading.Thread(target=self.__run, name="scheduler", daemon=True)
+                self.__thread.start()
+            self.__condition.notify()
+        return entry
+
+    def call_later(self, delay, f):
+        return self.call_at(self.clock() + delay, f)
+
+    def cancel(self, entry):
+        with self.__condition:
+            if entry[2] is None:
+                return
+            entry[2] = None
+            self.__cancelled += 1
+            # drop cancelled entries once they are most of the heap, so pause / resume cycles
+            # do not pile up entries until their deadlines pass
+            if self.__cancelled > 32 and self.__cancelled * 2 > len(self.__heap):
+                self.__heap = [e for e in self.__heap if e[2] is not None]
+                heapq.heapify(self.__heap)
+                self.__cancelled = 0
+
+    def pending(self):
+        """number of callbacks waiting"""
+        with self.__condition:
+            return len(self.__heap) - self.__cancelled
+
+    def stop(self):
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while self.__running:
+                    while self.__heap and self.__heap[0][2] is None:
+                        heapq.heappop(self.__heap)
+                        self.__cancelled -= 1
+                    if not self.__heap:
+                        self.__condition.wait()
+                        continue
+                    wait = self.__heap[0][0] - self.clock()
+                    if wait <= 0:
+                        break
+                    self.__condition.wait(wait)
+                if not self.__running:
+                    self.__thread = None
+                    return
+                _, _, f = heapq.heappop(self.__heap)
+
+            try:
+                if self.dispatch is None:
+                    f()
+                else:
+                    self.dispatch(f)
+            except Exception:
+                logging.exception("Scheduled callback failed")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def default_scheduler():
+    """Scheduler that runs callbacks on its own thread"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+class QuestionTimer(object):
+    """Call f after `interval` seconds of running time, can be paused and resumed
+
+    The callback runs through the scheduler's dispatch, and only if the timer was not paused
+    or cancelled in the meantime.
+    """
+
+    def __init__(self, interval, f, *args, scheduler=None, **kwargs):
+        super().__init__()
+        self.f = f
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.scheduler = scheduler or default_scheduler()
+        self.__remaining = interval
+        self.__deadline = None  # set while running
+        self.__entry = None
+        self.__done = False  # fired or cancelled
+        self.__lock = threading.Lock()
+
+    def start(self):
+        """wrapper for resume"""
+        self.resume()
+
+    def resume(self):
+        with self.__lock:
+            if self.__done or self.__deadline is not None:
+                return
+            self.__deadline = self.scheduler.clock() + self.__remaining
+
+            def fire():
+                self.__fire(entry)
+
+            entry = self.__entry = self.scheduler.call_at(self.__deadline, fire)
+
+    def pause(self):
+        with self.__lock:
+            if self.__deadline is None:
+                return
+            self.__remaining = max(0, self.__deadline - self.scheduler.clock())
+            self.__deadline = None
+            self.scheduler.cancel(self.__entry)
+            self.__entry = None
+
+    def cancel(self):
+        with self.__lock:
+            self.__done = True
+            if self.__deadline is not None:
+                self.__deadline = None
+                self.scheduler.cancel(self.__entry)
+                self.__entry = None
+
+    def remaining(self):
+        """seconds of running time left"""
+        with self.__lock:
+            if self.__deadline is None:
+                return 0 if self.__done else self.__remaining
+            return max(0, self.__deadline - self.scheduler.clock())
+
+    @property
+    def running(self):
+        return self.__deadline is not None
+
+    def __fire(self, entry):
+        with self.__lock:
+            if entry is not self.__entry or self.__done:
+                return  # paused or cancelled after the deadline was reached
+            self.__deadline = None
+            self.__entry = None
+            self.__remaining = 0
+            self.__done = True
+        self.f(*self.args, **self.kwargs)
+
+
+class SimulatedScheduler(object):
+    """Scheduler on a virtual clock that only moves when advanced, for headless games
+
+    Callbacks run synchronously inside advance, so a simulated game runs as fast as its code.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.__heap = []
+        self.__seq = itertools.count()
+
+    def clock(self):
+        return self.now
+
+    def call_at(self, deadline, f):
+        entry = [deadline, next(self.__seq), f]
+        heapq.heappush(self.__heap, entry)
+        return entry
+
+    def call_later(self, delay, f):
+        return self.call_at(self.now + delay, f)
+
+    def cancel(self, entry):
+        entry[2] = None
+
+    def pending(self):
+        return sum(1 for entry in self.__heap if entry[2] is not None)
+
+    def advance(self, seconds):
+        """move the clock forward, running every callback that falls due on the way"""
+        end = self.now + seconds
+        while self.__heap and self.__heap[0][0] <= end:
+            deadline, _, f = heapq.heappop(self.__heap)
+            if f is not None:
+                self.now = max(self.now, deadline)
+                f()
+        self.now = end
@@ -0,0 +1,137 @@
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+GRAPH_SETS = ("original", "current", "all")
+
+
+def render_score_graphs(game_id, series, save_dir=None, dpi=150):
+    """Draw a graph of score by question number for each set of contestants
+
+    Runs in the worker process, so it only uses matplotlib's object API and never touches Qt.
+
+    Args:
+        game_id: shown in the titles and used in the file names
+        series: {graph set: {label: scores by question number}}
+        save_dir: directory to also write "<game_id>-<graph set>.jpg" files to, None for no files
+
+    Returns:
+        {graph set: png bytes}
+    """
+    from matplotlib.figure import Figure
+
+    images = {}
+    for name, data in series.items():
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        for label, scores in data.items():
+            x_values = list(range(1, len(scores) + 1))
+            ax.plot(x_values, scores, marker="o", label=str(label), linewidth=2, markersize=6)
+
+        ax.set_xlabel("Question Number", fontsize=12)
+        ax.set_ylabel("Score", fontsize=12)
+        ax.set_title(f"Game {game_id}:Player Scores", fontsize=14, fontweight="bold")
+        if data:
+            ax.legend(loc="best")
+        ax.grid(True, alpha=0.3)
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        images[name] = buffer.getvalue()
+        if save_dir is not None:
+            save_dir.mkdir(parents=True, exist_ok=True)
+            fig.savefig(str(save_dir / f"{game_id}-{name}.jpg"), dpi=dpi, bbox_inches="tight")
+    return images
+
+
+def warm_up():
+    """import matplotlib in the worker before there is anything to draw"""
+    import matplotlib.figure  # noqa: F401
+
+
+class GraphRenderer(object):
+    """Renders score graphs in a worker process, so the GUI thread never runs matplotlib
+
+    The worker is started (and matplotlib imported in it) by warm_up, e.g. when Final Jeopardy
+    starts, and render hands back png bytes through a callback. If a worker process cannot be
+    started, or it dies, the graphs are rendered on a background thread instead.
+    """
+
+    def __init__(self):
+        self.__executor = None
+        self.__pending = None  # future of the last render
+        self.__lock = threading.Lock()
+
+    def __pool(self):
+        with self.__lock:
+            if self.__executor is None:
+                try:
+                    # spawn, as forking a process that runs Qt and tornado threads is not safe
+                    self.__executor = ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                    )
+                except (OSError, ValueError) as e:
+                    logging.error(f"Cannot start graph worker, rendering on a thread: {e}")
+                    self.__executor = ThreadPoolExecutor(max_workers=1)
+            return self.__executor
+
+    def __fall_back(self, broken):
+        """replace a worker pool that broke with a thread, returns the executor to use"""
+        with self.__lock:
+            if self.__executor is broken:
+                logging.error("Graph worker died, rendering on a thread")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.__executor = ThreadPoolExecutor(max_workers=1)
+            return self.__executor
+
+    def __submit(self, f, *args):
+        pool = self.__pool()
+        try:
+            return pool.submit(f, *args)
+        except BrokenProcessPool:
+            return self.__fall_back(pool).submit(f, *args)
+
+    def warm_up(self):
+        self.__submit(warm_up)
+
+    def render(self, game_id, series, callback, save_dir=None):
+        """render in the worker, callback(images) is called on a worker thread with the
+        {graph set: png bytes}, or with None if rendering failed
+
+        A render that has not started yet is cancelled by the next one, and its callback is not
+        called.
+        """
+
+        def done(future):
+            if future.cancelled():
+                return
+            try:
+                images = future.result()
+            except BrokenProcessPool:
+                # the worker died while rendering, render again on a thread
+                self.__fall_back(pool)
+                self.render(game_id, series, callback, save_dir)
+                return
+            except Exception:
+                logging.exception("Rendering score graphs failed")
+                images = None
+            callback(images)
+
+        pool = self.__pool()
+        future = self.__submit(render_score_graphs, game_id, series, save_dir)
+        with self.__lock:
+            previous, self.__pending = self.__pending, future
+        if previous is not None:
+            previous.cancel()
+        future.add_done_callback(done)
+
+    def shutdown(self):
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False, cancel_futures=True)
+                self.__executor = None
+            self.__pending = None
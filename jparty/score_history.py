@@ -0,0 +1,108 @@
+from jparty.lazy_import import lazy_import
+
+np = lazy_import("numpy")  # loaded with the first score, not when the app starts
+
+CLUES = 64  # start of game, two rounds of 30 clues and the final, with room to spare
+
+
+class ScoreHistory(object):
+    """Score of every contestant after every clue, for the live players and the original contestants
+
+    Changes are stored as deltas in a matrix preallocated on the first write, one row per contestant and one column
+    per clue number (column 0 is the start of the game), and totals are their cumulative sum.
+    Rows are found by key: a Player for the live players, the name of an original contestant.
+
+    Args:
+        rows: contestants to allocate for, the matrix grows if more are added
+        clues: clue numbers to allocate for, the matrix grows if more are written
+    """
+
+    def __init__(self, rows=16, clues=CLUES):
+        self.deltas = None
+        self.__shape = (rows, clues)
+        self.keys = []
+        self.labels = []
+        self.original = []  # whether each row is an original contestant
+        self.last = 0  # highest clue number written
+        self.__rows = {}
+        self.__sums = []  # total of the deltas of each row
+        self.__ends = []  # highest clue number written in each row
+        self.__totals = None
+
+    def __grow(self, rows, clues):
+        if self.deltas is None:
+            self.deltas = np.zeros(self.__shape, dtype=np.int64)
+        old_rows, old_clues = self.deltas.shape
+        if rows <= old_rows and clues <= old_clues:
+            return
+        deltas = np.zeros((max(rows, 2 * old_rows), max(clues, 2 * old_clues)), dtype=np.int64)
+        deltas[:old_rows, :old_clues] = self.deltas
+        self.deltas = deltas
+
+    def row(self, key, label=None, original=False):
+        """row of key, added with the given label if it is new"""
+        i = self.__rows.get(key)
+        if i is None:
+            i = len(self.keys)
+            self.__grow(i + 1, 0)
+            self.__rows[key] = i
+            self.keys.append(key)
+            self.labels.append(str(key) if label is None else label)
+            self.original.append(original)
+            self.__sums.append(0)
+            self.__ends.append(0)
+        return i
+
+    def extend_to(self, clue):
+        """include clue number `clue` in the history, even if nobody's score changed"""
+        if clue > self.last:
+            self.__grow(0, clue + 1)
+            self.last = clue
+            self.__totals = None
+
+    def add(self, key, clue, delta, original=False):
+        # called for every score change of a game, so the usual case (a known row, a clue
+        # already allocated) skips row() and extend_to()
+        i = self.__rows.get(key)
+        if i is None:
+            i = self.row(key, original=original)
+        if clue > self.last:
+            self.extend_to(clue)
+        self.deltas[i, clue] += delta
+        self.__sums[i] += delta
+        if clue > self.__ends[i]:
+            self.__ends[i] = clue
+        self.__totals = None
+
+    def set_score(self, key, clue, score):
+        """make the score of key after clue number `clue` equal to score"""
+        i = self.__rows.get(key)
+        if i is None:
+            i = self.row(key)
+        if clue >= self.__ends[i]:
+            current = self.__sums[i]  # the usual case, no later changes to sum over
+        else:
+            current = int(self.deltas[i, : clue + 1].sum())
+        self.add(key, clue, score - current)
+
+    def totals(self):
+        """read-only matrix of the score of every row after every clue, up to the last one written"""
+        if self.__totals is None:
+            self.__grow(0, 0)
+            self.__totals = np.cumsum(self.deltas[: len(self.keys), : self.last + 1], axis=1)
+            self.__totals.flags.writeable = False
+        return self.__totals
+
+    def scores(self, key):
+        """scores of key by clue number, a view of totals()"""
+        return self.totals()[self.__rows[key]]
+
+    def series(self, original=None):
+        """{label: scores by clue number} of the live players (original=False), the original
+        contestants (original=True) or both (None), the scores are views of totals()"""
+        totals = self.totals()
+        return {
+            label: totals[i]
+            for i, label in enumerate(self.labels)
+            if original is None or self.original[i] == original
+        }
@@ -0,0 +1,347 @@
+import json
+import logging
+import random
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+from jparty.model import Question, FinalBoard
+from jparty.constants import CLUE_INDEX, SAVED_GAMES
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    date TEXT,
+    air_date TEXT,
+    comments TEXT,
+    source TEXT,
+    complete INTEGER
+);
+CREATE TABLE IF NOT EXISTS clues (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    category TEXT,
+    text TEXT,
+    answer TEXT,
+    value INTEGER,
+    dd INTEGER,
+    image INTEGER,
+    image_url TEXT,
+    actual_results TEXT
+);
+CREATE INDEX IF NOT EXISTS clues_game ON clues (game_id);
+CREATE INDEX IF NOT EXISTS clues_value ON clues (value);
+CREATE INDEX IF NOT EXISTS games_air_date ON games (air_date);
+CREATE INDEX IF NOT EXISTS games_complete ON games (complete);
+CREATE VIRTUAL TABLE IF NOT EXISTS clues_fts USING fts5(category, text, answer);
+"""
+
+ROUND_NAMES = ["Jeopardy", "Double Jeopardy", "Final Jeopardy"]
+
+# ids of indexed games that are complete, loaded on first use; the game pool and the welcome
+# widget pick random games from it on their own threads
+_complete_game_ids = None
+_complete_game_ids_lock = threading.Lock()
+
+
+@dataclass
+class ClueResult:
+    question: Question
+    game_id: str
+    round: int  # 0 jeopardy, 1 double jeopardy, 2 final jeopardy
+    date: str
+
+    @property
+    def round_name(self):
+        return ROUND_NAMES[self.round]
+
+
+def connect(path=CLUE_INDEX):
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript(
+            "DROP TABLE IF EXISTS games; DROP TABLE IF EXISTS clues; DROP TABLE IF EXISTS clues_fts;"
+        )
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    return conn
+
+
+def iso_date(date):
+    """"January 6, 2020" -> "2020-01-06", None if the date is not in j-archive format"""
+    try:
+        return datetime.strptime(date, "%B %d, %Y").date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def indexed_source(conn, game_id):
+    row = conn.execute("SELECT source FROM games WHERE game_id = ?", (str(game_id),)).fetchone()
+    return None if row is None else row[0]
+
+
+def game_complete(game_data):
+    """Same rules as Game.valid_game"""
+    return game_data is not None and all(b.complete() for b in game_data.rounds)
+
+
+def index_game(game_id, game_data, source=None, conn=None):
+    """Replace the index entries of one game
+
+    Args:
+        game_id: game id
+        game_data: parsed game
+        source: fingerprint of the game source, used to skip unchanged games when reindexing
+        conn: open index connection, a new one is opened if None
+    """
+    global _complete_game_ids
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    game_id = str(game_id)
+    complete = game_complete(game_data)
+    try:
+        with conn:
+            remove_game(game_id, conn)
+            conn.execute(
+                "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    game_id,
+                    game_data.date,
+                    iso_date(game_data.date),
+                    str(game_data.comments),
+                    source,
+                    int(complete),
+                ),
+            )
+            for round_number, board in enumerate(game_data.rounds):
+                if isinstance(board, FinalBoard):
+                    round_number = 2
+                for q in board.questions:
+                    cur = conn.execute(
+                        "INSERT INTO clues (game_id, round, col, row, category, text, answer, "
+                        "value, dd, image, image_url, actual_results) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            game_id,
+                            round_number,
+                            q.index[0],
+                            q.index[1],
+                            q.category,
+                            q.text,
+                            q.answer,
+                            q.value,
+                            int(q.dd),
+                            int(bool(q.image)),
+                            q.image_url,
+                            json.dumps(q.actual_results),
+                        ),
+                    )
+                    conn.execute(
+                        "INSERT INTO clues_fts (rowid, category, text, answer) VALUES (?, ?, ?, ?)",
+                        (cur.lastrowid, q.category, q.text, q.answer),
+                    )
+    finally:
+        if own_conn:
+            conn.close()
+    with _complete_game_ids_lock:
+        _complete_game_ids = None
+
+
+def remove_game(game_id, conn):
+    game_id = str(game_id)
+    conn.execute(
+        "DELETE FROM clues_fts WHERE rowid IN (SELECT id FROM clues WHERE game_id = ?)",
+        (game_id,),
+    )
+    conn.execute("DELETE FROM clues WHERE game_id = ?", (game_id,))
+    conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+
+def index_saved_games():
+    """Index every saved game whose html changed since it was last indexed, returns the number indexed"""
+    from jparty.retrieve import process_game_board_cached
+    from jparty.game_cache import source_digest
+
+    conn = connect()
+    indexed = 0
+    try:
+        for path in sorted(SAVED_GAMES.glob("*.html")):
+            game_id = path.stem
+            try:
+                html = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                logging.error(f"Cannot read saved game {game_id}: {e}")
+                continue
+            digest = source_digest(html, game_id)
+            if indexed_source(conn, game_id) == digest:
+                continue
+            try:
+                game_data = process_game_board_cached(html, game_id)
+            except Exception as e:
+                logging.error(f"Cannot parse saved game {game_id}: {e}")
+                continue
+            if game_data is None:
+                continue
+            index_game(game_id, game_data, digest, conn)
+            indexed += 1
+    finally:
+        conn.close()
+    return indexed
+
+
+def index_saved_games_in_background():
+    """index_saved_games on a thread, so games saved before the index existed can be picked"""
+
+    def run():
+        try:
+            indexed = index_saved_games()
+        except Exception:
+            logging.exception("Cannot index saved games")
+        else:
+            logging.info(f"Indexed {indexed} saved games")
+
+    thread = threading.Thread(target=run, name="index_saved_games", daemon=True)
+    thread.start()
+    return thread
+
+
+def complete_game_ids():
+    """a copy of the ids of the indexed complete games"""
+    with _complete_game_ids_lock:
+        return list(_load_complete_game_ids())
+
+
+def _load_complete_game_ids():
+    # called with _complete_game_ids_lock held
+    global _complete_game_ids
+    if _complete_game_ids is None:
+        conn = connect()
+        try:
+            rows = conn.execute("SELECT game_id FROM games WHERE complete = 1").fetchall()
+        finally:
+            conn.close()
+        _complete_game_ids = [row[0] for row in rows]
+    return _complete_game_ids
+
+
+def random_complete_game():
+    """Pick a random complete game that is saved locally, None if there is none"""
+    with _complete_game_ids_lock:
+        game_ids = _load_complete_game_ids()
+        while game_ids:
+            i = random.randrange(len(game_ids))
+            game_id = game_ids[i]
+            if (SAVED_GAMES / f"{game_id}.html").exists():
+                return game_id
+            # deleted since it was indexed
+            game_ids[i] = game_ids[-1]
+            game_ids.pop()
+    return None
+
+
+def fts_terms(column, s):
+    """match every word of s in column, quoted so user input is never parsed as fts syntax"""
+    words = re.findall(r"\w+", s)
+    return [f'{column} : "{w}"' for w in words]
+
+
+def search_clues(
+    keyword=None,
+    category=None,
+    answer=None,
+    value=None,
+    date_from=None,
+    date_to=None,
+    limit=50,
+    conn=None,
+):
+    """Find clues across every indexed game
+
+    Args:
+        keyword: words that must all appear in the clue text
+        category: words that must all appear in the category name
+        answer: words that must all appear in the correct response
+        value: exact dollar value
+        date_from: earliest air date, "YYYY-MM-DD"
+        date_to: latest air date, "YYYY-MM-DD"
+        limit: maximum number of results
+        conn: open index connection, a new one is opened if None
+    Returns:
+        list of ClueResult in the order the games were indexed
+    """
+    terms = []
+    for column, s in (("text", keyword), ("category", category), ("answer", answer)):
+        if s:
+            terms += fts_terms(column, s)
+
+    where = []
+    params = []
+    if terms:
+        # drive the query from the fts index so LIMIT stops the scan early
+        query = (
+            "SELECT clues.game_id, round, col, row, clues.category, clues.text, clues.answer, "
+            "value, dd, image, image_url, actual_results, games.date FROM clues_fts "
+            "JOIN clues ON clues.id = clues_fts.rowid JOIN games USING (game_id)"
+        )
+        where.append("clues_fts MATCH ?")
+        params.append(" AND ".join(terms))
+        # the same order as clues.rowid, which the fts index can produce without sorting
+        order = "clues_fts.rowid"
+    else:
+        query = (
+            "SELECT clues.game_id, round, col, row, category, text, answer, value, dd, image, "
+            "image_url, actual_results, games.date FROM clues JOIN games USING (game_id)"
+        )
+        order = "clues.rowid"
+    if value is not None:
+        where.append("clues.value = ?")
+        params.append(value)
+    if date_from is not None:
+        where.append("games.air_date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        where.append("games.air_date <= ?")
+        params.append(date_to)
+
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY {order} LIMIT ?"
+    params.append(limit)
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+
+    results = []
+    for (
+        game_id, round_number, col, row, category_name, text, answer_text, clue_value,
+        dd, image, image_url, actual_results, date,
+    ) in rows:
+        q = Question(
+            (col, row),
+            text,
+            answer_text,
+            category_name,
+            clue_value,
+            bool(dd),
+            image=bool(image),
+            image_url=image_url,
+            actual_results=json.loads(actual_results),
+        )
+        results.append(ClueResult(q, game_id, round_number, date))
+    return results
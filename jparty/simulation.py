@@ -0,0 +1,156 @@
+import random
+
+from jparty.engine import GameEngine, Presenter
+from jparty.model import FinalBoard, Player
+from jparty.scheduler import SimulatedScheduler
+
+
+class HeadlessPresenter(Presenter):
+    """Shows nothing, keeps the allowed host actions and answers daily double wagers at random"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.actions = set()
+
+    def activate(self, *idents):
+        self.actions.update(idents)
+
+    def deactivate(self, *idents):
+        self.actions.difference_update(idents)
+
+    def request_dd_wager(self, player, max_wager):
+        return self.rng.randint(5, max_wager)
+
+
+class GameSimulator(object):
+    """Play whole games of a GameData on a GameEngine with random contestants, without a display
+
+    The host actions are taken only when the engine allows them, so a change to the rules that
+    leaves a game stuck raises instead of passing silently.
+
+    Args:
+        data: GameData to play, its questions are reset before every game
+        players: number of contestants
+        seed: random seed, for reproducible games
+        buzz_rate: chance that a contestant buzzes in on a clue
+        correct_rate: chance that a response is correct
+        journal: GameJournal the games are recorded in
+        presenter: presenter(rng) makes the HeadlessPresenter of each game
+    """
+
+    def __init__(
+        self,
+        data,
+        players=3,
+        seed=None,
+        buzz_rate=0.7,
+        correct_rate=0.6,
+        journal=None,
+        presenter=HeadlessPresenter,
+    ):
+        self.data = data
+        self.journal = journal
+        self.presenter = presenter
+        self.players = players
+        self.rng = random.Random(seed)
+        self.buzz_rate = buzz_rate
+        self.correct_rate = correct_rate
+        self.values = [[q.value for q in board.questions] for board in data.rounds]
+
+    def reset_data(self):
+        for board, values in zip(self.data.rounds, self.values):
+            for q, value in zip(board.questions, values):
+                q.complete = False
+                q.value = value  # daily double wagers overwrite the value
+            board.remaining = len(board.questions)
+
+    def take(self, engine, ident):
+        """take a host action, like a key press the KeystrokeManager would dispatch"""
+        if ident not in engine.presenter.actions:
+            raise RuntimeError(f"{ident} is not allowed, allowed: {sorted(engine.presenter.actions)}")
+        engine.presenter.actions.discard(ident)
+
+    def judge(self, engine):
+        if self.rng.random() < self.correct_rate:
+            self.take(engine, "CORRECT_ANSWER")
+            engine.correct_answer()
+            return True
+        self.take(engine, "INCORRECT_ANSWER")
+        engine.incorrect_answer()
+        return False
+
+    def play(self):
+        """play one game, returns the engine at the end of the game"""
+        self.reset_data()
+        rng = self.rng
+        scheduler = SimulatedScheduler()
+        engine = GameEngine(self.presenter(rng), scheduler, self.journal)
+        engine.data = self.data
+        engine.players = [Player(f"player {i}", None, i) for i in range(self.players)]
+        engine.start_game()
+        control = rng.choice(engine.players)
+
+        for board in self.data.rounds:
+            if isinstance(board, FinalBoard):
+                break
+            if board is not engine.current_round:
+                self.take(engine, "NEXT_ROUND")
+                engine.next_round()
+            questions = list(board.questions)
+            rng.shuffle(questions)
+            for q in questions:
+                engine.load_question(q)
+                if q.dd:
+                    engine.get_dd_wager(control)
+                    self.judge(engine)
+                    continue
+
+                self.take(engine, "OPEN_RESPONSES")
+                engine.open_responses()
+                answered = []
+                while engine.active_question is q:
+                    buzzers = [
+                        i
+                        for i, p in enumerate(engine.players)
+                        if p not in answered and rng.random() < self.buzz_rate
+                    ]
+                    if not buzzers:
+                        scheduler.advance(engine.question_time)
+                        self.take(engine, "BACK_TO_BOARD")
+                        engine.back_to_board()
+                        break
+                    scheduler.advance(rng.uniform(0, engine.timer.remaining() * 0.9))
+                    rng.shuffle(buzzers)
+                    for i in buzzers:
+                        engine.buzz(i)
+                    player = engine.answering_player
+                    answered.append(player)
+                    if self.judge(engine):
+                        control = player
+
+        self.take(engine, "NEXT_ROUND")
+        engine.next_round()
+        for i, p in enumerate(engine.players):
+            engine.wager(i, rng.randint(0, max(p.score, 0)))
+        self.take(engine, "OPEN_FINAL")
+        engine.open_final()
+        self.take(engine, "FINAL_OPEN_RESPONSES")
+        engine.final_open_responses()
+        for p in engine.players:
+            engine.answer(p, "what is a guess")
+        scheduler.advance(engine.final_time)
+
+        while True:
+            self.take(engine, "FINAL_NEXT_PLAYER")
+            engine.final_next_player()
+            if "GENERATE_GRAPHS" in engine.presenter.actions:
+                break
+            self.take(engine, "FINAL_SHOW_ANSWER")
+            engine.final_show_answer()
+            if rng.random() < self.correct_rate:
+                self.take(engine, "FINAL_CORRECT_ANSWER")
+                engine.final_correct_answer()
+            else:
+                self.take(engine, "FINAL_INCORRECT_ANSWER")
+                engine.final_incorrect_answer()
+        return engine
@@ -0,0 +1,138 @@
+"""Import times and time to first frame of a JParty run, for `run.py --profile-startup`
+
+Installed before anything else is imported, so it only uses the standard library.
+"""
+
+import builtins
+import importlib.util
+import json
+import logging
+import sys
+import threading
+import time
+
+FLAG = "--profile-startup"
+REPORT_PREFIX = "STARTUP "  # the line benchmark.py reads
+
+
+class StartupProfile(object):
+    """Time every module imported on the main thread and the phases of startup
+
+    Import times are measured by wrapping builtins.__import__: a module's total time includes
+    the modules it imports, its own time does not.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.modules = {}  # name -> [total ms, own ms]
+        self.phases = {}  # phase -> ms since start
+        self.__stack = []  # time spent in nested imports, one entry per import in progress
+        self.__original = None
+        self.__main_thread = threading.main_thread()
+
+    def install(self):
+        self.__original = builtins.__import__
+        builtins.__import__ = self.__import
+
+    def uninstall(self):
+        if self.__original is not None:
+            builtins.__import__ = self.__original
+            self.__original = None
+
+    def __import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        key = name
+        if level:
+            try:
+                key = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                pass
+        if key in sys.modules or threading.current_thread() is not self.__main_thread:
+            return self.__original(name, globals, locals, fromlist, level)
+
+        self.__stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.__original(name, globals, locals, fromlist, level)
+        finally:
+            total = (time.perf_counter() - start) * 1000
+            nested = self.__stack.pop()
+            if self.__stack:
+                self.__stack[-1] += total
+            if key in sys.modules:
+                self.modules[key] = [total, total - nested]
+
+    def mark(self, phase):
+        self.phases[phase] = (time.perf_counter() - self.start) * 1000
+
+    def packages(self):
+        """{top level package: own ms of all its modules}"""
+        totals = {}
+        for name, (_, own) in self.modules.items():
+            package = name.partition(".")[0]
+            totals[package] = totals.get(package, 0) + own
+        return totals
+
+    def report(self, top=15):
+        lines = ["startup profile:"]
+        for phase, ms in self.phases.items():
+            lines.append(f"  {phase:<24} {ms:8.1f} ms")
+        lines.append(f"  imports by package (own time, top {top}):")
+        for package, ms in sorted(self.packages().items(), key=lambda x: -x[1])[:top]:
+            lines.append(f"    {package:<30} {ms:8.1f} ms")
+        lines.append(f"  imports by module (total time, top {top}):")
+        for name, (total, own) in sorted(self.modules.items(), key=lambda x: -x[1][0])[:top]:
+            lines.append(f"    {name:<40} {total:8.1f} ms ({own:.1f} ms own)")
+        return "\n".join(lines)
+
+    def summary(self):
+        return {
+            "phases": self.phases,
+            "packages": self.packages(),
+            "modules": {name: total for name, (total, _) in self.modules.items()},
+        }
+
+
+_profile = None
+
+
+def start():
+    """start profiling if JParty was run with --profile-startup"""
+    global _profile
+    if FLAG in sys.argv and _profile is None:
+        sys.argv.remove(FLAG)
+        _profile = StartupProfile()
+        _profile.install()
+    return _profile
+
+
+def active():
+    return _profile
+
+
+def first_frame(done):
+    """call done() once the first widget has painted"""
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance()
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                app.removeEventFilter(self)
+                QTimer.singleShot(0, done)  # after the paint has been handled
+            return False
+
+    watcher = FirstPaint()
+    app.installEventFilter(watcher)
+    return watcher
+
+
+def finish():
+    """print the profile, e.g. once the first frame is shown"""
+    _profile.mark("first frame")
+    _profile.uninstall()
+    report = _profile.report()
+    logging.info(report)
+    print(report)
+    print(REPORT_PREFIX + json.dumps(_profile.summary()), flush=True)
@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import QStyle, QCommonStyle
 from PyQt6.QtGui import QPalette, QColor, QPixmap
 from PyQt6.QtCore import Qt, QRect, QByteArray
 
-import requests
+from jparty import http_client
 from pathlib import Path
 
 from jparty.utils import DynamicLabel, add_shadow
@@ -33,7 +33,7 @@ def fetch_image_from_url(url: str) -> QPixmap:
     """
     try:
         # Fetch image data from the URL
-        response = requests.get(url)
+        response = http_client.get(url, endpoint="image", cache_ttl=http_client.IMAGE_TTL)
         response.raise_for_status()  # Raise an error for failed requests
         
         # Convert image data to QPixmap
@@ -47,14 +47,16 @@ def fetch_image_from_url(url: str) -> QPixmap:
         return QPixmap()  # Return an empty pixmap on failure
 
 class MyLabel(DynamicLabel):
-    def __init__(self, text, initialSize, parent=None, image=False):
+    def __init__(self, text, initialSize, parent=None, image=False, pixmap=None):
         super().__init__(text, initialSize, parent)
         if not image:
             self.font().setBold(True)
             self.setWordWrap(True)
         else:
             self.question_image = text
-            if not Path(self.question_image).exists():
+            if pixmap is not None:
+                self.question_image_pixmap = pixmap
+            elif not Path(self.question_image).exists():
                 self.question_image_pixmap = fetch_image_from_url(str(self.question_image))
             else:
                 self.question_image_pixmap = QPixmap(self.question_image)
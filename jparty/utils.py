@@ -1,10 +1,7 @@
-import simpleaudio as sa
-
-from threading import Thread
 import re
 import os
 import sys
-import requests
+from jparty import http_client
 
 
 from PyQt6.QtGui import QColor, QFontMetrics
@@ -24,41 +21,6 @@ def resource_path(relative_path):
     return os.path.join(base_path, "data", relative_path)
 
 
-class SongPlayer(object):
-    def __init__(self):
-        super().__init__()
-        self.__wave_obj = sa.WaveObject.from_wave_file(resource_path("intro.wav"))
-        self.__final = sa.WaveObject.from_wave_file(resource_path("final.wav"))
-        self.__play_obj = None
-        self.__repeating = False
-        self.__repeat_thread = None
-
-    def play(self, repeat=False):
-        self.__repeating = repeat
-        self.__play_obj = self.__wave_obj.play()
-        if repeat:
-            self.__repeat_thread = Thread(target=self.__repeat)
-            self.__repeat_thread.start()
-
-    def final(self, repeat=False):
-        self.__repeating = repeat
-        self.__play_obj = self.__final.play()
-        if repeat:
-            self.__repeat_thread = Thread(target=self.__repeat)
-            self.__repeat_thread.start()
-
-    def stop(self):
-        self.__repeating = False
-        self.__play_obj.stop()
-
-    def __repeat(self):
-        while True:
-            self.__play_obj.wait_done()
-            if not self.__repeating:
-                break
-            self.__play_obj = self.__wave_obj.play()
-
-
 class CompoundObject(object):
     def __init__(self, *objs):
         self.__objs = list(objs)
@@ -238,7 +200,9 @@ def search_wikimedia_image(query):
         "titles": query,
         "pithumbsize": 500,
     }
-    response = requests.get(url, params=params, headers=header)
+    response = http_client.get(
+        url, params=params, headers=header, endpoint="wikimedia", cache_ttl=http_client.WIKIMEDIA_TTL
+    )
     if response.status_code == 200:
         data = response.json()
         pages = data.get("query", {}).get("pages", {})
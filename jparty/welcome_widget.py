@@ -10,44 +10,60 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QSize, pyqtSignal, QTimer
 
-import qrcode
 import time
 from threading import Thread
 import logging
 
 from jparty.version import version
-from jparty.retrieve import get_game, get_random_game
+from jparty.retrieve import get_game, get_random_game, set_current_game_id
+from jparty.search_index import random_complete_game
+from jparty.game_pool import GamePool
 from jparty.utils import resource_path, add_shadow, DynamicLabel, DynamicButton
 from jparty.helpmsg import helpmsg
 from jparty.style import WINDOWPAL
+from jparty.lazy_import import lazy_import
+
+qrcode = lazy_import("qrcode")
+_image_factory = None
+
+
+def qr_image_factory():
+    """the QR code image class, defined once qrcode is loaded"""
+    global _image_factory
+    if _image_factory is not None:
+        return _image_factory
+
+    import qrcode.image.base
+
+    class Image(qrcode.image.base.BaseImage):
+        """QR code image widget"""
+
+        def __init__(self, border, width, box_size):
+            self.border = border
+            self.width = width
+            self.box_size = box_size
+            size = (width + border * 2) * box_size
+            self._image = QImage(size, size, QImage.Format.Format_RGB16)
+            self._image.fill(WINDOWPAL.color(QPalette.ColorRole.Window))
+
+        def pixmap(self):
+            return QPixmap.fromImage(self._image)
+
+        def drawrect(self, row, col):
+            painter = QPainter(self._image)
+            painter.fillRect(
+                (col + self.border) * self.box_size,
+                (row + self.border) * self.box_size,
+                self.box_size,
+                self.box_size,
+                Qt.GlobalColor.black,
+            )
 
+        def save(self, stream, kind=None):
+            pass
 
-class Image(qrcode.image.base.BaseImage):
-    """QR code image widget"""
-
-    def __init__(self, border, width, box_size):
-        self.border = border
-        self.width = width
-        self.box_size = box_size
-        size = (width + border * 2) * box_size
-        self._image = QImage(size, size, QImage.Format.Format_RGB16)
-        self._image.fill(WINDOWPAL.color(QPalette.ColorRole.Window))
-
-    def pixmap(self):
-        return QPixmap.fromImage(self._image)
-
-    def drawrect(self, row, col):
-        painter = QPainter(self._image)
-        painter.fillRect(
-            (col + self.border) * self.box_size,
-            (row + self.border) * self.box_size,
-            self.box_size,
-            self.box_size,
-            Qt.GlobalColor.black,
-        )
-
-    def save(self, stream, kind=None):
-        pass
+    _image_factory = Image
+    return Image
 
 
 class StartWidget(QWidget):
@@ -181,6 +197,10 @@ class Welcome(StartWidget):
 
         self.setLayout(main_layout)
 
+        # load a few games while the host waits for players to join
+        self.game_pool = GamePool()
+        self.game_pool.start()
+
         self.show()
 
     def show_help(self):
@@ -205,13 +225,22 @@ class Welcome(StartWidget):
 
     def __random(self):
         try:
-            while True:
+            ready = self.game_pool.pop()
+            if ready is not None:
+                game_id, self.game.data = ready
+                set_current_game_id(game_id)
+                logging.info(f"GAMEID {game_id} (prefetched)")
+            else:
+                # saved games already known to be complete need no network round trips
+                game_id = random_complete_game()
+                if game_id is not None:
+                    logging.info(f"GAMEID {game_id} (saved)")
+                    self.game.data = get_game(game_id)
+            while game_id is None or not self.game.valid_game():
                 game_id = get_random_game()
                 logging.info(f"GAMEID {game_id}")
                 self.game.data = get_game(game_id)
-                if self.game.valid_game():
-                    break
-                else:
+                if not self.game.valid_game():
                     time.sleep(0.25)
 
             self.gameid_trigger.emit(str(game_id))
@@ -229,7 +258,12 @@ class Welcome(StartWidget):
     def __show_summary(self):
         game_id = self.textbox.text()
         try:
-            self.game.data = get_game(game_id)
+            game_data = self.game_pool.take(game_id)
+            if game_data is not None:
+                set_current_game_id(game_id)
+                self.game.data = game_data
+            else:
+                self.game.data = get_game(game_id)
             if self.game.valid_game():
                 self.summary_trigger.emit(
                     self.game.data.date + "\n" + self.game.data.comments
@@ -271,6 +305,7 @@ class Welcome(StartWidget):
             self.start_button.setEnabled(False)
 
     def restart(self):
+        self.game_pool.start()
         self.show_summary(self)
 
 
@@ -313,7 +348,7 @@ class QRWidget(StartWidget):
         super().resizeEvent(event)
         self.qrlabel.setPixmap(
             qrcode.make(
-                self.url, image_factory=Image, box_size=max(self.height() / 50, 1)
+                self.url, image_factory=qr_image_factory(), box_size=max(self.height() / 50, 1)
             ).pixmap()
         )
 
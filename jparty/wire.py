@@ -0,0 +1,80 @@
+"""Frames of the buzzer and lectern websockets
+
+Version 1 frames are text: a one letter opcode, then the payload with no separator. State
+payloads are JSON, encoded once. Version 0 is the JSON envelope {"message", "text"} with
+state encoded again inside it, still spoken by pages loaded before version 1, which connect
+without a `v` argument.
+"""
+
+import json
+
+VERSION = 1
+VERSIONS = (0, VERSION)
+
+# opcodes of the messages from the server to the buzzers and lecterns
+SERVER_OPCODES = {
+    "NEW": "n",
+    "TOKEN": "t",
+    "EXISTS": "e",
+    "GAMESTARTED": "g",
+    "FULL": "f",
+    "PROMPTWAGER": "w",
+    "PROMPTANSWER": "a",
+    "TOOLATE": "l",
+    "LOCKEDOUT": "x",
+    "SYNC": "y",
+    "PLAYER_STATE": "s",
+    "PLAYER_DELTA": "d",  # the fields of PLAYER_STATE that changed
+    "NO_PLAYER": "z",
+    "SCORES": "S",
+    "BOARD": "B",
+    "TIMER": "T",
+}
+
+# opcodes of the messages from the buzzers to the server
+CLIENT_OPCODES = {
+    "b": "BUZZ",
+    "y": "SYNC",
+    "n": "NAME",
+    "c": "CHECK_IF_EXISTS",
+    "w": "WAGER",
+    "a": "ANSWER",
+}
+
+BUZZ = "b"
+
+# frames without a payload never change, so they are encoded once
+CONSTANT_FRAMES = {
+    VERSION: {msg: op for msg, op in SERVER_OPCODES.items()},
+    0: {msg: json.dumps({"message": msg, "text": ""}) for msg in SERVER_OPCODES},
+}
+
+
+def encode(msg, payload="", version=VERSION):
+    """frame of a message, payload is a str or a dict of state"""
+    if payload == "":
+        return CONSTANT_FRAMES[version][msg]
+    if version == 0:
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        return json.dumps({"message": msg, "text": payload})
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, separators=(",", ":"))
+    return SERVER_OPCODES[msg] + payload
+
+
+def decode(frame, version=VERSION):
+    """(message, text) of a frame from a buzzer"""
+    if version == 0:
+        parsed = json.loads(frame)
+        return parsed["message"], parsed["text"]
+    return CLIENT_OPCODES[frame[0]], frame[1:]
+
+
+def version_of(argument):
+    """protocol version asked for by the `v` query argument of a websocket, None if unknown"""
+    try:
+        version = int(argument)
+    except ValueError:
+        return None
+    return version if version in VERSIONS else None
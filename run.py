@@ -1,5 +1,11 @@
-from jparty.main import main
+import multiprocessing
+
+from jparty import startup_profile
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the score graph worker, in a PyInstaller bundle
+    startup_profile.start()  # before the app's imports, so they are timed
+    from jparty.main import main
+
     main()
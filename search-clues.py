@@ -0,0 +1,34 @@
+"""Script to search clues in the saved games"""
+
+from jparty.search_index import index_saved_games, search_clues
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument("keyword", nargs="?", default=None, help="Words in the clue text")
+parser.add_argument("--category", default=None, help="Words in the category name")
+parser.add_argument("--answer", default=None, help="Words in the correct response")
+parser.add_argument("--value", type=int, default=None, help="Dollar value")
+parser.add_argument("--from", dest="date_from", default=None, help="Earliest air date (YYYY-MM-DD)")
+parser.add_argument("--to", dest="date_to", default=None, help="Latest air date (YYYY-MM-DD)")
+parser.add_argument("--limit", type=int, default=50)
+parser.add_argument(
+    "--reindex", action="store_true", help="Index saved games that changed since the last run first"
+)
+args = parser.parse_args()
+
+if args.reindex:
+    print(f"Indexed {index_saved_games()} games")
+
+for result in search_clues(
+    args.keyword,
+    category=args.category,
+    answer=args.answer,
+    value=args.value,
+    date_from=args.date_from,
+    date_to=args.date_to,
+    limit=args.limit,
+):
+    q = result.question
+    print(f"[{result.game_id} {result.date}, {result.round_name}] {q.category} ${q.value}")
+    print(f"    {q.text}")
+    print(f"    {q.answer}")